@@ -0,0 +1,15 @@
+"""Pytest fixtures shared by all the tests of the Marsha project."""
+from django.core.cache import cache
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start each test with an empty cache.
+
+    Database changes are rolled back at the end of each test but cached objects survive,
+    which would leak objects from one test to another.
+    """
+    cache.clear()
+    yield
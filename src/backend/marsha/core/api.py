@@ -1,18 +1,21 @@
 """Declare API endpoints with Django RestFramework viewsets."""
 import hashlib
 import hmac
-import json
 import logging
 from mimetypes import guess_extension
 from os.path import splitext
 
-from django.apps import apps
 from django.conf import settings
+from django.db.models import Count, Max, prefetch_related_objects
+from django.db.models.functions import Now
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
 import requests
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action, api_view
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.models import TokenUser
@@ -21,7 +24,11 @@ from . import defaults, permissions, serializers
 from .exceptions import MissingUserIdError
 from .lti import LTIUser
 from .models import Document, Thumbnail, TimedTextTrack, Video
+from .utils import cloudfront_utils, json_utils, update_state_utils
+from .utils.cache_utils import RESOURCE_VERSION, get_versions, invalidate_versions
+from .utils.long_poll_utils import wait_for_version_change
 from .utils.s3_utils import create_presigned_post
+from .utils.snapshot_utils import get_snapshot_version, invalidate_snapshots
 from .utils.time_utils import to_timestamp
 from .xapi import XAPI, XAPIStatement
 
@@ -29,6 +36,35 @@ from .xapi import XAPI, XAPIStatement
 logger = logging.getLogger(__name__)
 
 
+def is_signature_valid(request, msg):
+    """Check the signature of a request sent by an AWS lambda.
+
+    Parameters
+    ----------
+    request : Type[django.http.request.HttpRequest]
+        The request, with the HMAC of its body in the "X-Marsha-Signature" header.
+    msg : Type[bytes]
+        The body of the request, read before its data is parsed.
+
+    Returns
+    -------
+    boolean
+        True if the body was signed with any secret of ``UPDATE_STATE_SHARED_SECRETS``.
+
+    """
+    # Check if the provided signature is valid against any secret in our list
+    #
+    # We need to do this to support 2 or more versions of our infrastructure at the same time.
+    # It then enables us to do updates and change the secret without incurring downtime.
+    return any(
+        request.headers.get("X-Marsha-Signature")
+        == hmac.new(
+            secret.encode("utf-8"), msg=msg, digestmod=hashlib.sha256
+        ).hexdigest()
+        for secret in settings.UPDATE_STATE_SHARED_SECRETS
+    )
+
+
 @api_view(["POST"])
 def update_state(request):
     """View handling AWS POST request to update the state of an object by key.
@@ -45,6 +81,8 @@ def update_state(request):
     -------
     Type[rest_framework.response.Response]
         HttpResponse acknowledging the success or failure of the state update operation.
+        When ``UPDATE_STATE_QUEUE_ACTIVE`` is set, the update is queued and applied later by
+        the ``process_state_updates`` management command: the response is then a 202.
 
     """
     msg = request.body
@@ -53,58 +91,290 @@ def update_state(request):
     if serializer.is_valid() is not True:
         return Response(serializer.errors, status=400)
 
-    # Check if the provided signature is valid against any secret in our list
-    #
-    # We need to do this to support 2 or more versions of our infrastructure at the same time.
-    # It then enables us to do updates and change the secret without incurring downtime.
-    signature_is_valid = any(
-        request.headers.get("X-Marsha-Signature")
-        == hmac.new(
-            secret.encode("utf-8"), msg=msg, digestmod=hashlib.sha256
-        ).hexdigest()
-        for secret in settings.UPDATE_STATE_SHARED_SECRETS
-    )
-
-    if not signature_is_valid:
+    if not is_signature_valid(request, msg):
         return Response("Forbidden", status=403)
 
-    # Retrieve the elements from the key
-    key_elements = serializer.get_key_elements()
-
-    # Update the object targeted by the "object_id" and "resource_id"
-    model = apps.get_model(app_label="core", model_name=key_elements["model_name"])
+    if settings.UPDATE_STATE_QUEUE_ACTIVE:
+        update_state_utils.queue_update(serializer.validated_data)
+        return Response({"success": True}, status=202)
 
-    extra_parameters = serializer.validated_data["extraParameters"]
-    if serializer.validated_data["state"] == defaults.READY and hasattr(
-        model, "extension"
-    ):
-        # The extension is part of the s3 key name and added in this key
-        # when generated by the initiate upload
-        extra_parameters["extension"] = key_elements.get("extension")
+    # Update the object targeted by the "object_id" and "resource_id" of the key
+    update = update_state_utils.get_update(serializer.validated_data)
+    model = update["model"]
 
     try:
-        object_instance = model.objects.get(id=key_elements["object_id"])
+        object_instance = model.objects.get(id=update["object_id"])
     except model.DoesNotExist:
         return Response({"success": False}, status=404)
 
+    # Duplicate and outdated updates are acknowledged without being applied
     object_instance.update_upload_state(
-        upload_state=serializer.validated_data["state"],
-        uploaded_on=key_elements.get("uploaded_on")
-        if serializer.validated_data["state"] == defaults.READY
-        else None,
-        **extra_parameters,
+        upload_state=update["upload_state"],
+        uploaded_on=update["uploaded_on"],
+        stamp=update["stamp"],
+        **update["extra_parameters"],
     )
 
     return Response({"success": True})
 
 
+@api_view(["POST"])
+def update_state_batch(request):
+    """View handling AWS POST request to update the state of several objects at once.
+
+    Updates are applied in a single transaction, with one bulk update per model. Use it when
+    many states change at once, e.g. while migrating or re-encoding files.
+
+    Parameters
+    ----------
+    request : Type[django.http.request.HttpRequest]
+        The request on the API endpoint, signed as a whole. Its payload should be a list of
+        at most ``UPDATE_STATE_BATCH_SIZE`` updates with the fields expected by
+        ``update_state``.
+
+    Returns
+    -------
+    Type[rest_framework.response.Response]
+        HttpResponse with the result of each update, in the order of the payload.
+
+    """
+    if not is_signature_valid(request, request.body):
+        return Response("Forbidden", status=403)
+
+    if (
+        isinstance(request.data, list)
+        and len(request.data) > settings.UPDATE_STATE_BATCH_SIZE
+    ):
+        return Response(
+            {
+                "non_field_errors": [
+                    "A batch can not hold more than {:d} updates.".format(
+                        settings.UPDATE_STATE_BATCH_SIZE
+                    )
+                ]
+            },
+            status=400,
+        )
+
+    serializer = serializers.UpdateStateSerializer(data=request.data, many=True)
+    if serializer.is_valid() is not True:
+        return Response(serializer.errors, status=400)
+
+    errors = update_state_utils.apply_updates(
+        [update_state_utils.get_update(data) for data in serializer.validated_data]
+    )
+    return Response(
+        {
+            "results": [
+                {"key": data["key"], "success": error is None}
+                if error is None
+                else {"key": data["key"], "success": False, "error": error}
+                for data, error in zip(serializer.validated_data, errors)
+            ]
+        }
+    )
+
+
+class ConditionalRetrieveMixin:
+    """Answer conditional GET requests on an object without serializing it if it is unchanged.
+
+    The dashboard polls objects while they are transcoded. Their ETag and Last-Modified headers
+    are derived from the date at which the object and each of the related objects listed in
+    ``conditional_relations`` were last updated, aggregated in the query fetching the object.
+    The number of related objects is part of the ETag so that deleting one of them changes it.
+    So are the settings urls are built with and, when urls are signed, the expiration date of
+    their signature: the representation changes when a new signature is computed.
+
+    Related objects prefetched by the queryset of the viewset are only fetched if the object
+    changed, so a request answered with 304 Not Modified runs a single query. The ``wait``
+    action goes further and lets the client block until the object changes.
+    """
+
+    # Related objects of which the representation of the object is made
+    conditional_relations = ()
+    # Model of the resource of the JWT token, of which the object is part
+    resource_model = None
+
+    def get_conditional_object(self):
+        """Fetch the object with the aggregates its validators are computed from.
+
+        Returns
+        -------
+        tuple
+            The object annotated, for each relation listed in ``conditional_relations``, with
+            the date at which a related object was last updated and the number of related
+            objects, and the lookups to prefetch before serializing it.
+
+        """
+        aggregates = {}
+        for relation in self.conditional_relations:
+            aggregates["{:s}_updated_on".format(relation)] = Max(
+                "{:s}__updated_on".format(relation)
+            )
+            aggregates["{:s}_count".format(relation)] = Count(relation, distinct=True)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # pylint: disable=protected-access
+        prefetch_lookups = queryset._prefetch_related_lookups
+        queryset = queryset.prefetch_related(None).annotate(**aggregates)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(self.request, obj)
+        return obj, prefetch_lookups
+
+    def get_validators(self, obj):
+        """Compute the ETag and the Last-Modified date of the representation of an object.
+
+        Parameters
+        ----------
+        obj : Type[models.Model]
+            The object, as returned by ``get_conditional_object``.
+
+        Returns
+        -------
+        tuple
+            The quoted ETag and the Last-Modified date as a timestamp in seconds.
+
+        """
+        dates = [obj.updated_on]
+        state = [
+            str(obj.pk),
+            obj.updated_on.isoformat(),
+            get_snapshot_version(),
+            self.request.accepted_media_type,
+        ]
+        for relation in self.conditional_relations:
+            updated_on = getattr(obj, "{:s}_updated_on".format(relation))
+            if updated_on is not None:
+                dates.append(updated_on)
+            state.extend(
+                [
+                    updated_on.isoformat() if updated_on else None,
+                    getattr(obj, "{:s}_count".format(relation)),
+                ]
+            )
+
+        if settings.CLOUDFRONT_SIGNED_URLS_ACTIVE:
+            dates.append(cloudfront_utils.get_signature_date())
+            state.extend(
+                [
+                    int(cloudfront_utils.get_expiration().timestamp()),
+                    settings.CLOUDFRONT_ACCESS_KEY_ID,
+                    settings.CLOUDFRONT_SIGNED_URLS_WILDCARD,
+                ]
+            )
+
+        etag = hashlib.sha256(json_utils.dumps(state)).hexdigest()
+        return quote_etag(etag), int(max(dates).timestamp())
+
+    def build_conditional_response(self, request, obj, prefetch_lookups):
+        """Serialize an object unless the client already has its current representation.
+
+        Parameters
+        ----------
+        request : Type[rest_framework.request.Request]
+            The request on the API endpoint, possibly with If-None-Match or If-Modified-Since
+            headers.
+        obj : Type[models.Model]
+            The object, as returned by ``get_conditional_object``.
+        prefetch_lookups : Type[tuple]
+            The lookups to prefetch before serializing the object.
+
+        Returns
+        -------
+        Type[django.http.HttpResponse]
+            The representation of the object or a response without body if it did not change.
+
+        """
+        etag, last_modified = self.get_validators(obj)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            prefetch_related_objects([obj], *prefetch_lookups)
+            response = Response(self.get_serializer(obj).data)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Clients must revalidate the representation as it may change at any time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return 304 Not Modified if the object did not change since the client fetched it.
+
+        Parameters
+        ----------
+        request : Type[rest_framework.request.Request]
+            The request on the API endpoint, possibly with If-None-Match or If-Modified-Since
+            headers.
+
+        Returns
+        -------
+        Type[django.http.HttpResponse]
+            The representation of the object or a response without body if it did not change.
+
+        """
+        obj, prefetch_lookups = self.get_conditional_object()
+        return self.build_conditional_response(request, obj, prefetch_lookups)
+
+    @action(methods=["get"], detail=True, url_path="wait")
+    # pylint: disable=unused-argument
+    def wait(self, request, pk=None):
+        """Wait for the object to change before answering, instead of being polled.
+
+        The client sends the ETag of the representation it has in the If-None-Match header.
+        If the object did not change, the request blocks until its resource changes (e.g. when
+        ``update_state`` records an upload state transition) or for at most
+        ``LONG_POLL_TIMEOUT`` seconds. It is then answered as ``retrieve`` would be. Without a
+        cache shared by all the processes, the request is answered right away.
+
+        Parameters
+        ----------
+        request : Type[rest_framework.request.Request]
+            The request on the API endpoint, with an If-None-Match header.
+        pk: string
+            The primary key of the object
+
+        Returns
+        -------
+        Type[django.http.HttpResponse]
+            The representation of the object or a response without body if it did not change.
+
+        """
+        # The version is read before the object so that a change committed in between is
+        # not missed. The resource is the one of the JWT token, checked by the permissions.
+        version_name = RESOURCE_VERSION.format(
+            model=self.resource_model.__name__, pk=request.user.id
+        )
+        version = get_versions(version_name)
+
+        obj, prefetch_lookups = self.get_conditional_object()
+        response = self.build_conditional_response(request, obj, prefetch_lookups)
+        if response.status_code == 304 and wait_for_version_change(
+            version_name, version
+        ):
+            obj, prefetch_lookups = self.get_conditional_object()
+            response = self.build_conditional_response(request, obj, prefetch_lookups)
+        return response
+
+
 class VideoViewSet(
-    mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet
+    ConditionalRetrieveMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    viewsets.GenericViewSet,
 ):
     """Viewset for the API of the video object."""
 
-    queryset = Video.objects.all()
+    queryset = serializers.VideoSerializer.setup_eager_loading(Video.objects.all())
     serializer_class = serializers.VideoSerializer
+    conditional_relations = ("timedtexttracks", "thumbnail", "playlist")
+    resource_model = Video
     permission_classes = [
         permissions.IsResourceAdmin | permissions.IsResourceInstructor
     ]
@@ -146,18 +416,30 @@ class VideoViewSet(
         )
 
         # Reset the upload state of the video
-        Video.objects.filter(pk=pk).update(upload_state=defaults.PENDING)
+        Video.objects.filter(pk=pk).update(
+            upload_state=defaults.PENDING, updated_on=Now()
+        )
+        invalidate_snapshots(Video.objects.filter(pk=pk))
+        invalidate_versions(RESOURCE_VERSION.format(model=Video.__name__, pk=pk))
 
         return Response(presigned_post)
 
 
 class DocumentViewSet(
-    mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet
+    ConditionalRetrieveMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    viewsets.GenericViewSet,
 ):
     """Viewset for the API of the Document object."""
 
-    queryset = Document.objects.all()
+    queryset = serializers.DocumentSerializer.setup_eager_loading(
+        Document.objects.all()
+    )
     serializer_class = serializers.DocumentSerializer
+    # The title of the playlist is part of the filename of the document
+    conditional_relations = ("playlist",)
+    resource_model = Document
     permission_classes = [
         permissions.IsResourceAdmin | permissions.IsResourceInstructor
     ]
@@ -203,12 +485,17 @@ class DocumentViewSet(
         )
 
         # Reset the upload state of the document
-        Document.objects.filter(pk=pk).update(upload_state=defaults.PENDING)
+        Document.objects.filter(pk=pk).update(
+            upload_state=defaults.PENDING, updated_on=Now()
+        )
+        invalidate_snapshots(Document.objects.filter(pk=pk))
+        invalidate_versions(RESOURCE_VERSION.format(model=Document.__name__, pk=pk))
 
         return Response(presigned_post)
 
 
 class TimedTextTrackViewSet(
+    ConditionalRetrieveMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     mixins.ListModelMixin,
@@ -219,6 +506,7 @@ class TimedTextTrackViewSet(
     """Viewset for the API of the TimedTextTrack object."""
 
     serializer_class = serializers.TimedTextTrackSerializer
+    resource_model = Video
 
     def get_permissions(self):
         """Instantiate and return the list of permissions that this view requires."""
@@ -269,12 +557,19 @@ class TimedTextTrackViewSet(
         )
 
         # Reset the upload state of the timed text track
-        TimedTextTrack.objects.filter(pk=pk).update(upload_state=defaults.PENDING)
+        TimedTextTrack.objects.filter(pk=pk).update(
+            upload_state=defaults.PENDING, updated_on=Now()
+        )
+        invalidate_versions(
+            RESOURCE_VERSION.format(model=Video.__name__, pk=timed_text_track.video_id)
+        )
+        invalidate_snapshots(Video.objects.filter(pk=timed_text_track.video_id))
 
         return Response(presigned_post)
 
 
 class ThumbnailViewSet(
+    ConditionalRetrieveMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     mixins.RetrieveModelMixin,
@@ -286,6 +581,7 @@ class ThumbnailViewSet(
         permissions.IsVideoRelatedInstructor | permissions.IsVideoRelatedAdmin
     ]
     serializer_class = serializers.ThumbnailSerializer
+    resource_model = Video
 
     def get_queryset(self):
         """Restrict list access to thumbnail related to the video in the JWT token."""
@@ -331,7 +627,13 @@ class ThumbnailViewSet(
         )
 
         # Reset the upload state of the thumbnail
-        Thumbnail.objects.filter(pk=pk).update(upload_state=defaults.PENDING)
+        Thumbnail.objects.filter(pk=pk).update(
+            upload_state=defaults.PENDING, updated_on=Now()
+        )
+        invalidate_versions(
+            RESOURCE_VERSION.format(model=Video.__name__, pk=thumbnail.video_id)
+        )
+        invalidate_snapshots(Video.objects.filter(pk=thumbnail.video_id))
 
         return Response(presigned_post)
 
@@ -390,7 +692,9 @@ class XAPIStatementView(APIView):
             return Response({"status": "Impossible to identify the actor."}, status=400)
 
         # Log the statement in the xapi logger
-        xapi_logger.info(json.dumps(xapi_statement.get_statement()))
+        xapi_logger.info(
+            json_utils.dumps(xapi_statement.get_statement()).decode("utf-8")
+        )
 
         if not consumer_site.lrs_url or not consumer_site.lrs_auth_token:
             return Response(
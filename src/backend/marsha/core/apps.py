@@ -9,3 +9,8 @@ class CoreConfig(AppConfig):
 
     name = "marsha.core"
     verbose_name = _("Marsha")
+
+    def ready(self):
+        """Connect the signal receivers of the app."""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals  # noqa
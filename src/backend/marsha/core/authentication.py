@@ -0,0 +1,76 @@
+"""Authentication classes of the Marsha API.
+
+The frontend sends the same short-lived JWT token, minted by the LTI views, with every API and
+xAPI request. Verifying its signature each time is wasted work: once verified, a token stays
+valid until its "exp" claim. Verified tokens are kept in a bounded cache local to each process,
+keyed by a hash of the raw token so that a forged token can never match a verified one.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+
+from rest_framework_simplejwt.authentication import JWTTokenUserAuthentication
+
+from .utils.cache_utils import HitCounter, LRUCache
+
+
+_verified_tokens = LRUCache(maxsize=settings.JWT_VERIFIED_TOKEN_CACHE_SIZE)
+_counter = HitCounter()
+
+
+def get_token_cache_stats():
+    """Return the counters of the verified token cache of the current process.
+
+    Returns
+    -------
+    dictionary
+        - hits: the number of tokens served from the cache,
+        - misses: the number of tokens that had to be verified,
+        - hit_ratio: the share of tokens served from the cache, between 0 and 1.
+
+    """
+    return _counter.get_stats()
+
+
+def clear_token_cache():
+    """Empty the verified token cache of the current process and reset its counters."""
+    _verified_tokens.clear()
+    _counter.reset()
+
+
+class CachedJWTTokenUserAuthentication(JWTTokenUserAuthentication):
+    """Authenticate requests with a JWT token, skipping verification of known tokens."""
+
+    def get_validated_token(self, raw_token):
+        """Return the validated token, from the cache if it was already verified.
+
+        Parameters
+        ----------
+        raw_token: Type[bytes]
+            The encoded JWT token found in the "Authorization" header.
+
+        Raises
+        ------
+        rest_framework_simplejwt.exceptions.InvalidToken
+            Raised if the token is not valid. Invalid tokens are never cached.
+
+        Returns
+        -------
+        Type[rest_framework_simplejwt.tokens.Token]
+            The validated token.
+
+        """
+        key = hashlib.sha256(raw_token).digest()
+        entry = _verified_tokens.get(key)
+        if entry is not None:
+            expires_at, validated_token = entry
+            if expires_at > time.time():
+                _counter.hit()
+                return validated_token
+            _verified_tokens.delete(key)
+
+        _counter.miss()
+        validated_token = super().get_validated_token(raw_token)
+        _verified_tokens.set(key, (validated_token["exp"], validated_token))
+        return validated_token
@@ -0,0 +1,67 @@
+"""Micro-benchmarks of the hot paths of the Marsha project.
+
+Benchmarks are functions registered with the ``register`` decorator. They take a number of
+iterations and return the timings measured for each variant of the code they compare
+(e.g. "before" and "after" an optimization). Run them with ``python manage.py benchmark``.
+"""
+import time
+
+
+BENCHMARKS = {}
+
+
+def register(name):
+    """Register a benchmark function under a name.
+
+    Parameters
+    ----------
+    name: Type[string]
+        The name used to select the benchmark on the command line.
+
+    Returns
+    -------
+    function
+        A decorator registering the benchmark function it wraps.
+
+    """
+
+    def decorator(function):
+        BENCHMARKS[name] = function
+        return function
+
+    return decorator
+
+
+def measure(function, iterations):
+    """Measure the time spent calling a function repeatedly.
+
+    Parameters
+    ----------
+    function: Type[callable]
+        The function to call, without arguments.
+    iterations: Type[integer]
+        The number of times the function is called.
+
+    Returns
+    -------
+    dictionary
+        - iterations: the number of calls,
+        - total: the total time spent, in seconds,
+        - mean: the mean time spent per call, in seconds,
+        - per_second: the number of calls per second.
+
+    """
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    total = time.perf_counter() - started_at
+    return {
+        "iterations": iterations,
+        "total": total,
+        "mean": total / iterations,
+        "per_second": iterations / total if total else float("inf"),
+    }
+
+
+# Import benchmark modules so that they register their benchmarks
+from . import api, lti  # noqa isort:skip
@@ -0,0 +1,216 @@
+"""Benchmarks related to requests on the API."""
+from datetime import timedelta
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.test.utils import override_settings
+from django.utils import timezone
+
+import boto3
+from botocore.client import Config
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from rest_framework import renderers, serializers
+from rest_framework_simplejwt.authentication import JWTTokenUserAuthentication
+
+from . import measure, register
+from ..authentication import CachedJWTTokenUserAuthentication
+from ..models import Playlist, Thumbnail, TimedTextTrack, Video
+from ..serializers import VideoSerializer
+from ..utils import cloudfront_utils, json_utils, s3_utils
+from .lti import mint_student_jwt
+
+
+@register("jwt_authentication")
+def benchmark_jwt_authentication(iterations):
+    """Compare verifying the JWT token of each API request to caching verified tokens."""
+    raw_token = mint_student_jwt().encode("ascii")
+    verified = JWTTokenUserAuthentication()
+    cached = CachedJWTTokenUserAuthentication()
+
+    return {
+        "verified": measure(
+            lambda: verified.get_validated_token(raw_token), iterations
+        ),
+        "cached": measure(lambda: cached.get_validated_token(raw_token), iterations),
+    }
+
+
+def write_private_key(path):
+    """Write a new RSA private key in a PEM file, as CloudFront key pairs are."""
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048, backend=default_backend()
+    )
+    with open(path, "wb") as key_file:
+        key_file.write(
+            private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.TraditionalOpenSSL,
+                encryption_algorithm=serialization.NoEncryption(),
+            )
+        )
+
+
+@register("cloudfront_signature")
+def benchmark_cloudfront_signature(iterations):
+    """Compare parsing the private key for each signature to parsing it once."""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "cloudfront_private_key")
+    write_private_key(path)
+    message = b'{"Statement":[{"Resource":"https://abc.cloudfront.net/a.mp4"}]}'
+
+    def parse_and_sign():
+        with open(path, "rb") as key_file:
+            key = serialization.load_pem_private_key(
+                key_file.read(), password=None, backend=default_backend()
+            )
+        return key.sign(message, padding.PKCS1v15(), hashes.SHA1())  # nosec
+
+    try:
+        with override_settings(CLOUDFRONT_PRIVATE_KEY_PATH=path):
+            return {
+                "parse_each_time": measure(parse_and_sign, iterations),
+                "key_manager": measure(
+                    lambda: cloudfront_utils.rsa_signer(message), iterations
+                ),
+            }
+    finally:
+        shutil.rmtree(directory)
+
+
+@register("cloudfront_video_urls")
+def benchmark_cloudfront_video_urls(iterations):
+    """Compare signing each url of a video to signing one policy for all of them."""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "cloudfront_private_key")
+    write_private_key(path)
+    base = "https://abc.cloudfront.net/{!s}".format(uuid.uuid4())
+    # The mp4 files of each resolution and a few timed text tracks
+    urls = [
+        "{:s}/mp4/1533686400_{:d}.mp4".format(base, resolution)
+        for resolution in (144, 240, 480, 720, 1080)
+    ] + [
+        "{:s}/timedtext/1533686400_{:s}.vtt".format(base, language)
+        for language in ("en", "fr", "es")
+    ]
+    date_less_than = timezone.now() + timedelta(hours=2)
+
+    def sign_each_url():
+        cloudfront_signer = cloudfront_utils.get_cloudfront_signer()
+        return [
+            cloudfront_signer.generate_presigned_url(url, date_less_than=date_less_than)
+            for url in urls
+        ]
+
+    def sign_wildcard():
+        signed_query = cloudfront_utils.build_signed_query(
+            "{:s}/*".format(base), date_less_than
+        )
+        return [cloudfront_utils.add_signed_query(url, signed_query) for url in urls]
+
+    try:
+        with override_settings(
+            CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+            CLOUDFRONT_PRIVATE_KEY_PATH=path,
+        ):
+            return {
+                "canned_policies": measure(sign_each_url, iterations),
+                "wildcard_policy": measure(sign_wildcard, iterations),
+            }
+    finally:
+        shutil.rmtree(directory)
+
+
+def build_video():
+    """Build a ready video with its thumbnail and timed text tracks, without the database."""
+    uploaded_on = timezone.now()
+    video = Video(
+        title="Lesson 1",
+        description="First lesson of the course",
+        playlist=Playlist(title="Mathematics"),
+        upload_state="ready",
+        uploaded_on=uploaded_on,
+        resolutions=[144, 240, 480, 720, 1080],
+    )
+    video.thumbnail = Thumbnail(
+        video=video, upload_state="ready", uploaded_on=uploaded_on
+    )
+    # Stand for the timed text tracks fetched by ``VideoSerializer.setup_eager_loading``
+    # pylint: disable=protected-access
+    video._prefetched_objects_cache = {
+        "timedtexttracks": [
+            TimedTextTrack(
+                video=video,
+                language=language,
+                mode=mode,
+                upload_state="ready",
+                uploaded_on=uploaded_on,
+            )
+            for language, mode in (("en", "st"), ("fr", "st"), ("fr", "ts"))
+        ]
+    }
+    return video
+
+
+@register("video_serializer")
+def benchmark_video_serializer(iterations):
+    """Compare serializing a video through its fields to the read path flattened by hand."""
+    video = build_video()
+
+    def fields():
+        serializer = VideoSerializer(video)
+        return serializers.ModelSerializer.to_representation(serializer, video)
+
+    with override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False):
+        return {
+            "fields": measure(fields, iterations),
+            "flattened": measure(lambda: VideoSerializer(video).data, iterations),
+        }
+
+
+@register("json_encoding")
+def benchmark_json_encoding(iterations):
+    """Compare rendering a video with Django Rest Framework to ``json_utils.dumps``."""
+    with override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False):
+        data = VideoSerializer(build_video()).data
+    renderer = renderers.JSONRenderer()
+
+    return {
+        "rest_framework": measure(lambda: renderer.render(data), iterations),
+        "json_utils": measure(lambda: json_utils.dumps(data), iterations),
+    }
+
+
+@register("presigned_post")
+def benchmark_presigned_post(iterations):
+    """Compare creating a S3 client for each initiate-upload to sharing one per process."""
+    key = "{pk!s}/video/{pk!s}/1533686400".format(pk=uuid.uuid4())
+    conditions = [["content-length-range", 0, 1024 ** 3]]
+
+    def client_per_call():
+        s3_client = boto3.client(
+            "s3",
+            aws_access_key_id="access-key-id",
+            aws_secret_access_key="secret-access-key",
+            config=Config(region_name="eu-west-1", signature_version="s3v4"),
+        )
+        return s3_client.generate_presigned_post(
+            "source-bucket", key, Fields={"acl": "private"}, Conditions=conditions
+        )
+
+    with override_settings(
+        AWS_ACCESS_KEY_ID="access-key-id",
+        AWS_SECRET_ACCESS_KEY="secret-access-key",
+        AWS_S3_REGION_NAME="eu-west-1",
+        AWS_SOURCE_BUCKET_NAME="source-bucket",
+    ):
+        return {
+            "client_per_call": measure(client_per_call, iterations),
+            "shared_client": measure(
+                lambda: s3_utils.create_presigned_post(list(conditions), {}, key),
+                iterations,
+            ),
+        }
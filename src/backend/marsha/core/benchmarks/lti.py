@@ -0,0 +1,223 @@
+"""Benchmarks related to LTI launch requests."""
+import time
+import uuid
+
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from pylti.common import verify_request_common
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import measure, register
+from ..lti.oauth import compute_signature, verify_request
+from ..views import STUDENT_PERMISSIONS, VideoLTIView, splice_jwt
+
+
+CONSUMER_KEY = "ABC123"
+SHARED_SECRET = "#Y5$ThisIsABenchmarkSecret"
+
+# Parameters sent by Open edX when launching a video in an LTI xblock
+LAUNCH_PARAMETERS = {
+    "context_id": "course-v1:ufr+mathematics+0001",
+    "context_label": "mathematics",
+    "context_title": "Mathematics for everyone",
+    "launch_presentation_locale": "fr",
+    "launch_presentation_return_url": "",
+    "lis_outcome_service_url": (
+        "https://lms.example.com/courses/course-v1:ufr+mathematics+0001/xblock/"
+        "block-v1:ufr+mathematics+0001+type@lti_consumer+block@df7/handler_noauth/outcome"
+    ),
+    "lis_person_contact_email_primary": "student@example.com",
+    "lis_person_sourcedid": "student",
+    "lis_result_sourcedid": "course-v1%3Aufr%2Bmathematics%2B0001:lms.example.com-df7",
+    "lti_message_type": "basic-lti-launch-request",
+    "lti_version": "LTI-1p0",
+    "resource_link_id": "lms.example.com-df7b0f2886f04b279854585735a402c4",
+    "roles": "Student",
+    "tool_consumer_info_product_family_code": "openedx",
+    "tool_consumer_info_version": "1.0",
+    "tool_consumer_instance_guid": "lms.example.com",
+    "user_id": "7a1b9f5a4e6b4d8e9a3c2f1e0d9c8b7a",
+}
+
+
+def build_launch_parameters(url, consumer_key, shared_secret, parameters=None):
+    """Build the body of an LTI launch request signed with OAuth 1.0.
+
+    Parameters
+    ----------
+    url: Type[string]
+        The absolute url of the LTI launch request.
+    consumer_key: Type[string]
+        The oauth consumer key of the passport.
+    shared_secret: Type[string]
+        The shared secret of the passport.
+    parameters: Type[dictionary]
+        The LTI parameters of the launch. Defaults to an Open edX student launch.
+
+    Returns
+    -------
+    dictionary
+        The LTI parameters along with the OAuth parameters and signature.
+
+    """
+    signed_parameters = {
+        **(LAUNCH_PARAMETERS if parameters is None else parameters),
+        "oauth_consumer_key": consumer_key,
+        "oauth_nonce": uuid.uuid4().hex,
+        "oauth_signature_method": "HMAC-SHA1",
+        "oauth_timestamp": str(int(time.time())),
+        "oauth_version": "1.0",
+    }
+    signed_parameters["oauth_signature"] = compute_signature(
+        "POST", url, signed_parameters.items(), shared_secret
+    )
+    return signed_parameters
+
+
+@register("lti_signature")
+def benchmark_lti_signature(iterations):
+    """Compare pylti's OAuth verification to our native verifier on a realistic launch."""
+    path = "/lti/videos/{!s}".format(uuid.uuid4())
+    url = "http://testserver{:s}".format(path)
+    request = RequestFactory().post(
+        path, build_launch_parameters(url, CONSUMER_KEY, SHARED_SECRET)
+    )
+    consumers = {CONSUMER_KEY: {"secret": SHARED_SECRET}}
+
+    return {
+        "pylti": measure(
+            lambda: verify_request_common(
+                consumers,
+                url,
+                request.method,
+                request.META,
+                dict(request.POST.items()),
+            ),
+            iterations,
+        ),
+        "native": measure(
+            lambda: verify_request(request, url, SHARED_SECRET), iterations
+        ),
+    }
+
+
+def build_video_app_data(resolutions=(144, 240, 480, 720, 1080), tracks=3):
+    """Build the app data of a ready video as passed to the frontend by LTI views.
+
+    Parameters
+    ----------
+    resolutions: Type[Iterable[integer]]
+        The resolutions in which the video is encoded.
+    tracks: Type[integer]
+        The number of timed text tracks of the video.
+
+    Returns
+    -------
+    dictionary
+        The app data, without the JWT token.
+
+    """
+    video_id = uuid.uuid4()
+    base_url = "https://abc.cloudfront.net/{!s}".format(video_id)
+    signature = "?Policy=eyJTdGF0ZW1lbnQiOltdfQ__&Signature=" + "a" * 344
+    return {
+        "modelName": "videos",
+        "resource": {
+            "active_stamp": "1569309880",
+            "description": "Introduction to the course",
+            "id": str(video_id),
+            "is_ready_to_show": True,
+            "show_download": True,
+            "should_use_subtitle_as_transcript": False,
+            "has_transcript": False,
+            "thumbnail": None,
+            "timed_text_tracks": [
+                {
+                    "id": str(uuid.uuid4()),
+                    "active_stamp": "1569309880",
+                    "is_ready_to_show": True,
+                    "mode": "st",
+                    "language": "fr",
+                    "upload_state": "ready",
+                    "source_url": None,
+                    "url": "{:s}/timedtext/{:d}.vtt{:s}".format(
+                        base_url, index, signature
+                    ),
+                    "video": str(video_id),
+                }
+                for index in range(tracks)
+            ],
+            "title": "Lesson 1",
+            "upload_state": "ready",
+            "urls": {
+                "mp4": {
+                    resolution: "{:s}/mp4/1569309880_{:d}.mp4{:s}".format(
+                        base_url, resolution, signature
+                    )
+                    for resolution in resolutions
+                },
+                "thumbnails": {
+                    resolution: "{:s}/thumbnails/1569309880_{:d}.0000000.jpg".format(
+                        base_url, resolution
+                    )
+                    for resolution in resolutions
+                },
+                "manifests": {
+                    "dash": "{:s}/cmaf/1569309880.mpd{:s}".format(base_url, signature),
+                    "hls": "{:s}/cmaf/1569309880.m3u8{:s}".format(base_url, signature),
+                },
+                "previews": "{:s}/previews/1569309880_100.jpg".format(base_url),
+            },
+            "playlist": {"title": "Mathematics", "lti_id": "course-v1:ufr+maths"},
+        },
+        "state": "success",
+        "sentry_dsn": None,
+        "environment": "benchmark",
+        "release": "benchmark",
+        "static": {"svg": {"plyr": "/static/svg/plyr.svg"}},
+    }
+
+
+def mint_student_jwt():
+    """Create the JWT token of a student as done on each LTI launch."""
+    jwt_token = AccessToken()
+    jwt_token.payload.update(
+        {
+            "session_id": str(uuid.uuid4()),
+            "context_id": LAUNCH_PARAMETERS["context_id"],
+            "resource_id": str(uuid.uuid4()),
+            "roles": ["student"],
+            "course": {"school_name": "ufr", "course_name": "mathematics"},
+            "locale": "fr_FR",
+            "permissions": STUDENT_PERMISSIONS,
+            "maintenance": False,
+            "user_id": LAUNCH_PARAMETERS["user_id"],
+        }
+    )
+    return str(jwt_token)
+
+
+@register("lti_page")
+def benchmark_lti_page(iterations):
+    """Compare rendering the page of a student to splicing its JWT into the cached page."""
+    view = VideoLTIView()
+    app_data = build_video_app_data()
+
+    def render():
+        return render_to_string(
+            view.template_name,
+            view.get_context_data({**app_data, "jwt": mint_student_jwt()}),
+        )
+
+    cached_content = render_to_string(
+        view.template_name, view.get_context_data({**app_data, "jwt": ""})
+    )
+
+    def splice():
+        return splice_jwt(cached_content, mint_student_jwt())
+
+    return {
+        "render": measure(render, iterations),
+        "splice": measure(splice, iterations),
+    }
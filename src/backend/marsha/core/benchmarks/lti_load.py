@@ -0,0 +1,307 @@
+"""Load test of LTI launch requests on a database seeded with the factories of the project.
+
+Consumer sites, passports, playlists linked by portability rules and ready resources are
+created with ``marsha.core.factories`` (it requires the "dev" dependencies). Signed LTI launch
+requests are then replayed through the whole Django stack with the test client, and their
+latency and number of queries are recorded.
+
+Run it with ``python manage.py lti_load_test``.
+"""
+import random
+import time
+import uuid
+
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ..defaults import READY
+from ..utils.query_utils import QueryRecorder
+from ..utils.snapshot_utils import refresh_snapshots
+from .lti import LAUNCH_PARAMETERS, build_launch_parameters
+
+
+LANGUAGES = ["en", "fr", "es", "de", "it"]
+
+# Name of the url of the LTI view launching each kind of resource
+LTI_VIEWS = {"video": "video_lti_view", "document": "document_lti_view"}
+
+
+class LaunchTarget:
+    """A resource and an LTI context from which it can be launched."""
+
+    def __init__(self, kind, resource, context_id, passport, domain):
+        """Initialize a launch target.
+
+        Parameters
+        ----------
+        kind: Type[string]
+            The kind of resource: "video" or "document".
+        resource: Type[models.BaseFile]
+            The resource to launch.
+        context_id: Type[string]
+            The lti id of the playlist from which the resource is launched.
+        passport: Type[models.LTIPassport]
+            The passport signing the launch request.
+        domain: Type[string]
+            The domain of the consumer site from which the resource is launched.
+
+        """
+        self.kind = kind
+        self.resource = resource
+        self.context_id = context_id
+        self.passport = passport
+        self.domain = domain
+
+
+def seed(consumer_sites=2, playlists=5, videos=5, documents=2, tracks=2):
+    """Create ready resources in playlists of several consumer sites linked by portability.
+
+    Each consumer site gets a passport and ``playlists`` playlists. The playlist at a given
+    position in a consumer site is portable to the playlist at the same position in the next
+    consumer site, so that each resource can be launched from two contexts.
+
+    Parameters
+    ----------
+    consumer_sites: Type[integer]
+        The number of consumer sites.
+    playlists: Type[integer]
+        The number of playlists in each consumer site.
+    videos: Type[integer]
+        The number of videos in each playlist, each with timed text tracks and a thumbnail.
+    documents: Type[integer]
+        The number of documents in each playlist.
+    tracks: Type[integer]
+        The number of timed text tracks of each video.
+
+    Returns
+    -------
+    List[LaunchTarget]
+        The launch targets of all resources, from their own playlist and from the playlist
+        they are portable to.
+
+    """
+    # Factories are only installed along with the development dependencies
+    # pylint: disable=import-outside-toplevel
+    from .. import factories
+    from ..models import Document, PlaylistPortability, Video
+
+    now = timezone.now()
+    sites = []
+    for _site in range(consumer_sites):
+        passport = factories.ConsumerSiteLTIPassportFactory()
+        site_playlists = factories.PlaylistFactory.create_batch(
+            playlists,
+            consumer_site=passport.consumer_site,
+            is_portable_to_playlist=False,
+        )
+        sites.append((passport, site_playlists))
+
+    targets = []
+    for index, (passport, site_playlists) in enumerate(sites):
+        next_passport, next_playlists = sites[(index + 1) % len(sites)]
+        for position, playlist in enumerate(site_playlists):
+            target_playlist = next_playlists[position]
+            if target_playlist != playlist:
+                PlaylistPortability.objects.create(
+                    source_playlist=playlist, target_playlist=target_playlist
+                )
+
+            resources = []
+            for video in factories.VideoFactory.create_batch(
+                videos,
+                playlist=playlist,
+                upload_state=READY,
+                uploaded_on=now,
+                resolutions=[144, 240, 480, 720, 1080],
+            ):
+                factories.ThumbnailFactory(
+                    video=video, upload_state=READY, uploaded_on=now
+                )
+                for language in LANGUAGES[:tracks]:
+                    factories.TimedTextTrackFactory(
+                        video=video,
+                        language=language,
+                        mode="st",
+                        upload_state=READY,
+                        uploaded_on=now,
+                    )
+                resources.append(("video", video))
+            resources.extend(
+                ("document", document)
+                for document in factories.DocumentFactory.create_batch(
+                    documents,
+                    playlist=playlist,
+                    upload_state=READY,
+                    uploaded_on=now,
+                    extension="pdf",
+                )
+            )
+
+            for kind, resource in resources:
+                targets.append(
+                    LaunchTarget(
+                        kind,
+                        resource,
+                        playlist.lti_id,
+                        passport,
+                        passport.consumer_site.domain,
+                    )
+                )
+                targets.append(
+                    LaunchTarget(
+                        kind,
+                        resource,
+                        target_playlist.lti_id,
+                        next_passport,
+                        next_passport.consumer_site.domain,
+                    )
+                )
+
+    # Snapshots are built when the transaction is committed, which may never happen here
+    for kind, model in (("video", Video), ("document", Document)):
+        refresh_snapshots(
+            model.objects.filter(
+                pk__in={target.resource.pk for target in targets if target.kind == kind}
+            )
+        )
+    return targets
+
+
+def launch(client, target, role):
+    """Replay a signed LTI launch request.
+
+    Parameters
+    ----------
+    client: Type[django.test.Client]
+        The client sending the request through the whole Django stack.
+    target: Type[LaunchTarget]
+        The resource to launch and the context to launch it from.
+    role: Type[string]
+        The LTI role of the user launching the resource.
+
+    Returns
+    -------
+    Tuple[float, integer]
+        The latency of the request, in seconds, and the number of queries it ran.
+
+    """
+    path = reverse(LTI_VIEWS[target.kind], kwargs={"uuid": target.resource.id})
+    parameters = build_launch_parameters(
+        "http://testserver{:s}".format(path),
+        target.passport.oauth_consumer_key,
+        target.passport.shared_secret,
+        {
+            **LAUNCH_PARAMETERS,
+            "context_id": target.context_id,
+            "resource_link_id": target.resource.lti_id,
+            "roles": role,
+            "user_id": uuid.uuid4().hex,
+        },
+    )
+
+    with QueryRecorder() as recorder:
+        started_at = time.perf_counter()
+        response = client.post(
+            path, parameters, HTTP_REFERER="https://{:s}/courses".format(target.domain),
+        )
+        latency = time.perf_counter() - started_at
+
+    if (
+        response.status_code != 200
+        or b"&quot;state&quot;:&quot;success&quot;" not in response.content
+    ):
+        raise RuntimeError(
+            "LTI launch of {:s} {!s} failed.".format(target.kind, target.resource.id)
+        )
+    return latency, recorder.count
+
+
+def percentile(values, percent):
+    """Return a percentile of a list of values with the nearest-rank method.
+
+    Parameters
+    ----------
+    values: Type[List[float]]
+        The values, in any order.
+    percent: Type[float]
+        The percentile to compute, between 0 and 100.
+
+    Returns
+    -------
+    float
+        The smallest value greater than or equal to ``percent`` % of the values.
+
+    """
+    ordered = sorted(values)
+    rank = max(int(-(-percent * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    """Compute statistics on the samples recorded while replaying launches.
+
+    Parameters
+    ----------
+    samples: Type[List[Tuple[float, integer]]]
+        The latency, in seconds, and number of queries of each launch.
+
+    Returns
+    -------
+    dictionary
+        - launches: the number of launches,
+        - p50, p95, p99: percentiles of the latency, in seconds,
+        - queries: the mean number of queries per launch,
+        - max_queries: the maximum number of queries of a launch,
+        - per_second: the number of launches per second that a single worker can serve.
+
+    """
+    latencies = [latency for latency, _queries in samples]
+    queries = [count for _latency, count in samples]
+    total = sum(latencies)
+    return {
+        "launches": len(samples),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "queries": sum(queries) / len(queries),
+        "max_queries": max(queries),
+        "per_second": len(samples) / total if total else float("inf"),
+    }
+
+
+def run(targets, launches=100, roles=("student", "instructor"), seed_random=None):
+    """Replay launches of random targets for each kind of resource and each role.
+
+    Parameters
+    ----------
+    targets: Type[List[LaunchTarget]]
+        The launch targets, as returned by ``seed``.
+    launches: Type[integer]
+        The number of launches replayed for each kind of resource and each role.
+    roles: Type[Iterable[string]]
+        The LTI roles of the users launching resources.
+    seed_random: Type[integer]
+        A seed to draw the same targets from one run to another.
+
+    Returns
+    -------
+    dictionary
+        Statistics for each (kind, role) pair as returned by ``summarize``.
+
+    """
+    randomizer = random.Random(seed_random)
+    client = Client()
+    results = {}
+    for kind in LTI_VIEWS:
+        kind_targets = [target for target in targets if target.kind == kind]
+        if not kind_targets:
+            continue
+        for role in roles:
+            results[(kind, role)] = summarize(
+                [
+                    launch(client, randomizer.choice(kind_targets), role)
+                    for _launch in range(launches)
+                ]
+            )
+    return results
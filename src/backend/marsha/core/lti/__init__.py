@@ -11,6 +11,8 @@ from pylti.common import LTIException, verify_request_common
 
 from ..models import ConsumerSite
 from ..models.account import ADMINISTRATOR, INSTRUCTOR, LTI_ROLES, STUDENT, LTIPassport
+from .oauth import verify_request
+from .passports import get_passport
 
 
 class LTI:
@@ -76,9 +78,6 @@ class LTI:
             return True
 
         passport = self.get_passport()
-        consumers = {
-            str(passport.oauth_consumer_key): {"secret": str(passport.shared_secret)}
-        }
 
         # The LTI signature is computed using the url of the LTI launch request. But when Marsha
         # is behind a TLS termination proxy, the url as seen by Django is changed and starts with
@@ -90,19 +89,27 @@ class LTI:
         if self.request.META.get("HTTP_X_FORWARDED_PROTO", "http") == "https":
             url = url.replace("http:", "https:", 1)
 
-        # A call to the verification function should raise an LTIException but
-        # we can further check that it returns True.
-        if (
-            verify_request_common(
-                consumers,
-                url,
-                self.request.method,
-                self.request.META,
-                dict(self.request.POST.items()),
-            )
-            is not True
-        ):
-            raise LTIException("LTI verification failed.")
+        if settings.LTI_NATIVE_SIGNATURE_VERIFICATION:
+            verify_request(self.request, url, str(passport.shared_secret))
+        else:
+            consumers = {
+                str(passport.oauth_consumer_key): {
+                    "secret": str(passport.shared_secret)
+                }
+            }
+            # A call to the verification function should raise an LTIException but
+            # we can further check that it returns True.
+            if (
+                verify_request_common(
+                    consumers,
+                    url,
+                    self.request.method,
+                    self.request.META,
+                    dict(self.request.POST.items()),
+                )
+                is not True
+            ):
+                raise LTIException("LTI verification failed.")
 
         consumer_site = passport.consumer_site or passport.playlist.consumer_site
 
@@ -180,9 +187,7 @@ class LTI:
 
         # find a passport related to the oauth consumer key
         try:
-            return LTIPassport.objects.get(
-                oauth_consumer_key=consumer_key, is_enabled=True
-            )
+            return get_passport(consumer_key)
         except LTIPassport.DoesNotExist:
             raise LTIException(
                 "Could not find a valid passport for this oauth consumer key: {:s}.".format(
@@ -0,0 +1,101 @@
+"""Resolve and cache the LTI passports used to authenticate LTI launch requests.
+
+Passports are read on every LTI launch but almost never change. They are kept, along with
+their resolved consumer site, in a bounded cache local to each process, backed by the
+Django cache.
+
+Entries are scoped by a version stored in the Django cache. Saving or deleting a passport,
+a consumer site or a playlist renews the version (see ``marsha.core.signals``) so that all
+processes stop using their entries at once, provided the cache is shared by all the
+processes. Otherwise, entries expire after ``APP_DATA_CACHE_LOCAL_DURATION`` seconds at most.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import LTIPassport
+from ..utils.cache_utils import (
+    LTI_PASSPORT_VERSION,
+    LRUCache,
+    get_versions,
+    invalidate_versions,
+    is_cache_shared,
+)
+
+
+PASSPORT_CACHE_KEY = "lti_passport|{version:s}|{consumer_key:s}"
+
+_local_cache = LRUCache(maxsize=settings.LTI_PASSPORT_CACHE_SIZE)
+
+
+def get_passport_cache_duration():
+    """Return the number of seconds during which a passport is cached.
+
+    When the cache is local to each process, a change is only invalidated in the process
+    that handled it: the duration is capped so that other processes stop authenticating
+    with a disabled passport or an old secret soon enough.
+
+    Returns
+    -------
+    integer
+        The duration in seconds.
+
+    """
+    duration = settings.LTI_PASSPORT_CACHE_DURATION
+    if not is_cache_shared():
+        duration = min(duration, settings.APP_DATA_CACHE_LOCAL_DURATION)
+    return duration
+
+
+def get_passport(consumer_key):
+    """Return the enabled passport related to an oauth consumer key.
+
+    The consumer site and the playlist of the passport are resolved so that the caller can
+    find the consumer site of the passport without querying the database.
+
+    Parameters
+    ----------
+    consumer_key: Type[string]
+        The oauth consumer key sent in the LTI launch request.
+
+    Raises
+    ------
+    LTIPassport.DoesNotExist
+        Raised if there is no enabled passport for this consumer key.
+
+    Returns
+    -------
+    Type[models.LTIPassport]
+        The passport related to the oauth consumer key.
+
+    """
+    version = get_versions(LTI_PASSPORT_VERSION)
+
+    entry = _local_cache.get(consumer_key)
+    if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+        return entry[2]
+
+    duration = get_passport_cache_duration()
+    cache_key = PASSPORT_CACHE_KEY.format(version=version, consumer_key=consumer_key)
+    passport = cache.get(cache_key)
+    if passport is None:
+        passport = LTIPassport.objects.select_related(
+            "consumer_site", "playlist__consumer_site"
+        ).get(oauth_consumer_key=consumer_key, is_enabled=True)
+        cache.set(cache_key, passport, duration)
+
+    _local_cache.set(consumer_key, (version, time.monotonic() + duration, passport))
+    return passport
+
+
+def invalidate_passports():
+    """Renew the version of cached passports so that they are all fetched again.
+
+    Passports are invalidated right away and once more after the current transaction is
+    committed so that a concurrent request can not cache the state preceding the commit.
+    """
+    invalidate_versions(LTI_PASSPORT_VERSION)
+    _local_cache.clear()
+    transaction.on_commit(_local_cache.clear)
@@ -0,0 +1,127 @@
+"""Maintain the materialized reachability of playlists used to resolve LTI resources.
+
+A resource requested by an LTI launch may live in another playlist than the one of the launch
+if this playlist is portable. Portability is declared in several places (the flags of the
+playlist, ``PlaylistPortability`` and ``ConsumerSitePortability`` links) that are expensive to
+combine at request time. They are flattened in ``PlaylistReachability`` rows listing, for each
+playlist, the (consumer site, lti id) contexts from which its resources are reachable.
+
+Rows of a playlist are rebuilt each time one of the objects they derive from is saved (see
+``marsha.core.signals``). Rows derived from a portability link are deleted along with it.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import (
+    ConsumerSitePortability,
+    Playlist,
+    PlaylistPortability,
+    PlaylistReachability,
+)
+
+
+def update_playlist_reachability(playlist_ids):
+    """Rebuild the reachability rows of some playlists.
+
+    Parameters
+    ----------
+    playlist_ids: Type[Iterable[uuid.UUID]]
+        The ids of the playlists for which portability may have changed.
+
+    """
+    playlist_ids = set(playlist_ids)
+    if not playlist_ids:
+        return
+
+    # Deleted playlists are not reachable: their rows are only deleted
+    playlists = list(
+        Playlist.objects.filter(id__in=playlist_ids).values_list(
+            "id",
+            "consumer_site_id",
+            "is_portable_to_playlist",
+            "is_portable_to_consumer_site",
+        )
+    )
+
+    rows = []
+    site_ids = set()
+    for playlist_id, site_id, to_playlist, to_consumer_site in playlists:
+        site_ids.add(site_id)
+        # Resources are portable to all consumer sites
+        if to_consumer_site:
+            rows.append(PlaylistReachability(playlist_id=playlist_id))
+        # Resources are portable to all playlists of the same consumer site
+        if to_playlist:
+            rows.append(
+                PlaylistReachability(playlist_id=playlist_id, consumer_site_id=site_id)
+            )
+
+    # Resources are portable to the playlists the playlist is linked to
+    rows.extend(
+        PlaylistReachability(
+            playlist_id=link.source_playlist_id,
+            consumer_site_id=link.target_playlist.consumer_site_id,
+            lti_id=link.target_playlist.lti_id,
+            playlist_portability_id=link.id,
+        )
+        for link in PlaylistPortability.objects.filter(
+            source_playlist_id__in=playlist_ids, source_playlist__deleted__isnull=True
+        ).select_related("target_playlist")
+    )
+
+    # Resources are portable to the consumer sites the consumer site is linked to
+    site_links = {}
+    for link in ConsumerSitePortability.objects.filter(
+        source_site_id__in=site_ids, source_site__deleted__isnull=True
+    ):
+        site_links.setdefault(link.source_site_id, []).append(link)
+    rows.extend(
+        PlaylistReachability(
+            playlist_id=playlist_id,
+            consumer_site_id=link.target_site_id,
+            consumer_site_portability_id=link.id,
+        )
+        for playlist_id, site_id, _, _ in playlists
+        for link in site_links.get(site_id, [])
+    )
+
+    with transaction.atomic():
+        PlaylistReachability.all_objects.filter(playlist_id__in=playlist_ids).delete()
+        PlaylistReachability.objects.bulk_create(rows)
+
+
+def update_consumer_site_reachability(consumer_site_ids):
+    """Rebuild the reachability rows of all the playlists of some consumer sites.
+
+    Parameters
+    ----------
+    consumer_site_ids: Type[Iterable[uuid.UUID]]
+        The ids of the consumer sites for which portability may have changed.
+
+    """
+    update_playlist_reachability(
+        Playlist.all_objects.filter(
+            consumer_site_id__in=set(consumer_site_ids)
+        ).values_list("id", flat=True)
+    )
+
+
+def get_reachability_filter(consumer_site, lti_id):
+    """Return a filter on ``PlaylistReachability`` matching the context of an LTI launch.
+
+    Parameters
+    ----------
+    consumer_site: Type[models.ConsumerSite]
+        The consumer site from which the LTI launch request originates.
+    lti_id: Type[string]
+        The lti id of the playlist (context id) in the LTI launch request.
+
+    Returns
+    -------
+    Type[django.db.models.Q]
+        A filter matching the rows of playlists reachable from this context.
+
+    """
+    return (Q(consumer_site__isnull=True) | Q(consumer_site=consumer_site)) & (
+        Q(lti_id__isnull=True) | Q(lti_id=lti_id)
+    )
@@ -1,8 +1,13 @@
 """Helpers to create a dedicated resources."""
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import post_save
+
+from safedelete import HARD_DELETE
 
 from ..defaults import PENDING
-from ..models import Playlist
+from ..models import Playlist, PlaylistReachability
+from ..utils.db_utils import insert_or_get
+from .portability import get_reachability_filter
 
 
 class PortabilityError(Exception):
@@ -40,66 +45,84 @@ def get_or_create_resource(model, lti):
         {} if (lti.is_instructor or lti.is_admin) else {"uploaded_on__isnull": False}
     )
     consumer_site = lti.get_consumer_site()
-    playlist_reachable_from = Playlist.objects.filter(
-        portable_to__lti_id=lti.context_id,
-        portable_to__consumer_site_id=consumer_site.id,
+    is_reachable = PlaylistReachability.objects.filter(
+        get_reachability_filter(consumer_site, lti.context_id),
+        playlist_id=OuterRef("playlist_id"),
     )
-    try:
-        return model.objects.select_related("playlist").get(
+    queryset = (
+        model.objects.select_related("playlist")
+        .annotate(is_reachable=Exists(is_reachable))
+        .filter(
             # The resource exists in this playlist on this consumer site
             Q(playlist__lti_id=lti.context_id, playlist__consumer_site=consumer_site)
-            # The resource exists in another playlist of the same consumer site and is portable
-            | Q(
-                playlist__is_portable_to_playlist=True,
-                playlist__consumer_site=consumer_site,
-                uploaded_on__isnull=False,
-            )
-            # The resource exists in another consumer site to which it is portable because:
-            # 1. its playlist is portable to all consumer sites
-            | Q(playlist__is_portable_to_consumer_site=True, uploaded_on__isnull=False)
-            # 2. its playlist is portable to the requested playlist
-            | Q(playlist__in=playlist_reachable_from, uploaded_on__isnull=False)
-            # 3. all playlists in the consumer site of the resource are portable to the
-            #    requesting consumer site
-            | Q(
-                playlist__consumer_site__in=consumer_site.reachable_from.all(),
-                uploaded_on__isnull=False,
-            ),
+            # The resource exists in another playlist that is portable to this playlist
+            # or consumer site (see `marsha.core.lti.portability`)
+            | Q(is_reachable=True, uploaded_on__isnull=False),
             pk=lti.resource_id,
             **filter_kwargs,
         )
+    )
+    try:
+        return queryset.get()
     except model.DoesNotExist:
         pass
 
     if not (lti.is_instructor or lti.is_admin):
         return None
 
+    # Create the playlist and the resource if they don't exist yet. Concurrent launches
+    # of a new LTI link are safe: only one of them inserts each row.
+    playlist, playlist_created = insert_or_get(
+        Playlist(
+            lti_id=lti.context_id, consumer_site=consumer_site, title=lti.context_title,
+        ),
+        ["lti_id", "consumer_site"],
+        conflict_condition="deleted IS NULL",
+    )
+    resource, created = insert_or_get(
+        model(
+            pk=lti.resource_id,
+            lti_id=lti.resource_link_id,
+            playlist=playlist,
+            upload_state=PENDING,
+            title=lti.resource_link_title,
+            show_download=consumer_site.video_show_download_default,
+        ),
+        ["id"],
+    )
+
+    if created:
+        if playlist_created:
+            _send_post_save(playlist)
+        _send_post_save(resource)
+        return resource
+
+    # The resource already exists: it was either just created by a concurrent launch or
+    # it is not portable to this playlist
     try:
-        resource = model.objects.get(pk=lti.resource_id)
+        resource = queryset.get()
     except model.DoesNotExist:
-        pass
-    else:
+        if playlist_created:
+            playlist.delete(force_policy=HARD_DELETE)
         raise PortabilityError(
             "The {!s} ID {!s} already exists but is not portable to your playlist ({!s}) "
             "and/or consumer site ({!s}).".format(
-                model.__name__,
-                resource.id,
-                lti.context_id,
-                lti.get_consumer_site().domain,
+                model.__name__, resource.id, lti.context_id, consumer_site.domain,
             )
         )
 
-    playlist, _ = Playlist.objects.get_or_create(
-        lti_id=lti.context_id,
-        consumer_site=lti.get_consumer_site(),
-        defaults={"title": lti.context_title},
-    )
+    if playlist_created:
+        _send_post_save(playlist)
+    return resource
+
 
-    return model.objects.create(
-        pk=lti.resource_id,
-        lti_id=lti.resource_link_id,
-        playlist=playlist,
-        upload_state=PENDING,
-        title=lti.resource_link_title,
-        show_download=lti.get_consumer_site().video_show_download_default,
+def _send_post_save(instance):
+    """Send the signal `save` would have sent for a row inserted without the ORM."""
+    post_save.send(
+        sender=type(instance),
+        instance=instance,
+        created=True,
+        update_fields=None,
+        raw=False,
+        using=instance._state.db,  # pylint: disable=protected-access
     )
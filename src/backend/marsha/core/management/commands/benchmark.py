@@ -0,0 +1,47 @@
+"""Run the micro-benchmarks of the Marsha project."""
+from django.core.management.base import BaseCommand, CommandError
+
+from marsha.core.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    """Run registered benchmarks and print the timings of each variant."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add arguments to select benchmarks and the number of iterations."""
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help="Names of the benchmarks to run (all by default): {:s}".format(
+                ", ".join(sorted(BENCHMARKS))
+            ),
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=1000,
+            help="Number of iterations for each variant of a benchmark.",
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmarks and print a line per variant."""
+        names = options["names"] or sorted(BENCHMARKS)
+        unknown_names = set(names) - set(BENCHMARKS)
+        if unknown_names:
+            raise CommandError(
+                "Unknown benchmarks: {:s}".format(", ".join(sorted(unknown_names)))
+            )
+
+        for name in names:
+            results = BENCHMARKS[name](options["iterations"])
+            for variant, stats in results.items():
+                self.stdout.write(
+                    "{name:s} [{variant:s}]: {mean:.1f} µs/op, {per_second:.0f} ops/s".format(
+                        name=name,
+                        variant=variant,
+                        mean=stats["mean"] * 10 ** 6,
+                        per_second=stats["per_second"],
+                    )
+                )
@@ -0,0 +1,95 @@
+"""Load test LTI launch requests on a database seeded with the factories of the project."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from marsha.core.benchmarks import lti_load
+
+
+class Command(BaseCommand):
+    """Seed resources, replay signed LTI launches and print latency and query statistics.
+
+    Seeded objects are rolled back at the end of the run unless ``--keep`` is passed.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add arguments to size the seeded data and the number of launches."""
+        parser.add_argument(
+            "--consumer-sites", type=int, default=2, help="Number of consumer sites."
+        )
+        parser.add_argument(
+            "--playlists", type=int, default=5, help="Playlists per consumer site."
+        )
+        parser.add_argument(
+            "--videos", type=int, default=5, help="Videos per playlist."
+        )
+        parser.add_argument(
+            "--documents", type=int, default=2, help="Documents per playlist."
+        )
+        parser.add_argument(
+            "--tracks", type=int, default=2, help="Timed text tracks per video."
+        )
+        parser.add_argument(
+            "--launches",
+            type=int,
+            default=200,
+            help="Launches replayed for each kind of resource and each role.",
+        )
+        parser.add_argument(
+            "--roles",
+            default="student,instructor",
+            help="Comma separated LTI roles of the users launching resources.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=None, help="Seed of the random target draws."
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded objects in the database.",
+        )
+
+    def handle(self, *args, **options):
+        """Seed the database, replay launches and print a line per view and role."""
+        # The test client sends requests to the "testserver" host
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ), transaction.atomic():
+            targets = lti_load.seed(
+                consumer_sites=options["consumer_sites"],
+                playlists=options["playlists"],
+                videos=options["videos"],
+                documents=options["documents"],
+                tracks=options["tracks"],
+            )
+            results = lti_load.run(
+                targets,
+                launches=options["launches"],
+                roles=[role.strip() for role in options["roles"].split(",")],
+                seed_random=options["seed"],
+            )
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        for (kind, role), stats in results.items():
+            self.stdout.write(
+                (
+                    "{kind:s} [{role:s}]: {launches:d} launches, "
+                    "p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, "
+                    "{queries:.1f} queries/launch (max {max_queries:d}), "
+                    "{per_second:.0f} launches/s per worker"
+                ).format(
+                    kind=kind,
+                    role=role,
+                    launches=stats["launches"],
+                    p50=stats["p50"] * 1000,
+                    p95=stats["p95"] * 1000,
+                    p99=stats["p99"] * 1000,
+                    queries=stats["queries"],
+                    max_queries=stats["max_queries"],
+                    per_second=stats["per_second"],
+                )
+            )
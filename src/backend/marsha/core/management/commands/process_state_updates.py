@@ -0,0 +1,61 @@
+"""Apply the upload state updates queued by the update-state endpoint."""
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from marsha.core.utils.update_state_utils import process_queued_updates
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Pop queued state updates in batches and apply them, until stopped."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        """Add arguments to size the batches and to stop once the queue is empty."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.UPDATE_STATE_BATCH_SIZE,
+            help="Maximum number of queued updates applied at once.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Number of seconds to wait before polling an empty queue again.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Stop as soon as the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        """Process batches until the queue is empty, then wait for new updates.
+
+        A batch that fails, e.g. because the database is unavailable, is rolled back and left
+        in the queue: the error is logged and the batch is retried after the interval.
+        """
+        while True:
+            try:
+                count = process_queued_updates(options["batch_size"])
+            except Exception as error:  # pylint: disable=broad-except
+                if options["once"]:
+                    raise CommandError(error) from error
+                logger.exception("Processing queued updates failed")
+                # Discard the connection if it is broken so that the next batch reconnects
+                close_old_connections()
+                time.sleep(options["interval"])
+                continue
+
+            if count:
+                self.stdout.write("{:d} queued updates processed".format(count))
+            elif options["once"]:
+                return
+            else:
+                time.sleep(options["interval"])
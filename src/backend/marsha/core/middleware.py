@@ -0,0 +1,64 @@
+"""Middlewares of the Marsha project."""
+from logging import getLogger
+
+from django.conf import settings
+
+from .utils.query_utils import QueryRecorder
+
+
+logger = getLogger(__name__)
+
+# Response headers exposing query statistics in debug mode
+QUERY_HEADERS = {
+    "queries_count": "X-Queries-Count",
+    "queries_duration": "X-Queries-Duration",
+    "queries_duplicates": "X-Queries-Duplicates",
+    "queries_similar": "X-Queries-Similar",
+}
+
+
+class QueryInstrumentationMiddleware:
+    """Record the SQL queries run while serving requests routed to Marsha views.
+
+    Statistics are exposed as response headers in debug mode and logged as structured
+    fields otherwise. The middleware is inactive unless ``QUERY_INSTRUMENTATION_ACTIVE``
+    is set.
+    """
+
+    def __init__(self, get_response):
+        """Initialize the middleware with the next callable of the chain."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Serve the request while recording its queries."""
+        if not settings.QUERY_INSTRUMENTATION_ACTIVE:
+            return self.get_response(request)
+
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is None or not resolver_match.func.__module__.startswith(
+            "marsha."
+        ):
+            return response
+
+        stats = recorder.get_stats()
+        if settings.DEBUG:
+            for field, header in QUERY_HEADERS.items():
+                response[header] = str(stats[field])
+        else:
+            logger.info(
+                "%d queries in %.3f ms for %s %s",
+                stats["queries_count"],
+                stats["queries_duration"],
+                request.method,
+                resolver_match.view_name,
+                extra={
+                    "view": resolver_match.view_name,
+                    "method": request.method,
+                    "status_code": response.status_code,
+                    **stats,
+                },
+            )
+        return response
@@ -0,0 +1,168 @@
+# Generated by Django 3.0.6 on 2020-06-22 09:12
+
+import uuid
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def initialize_playlist_reachability(apps, schema_editor):
+    """
+    Materialize the reachability of all existing playlists
+    """
+    Playlist = apps.get_model("core", "Playlist")
+    PlaylistPortability = apps.get_model("core", "PlaylistPortability")
+    ConsumerSitePortability = apps.get_model("core", "ConsumerSitePortability")
+    PlaylistReachability = apps.get_model("core", "PlaylistReachability")
+
+    rows = [
+        PlaylistReachability(playlist_id=playlist_id, consumer_site_id=site_id)
+        for playlist_id, site_id in Playlist.objects.filter(
+            is_portable_to_playlist=True, deleted__isnull=True
+        ).values_list("id", "consumer_site_id")
+    ]
+    rows.extend(
+        PlaylistReachability(playlist_id=playlist_id)
+        for playlist_id in Playlist.objects.filter(
+            is_portable_to_consumer_site=True, deleted__isnull=True
+        ).values_list("id", flat=True)
+    )
+    rows.extend(
+        PlaylistReachability(
+            playlist_id=link.source_playlist_id,
+            consumer_site_id=link.target_playlist.consumer_site_id,
+            lti_id=link.target_playlist.lti_id,
+            playlist_portability_id=link.id,
+        )
+        for link in PlaylistPortability.objects.filter(
+            source_playlist__deleted__isnull=True
+        ).select_related("target_playlist")
+    )
+    for link in ConsumerSitePortability.objects.filter(
+        source_site__deleted__isnull=True
+    ):
+        rows.extend(
+            PlaylistReachability(
+                playlist_id=playlist_id,
+                consumer_site_id=link.target_site_id,
+                consumer_site_portability_id=link.id,
+            )
+            for playlist_id in Playlist.objects.filter(
+                consumer_site_id=link.source_site_id, deleted__isnull=True
+            ).values_list("id", flat=True)
+        )
+    PlaylistReachability.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_auto_20200603_0620"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlaylistReachability",
+            fields=[
+                ("deleted", models.DateTimeField(editable=False, null=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        help_text="primary key for the record as UUID",
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="id",
+                    ),
+                ),
+                (
+                    "created_on",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="date and time at which a record was created",
+                        verbose_name="created on",
+                    ),
+                ),
+                (
+                    "updated_on",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="date and time at which a record was last updated",
+                        verbose_name="updated on",
+                    ),
+                ),
+                (
+                    "lti_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="lti id of the playlist from which the resources are reachable.",
+                        max_length=255,
+                        null=True,
+                        verbose_name="lti id",
+                    ),
+                ),
+                (
+                    "consumer_site",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="consumer site from which the resources are reachable.",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reachable_playlists",
+                        to="core.ConsumerSite",
+                        verbose_name="consumer site",
+                    ),
+                ),
+                (
+                    "consumer_site_portability",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="consumer site portability from which the row is derived.",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reachability",
+                        to="core.ConsumerSitePortability",
+                        verbose_name="consumer site portability",
+                    ),
+                ),
+                (
+                    "playlist",
+                    models.ForeignKey(
+                        help_text="playlist of which the resources are reachable.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reachability",
+                        to="core.Playlist",
+                        verbose_name="playlist",
+                    ),
+                ),
+                (
+                    "playlist_portability",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="playlist portability from which the row is derived.",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reachability",
+                        to="core.PlaylistPortability",
+                        verbose_name="playlist portability",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "playlist reachability",
+                "verbose_name_plural": "playlist reachabilities",
+                "db_table": "playlist_reachability",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="playlistreachability",
+            index=models.Index(
+                fields=["playlist", "consumer_site", "lti_id"],
+                name="playlist_reachability_idx",
+            ),
+        ),
+        migrations.RunPython(
+            initialize_playlist_reachability, reverse_code=migrations.RunPython.noop
+        ),
+    ]
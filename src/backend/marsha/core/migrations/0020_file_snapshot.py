@@ -0,0 +1,36 @@
+# Generated by Django 3.0.7 on 2020-06-29 08:41
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_playlist_reachability"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="snapshot",
+            field=django.contrib.postgres.fields.jsonb.JSONField(
+                blank=True,
+                editable=False,
+                help_text="representation of the file served to LTI launches, without signed urls",
+                null=True,
+                verbose_name="snapshot",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="snapshot",
+            field=django.contrib.postgres.fields.jsonb.JSONField(
+                blank=True,
+                editable=False,
+                help_text="representation of the file served to LTI launches, without signed urls",
+                null=True,
+                verbose_name="snapshot",
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 3.0.7 on 2020-07-06 09:30
+
+import uuid
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_file_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedStateUpdate",
+            fields=[
+                ("deleted", models.DateTimeField(editable=False, null=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        help_text="primary key for the record as UUID",
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="id",
+                    ),
+                ),
+                (
+                    "created_on",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="date and time at which a record was created",
+                        verbose_name="created on",
+                    ),
+                ),
+                (
+                    "updated_on",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="date and time at which a record was last updated",
+                        verbose_name="updated on",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="key of the object in the source bucket.",
+                        max_length=255,
+                        verbose_name="key",
+                    ),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("processing", "processing"),
+                            ("error", "error"),
+                            ("ready", "ready"),
+                        ],
+                        help_text="new upload state of the object.",
+                        max_length=20,
+                        verbose_name="state",
+                    ),
+                ),
+                (
+                    "extra_parameters",
+                    django.contrib.postgres.fields.jsonb.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="arbitrary data sent by the AWS lambda.",
+                        verbose_name="extra parameters",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "queued state update",
+                "verbose_name_plural": "queued state updates",
+                "db_table": "queued_state_update",
+                "ordering": ["created_on", "id"],
+            },
+        ),
+    ]
@@ -4,3 +4,4 @@ from .account import *  # noqa isort:skip
 from .file import *  # noqa isort:skip
 from .playlist import *  # noqa isort:skip
 from .video import *  # noqa isort:skip
+from .update_state import *  # noqa isort:skip
@@ -7,12 +7,13 @@ checks and validation that go further than what Django is doing.
 import uuid
 
 from django.core import checks
-from django.db import models
+from django.db import models, router
+from django.db.models.signals import post_save, pre_save
 from django.utils.translation import gettext_lazy as _
 
 from safedelete.models import SOFT_DELETE_CASCADE, SafeDeleteModel
 
-from ..defaults import PENDING, STATE_CHOICES
+from ..defaults import PENDING, READY, STATE_CHOICES
 
 
 CHECKED_APPS = {"core"}
@@ -103,10 +104,96 @@ class BaseModel(SafeDeleteModel):
 
     # pylint: disable=signature-differs
     def save(self, *args, **kwargs):
-        """Enforce validation each time an instance is saved."""
-        self.full_clean()
+        """Enforce validation each time an instance is saved.
+
+        When ``update_fields`` is passed, only these fields are validated and written: the
+        other fields, and the uniqueness checks involving them, are skipped.
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.full_clean()
+        else:
+            self.clean_update_fields(update_fields)
         super().save(*args, **kwargs)
 
+    def clean_update_fields(self, update_fields):
+        """Validate some fields and the uniqueness checks only involving them.
+
+        Parameters
+        ----------
+        update_fields: Type[Iterable[string]]
+            The names of the fields to validate.
+
+        Raises
+        ------
+        ValidationError
+            Raised if any of the fields is not valid.
+
+        """
+        update_fields = set(update_fields)
+        self.full_clean(
+            exclude=[
+                field.name
+                for field in self._meta.concrete_fields
+                if field.name not in update_fields
+                and field.attname not in update_fields
+            ]
+        )
+
+    def save_if(self, condition, update_fields):
+        """Save some fields of an instance only if its row matches a condition.
+
+        The fields are validated like in ``save`` and written with a single
+        ``UPDATE ... WHERE id = %s AND <condition>`` query: the row is not read. The
+        ``pre_save`` signal is sent before the query but ``post_save`` is only sent if the row
+        was updated, so that nothing is invalidated when the row was left untouched.
+
+        Parameters
+        ----------
+        condition: Type[models.Q]
+            The condition the row must match to be updated.
+        update_fields: Type[Iterable[string]]
+            The names of the fields to write.
+
+        Returns
+        -------
+        boolean
+            True if the row was updated.
+
+        """
+        model = type(self)
+        update_fields = frozenset(update_fields)
+        using = router.db_for_write(model, instance=self)
+
+        self.clean_update_fields(update_fields)
+        pre_save.send(
+            sender=model,
+            instance=self,
+            raw=False,
+            using=using,
+            update_fields=update_fields,
+        )
+        # pylint: disable=protected-access
+        values = {
+            name: self._meta.get_field(name).pre_save(self, False)
+            for name in update_fields
+        }
+        updated = (
+            model._base_manager.using(using)
+            .filter(condition, pk=self.pk)
+            .update(**values)
+        )
+        if updated:
+            post_save.send(
+                sender=model,
+                instance=self,
+                created=False,
+                update_fields=update_fields,
+                raw=False,
+                using=using,
+            )
+        return bool(updated)
+
     @classmethod
     def _check_table_name(cls):
         """Check that the table name is correctly defined.
@@ -230,6 +317,51 @@ class BaseModel(SafeDeleteModel):
         return errors
 
 
+def get_upload_state_condition(upload_state, stamp):
+    """Build the condition for an upload state update to be a transition.
+
+    Lambdas may notify an update several times, or notify updates of a same upload out of
+    order. An update is not applied if a version of the file uploaded at the same time or
+    later is already ready, or if it would only set the upload state to its current value.
+
+    Parameters
+    ----------
+    upload_state: Type[string]
+        The upload state notified.
+    stamp: Type[DateTime]
+        The datetime at which the file the update is about was uploaded, from its key. If it is
+        not known, only updates setting the current upload state are skipped.
+
+    Returns
+    -------
+    models.Q
+        The condition the row of the object must match.
+
+    """
+    condition = models.Q()
+    if upload_state != READY:
+        condition &= ~models.Q(upload_state=upload_state)
+    if stamp:
+        condition &= models.Q(uploaded_on__isnull=True) | models.Q(
+            uploaded_on__lt=stamp
+        )
+    return condition
+
+
+def is_upload_state_transition(instance, upload_state, stamp):
+    """Evaluate ``get_upload_state_condition`` on an instance already fetched.
+
+    Returns
+    -------
+    boolean
+        True if the update should be applied to the instance.
+
+    """
+    if upload_state != READY and instance.upload_state == upload_state:
+        return False
+    return not (stamp and instance.uploaded_on and instance.uploaded_on >= stamp)
+
+
 class AbstractImage(BaseModel):
     """Abstract model for images."""
 
@@ -254,6 +386,30 @@ class AbstractImage(BaseModel):
 
         abstract = True
 
+    # pylint: disable=unused-argument
+    def set_upload_state(self, upload_state, uploaded_on, **extra_parameters):
+        """Set the fields related to the upload state without saving them.
+
+        See ``UploadableFileMixin.set_upload_state``.
+        """
+        self.upload_state = upload_state
+        if uploaded_on:
+            self.uploaded_on = uploaded_on
+            return {"upload_state", "uploaded_on"}
+        return {"upload_state"}
+
+    def update_upload_state(
+        self, upload_state, uploaded_on, stamp=None, **extra_parameters
+    ):
+        """Manage upload state.
+
+        See ``UploadableFileMixin.update_upload_state``.
+        """
+        fields = self.set_upload_state(upload_state, uploaded_on, **extra_parameters)
+        return self.save_if(
+            get_upload_state_condition(upload_state, stamp), fields | {"updated_on"}
+        )
+
     @property
     def is_ready_to_show(self):
         """Whether the file is ready to display (ie) has been sucessfully uploaded.
@@ -1,11 +1,12 @@
 """This module holds the model for files and derivated resources."""
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from ..defaults import PENDING, STATE_CHOICES
 from ..utils.time_utils import to_timestamp
 from .account import User
-from .base import BaseModel
+from .base import BaseModel, get_upload_state_condition
 from .playlist import Playlist
 
 
@@ -32,8 +33,8 @@ class UploadableFileMixin(models.Model):
         abstract = True
 
     # pylint: disable=unused-argument
-    def update_upload_state(self, upload_state, uploaded_on, **extra_parameters):
-        """Manage upload state.
+    def set_upload_state(self, upload_state, uploaded_on, **extra_parameters):
+        """Set the fields related to the upload state without saving them.
 
         Parameters
         ----------
@@ -45,12 +46,54 @@ class UploadableFileMixin(models.Model):
 
         extra_paramters: Type[Dict]
             Dictionnary containing arbitrary data sent from AWS lambda.
+
+        Returns
+        -------
+        set
+            The names of the fields that were set.
+
         """
         self.upload_state = upload_state
         if uploaded_on:
             self.uploaded_on = uploaded_on
+            return {"upload_state", "uploaded_on"}
+        return {"upload_state"}
+
+    def update_upload_state(
+        self, upload_state, uploaded_on, stamp=None, **extra_parameters
+    ):
+        """Manage upload state.
+
+        Only the fields set by ``set_upload_state`` are validated and written, in a single
+        UPDATE query that leaves the row untouched if the update is not a transition (see
+        ``get_upload_state_condition``).
+
+        Parameters
+        ----------
+        upload_state: Type[string]
+            state of the upload in AWS.
+
+        uploaded_on: Type[DateTime]
+            datetime at which the active version of the file was uploaded.
 
-        self.save()
+        stamp: Type[DateTime]
+            datetime at which the file the update is about was uploaded, whatever its state.
+
+        extra_paramters: Type[Dict]
+            Dictionnary containing arbitrary data sent from AWS lambda.
+
+        Returns
+        -------
+        boolean
+            True if the update was applied, False if it was a duplicate or an outdated update.
+
+        """
+        fields = self.set_upload_state(upload_state, uploaded_on, **extra_parameters)
+        fields.add("updated_on")
+        if hasattr(self, "snapshot"):
+            # Write the invalidation marker set before saving in the same query
+            fields.add("snapshot")
+        return self.save_if(get_upload_state_condition(upload_state, stamp), fields)
 
 
 class BaseFile(UploadableFileMixin, BaseModel):
@@ -104,6 +147,15 @@ class BaseFile(UploadableFileMixin, BaseModel):
         help_text=_("position of this file in the playlist"),
         default=0,
     )
+    snapshot = JSONField(
+        verbose_name=_("snapshot"),
+        help_text=_(
+            "representation of the file served to LTI launches, without signed urls"
+        ),
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         """Options for the ``File`` model."""
@@ -197,19 +249,12 @@ class Document(BaseFile):
             pk=self.pk, stamp=stamp, extension=extension
         )
 
-    def update_upload_state(self, upload_state, uploaded_on, **extra_parameters):
-        """Manage upload state.
+    def set_upload_state(self, upload_state, uploaded_on, **extra_parameters):
+        """Set the fields related to the upload state, including the extension of the file.
 
-        Parameters
-        ----------
-        upload_state: Type[string]
-            state of the upload in AWS.
-
-        uploaded_on: Type[DateTime]
-            datetime at which the active version of the file was uploaded.
-
-        extra_paramters: Type[Dict]
-            Dictionnary containing arbitrary data sent from AWS lambda.
+        See ``UploadableFileMixin.set_upload_state``.
         """
         self.extension = extra_parameters.get("extension")
-        super().update_upload_state(upload_state, uploaded_on, **extra_parameters)
+        return {"extension"} | super().set_upload_state(
+            upload_state, uploaded_on, **extra_parameters
+        )
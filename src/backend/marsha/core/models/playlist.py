@@ -156,6 +156,89 @@ class PlaylistPortability(BaseModel):
         return _("{source} is portable to {target}").format(**kwargs)
 
 
+class PlaylistReachability(BaseModel):
+    """Model materializing the LTI contexts from which the resources of a playlist are reachable.
+
+    Rows are derived from the portability flags of the playlist and from the
+    ``PlaylistPortability`` and ``ConsumerSitePortability`` links. They are never edited
+    directly but rebuilt each time one of these objects changes (see ``marsha.core.signals``).
+    Rows derived from a link reference it so that they are deleted along with it.
+
+    An empty consumer site or lti id means that the resources are reachable from any
+    consumer site or any playlist.
+    """
+
+    # rows are rebuilt from scratch so there is no point in keeping deleted ones
+    _safedelete_policy = HARD_DELETE
+
+    playlist = models.ForeignKey(
+        to=Playlist,
+        related_name="reachability",
+        verbose_name=_("playlist"),
+        help_text=_("playlist of which the resources are reachable."),
+        # row is (soft-)deleted if playlist is (soft-)deleted
+        on_delete=models.CASCADE,
+    )
+    consumer_site = models.ForeignKey(
+        to="ConsumerSite",
+        related_name="reachable_playlists",
+        verbose_name=_("consumer site"),
+        help_text=_("consumer site from which the resources are reachable."),
+        # row is (soft-)deleted if consumer site is (soft-)deleted
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    lti_id = models.CharField(
+        max_length=255,
+        verbose_name=_("lti id"),
+        help_text=_("lti id of the playlist from which the resources are reachable."),
+        null=True,
+        blank=True,
+    )
+    playlist_portability = models.ForeignKey(
+        to=PlaylistPortability,
+        related_name="reachability",
+        verbose_name=_("playlist portability"),
+        help_text=_("playlist portability from which the row is derived."),
+        # row is deleted if the portability link is deleted
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    consumer_site_portability = models.ForeignKey(
+        to="ConsumerSitePortability",
+        related_name="reachability",
+        verbose_name=_("consumer site portability"),
+        help_text=_("consumer site portability from which the row is derived."),
+        # row is deleted if the portability link is deleted
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        """Options for the ``PlaylistReachability`` model."""
+
+        db_table = "playlist_reachability"
+        verbose_name = _("playlist reachability")
+        verbose_name_plural = _("playlist reachabilities")
+        indexes = [
+            models.Index(
+                fields=["playlist", "consumer_site", "lti_id"],
+                name="playlist_reachability_idx",
+            )
+        ]
+
+    def __str__(self):
+        """Get the string representation of an instance."""
+        return _("{playlist} is reachable from {lti_id} on {consumer_site}").format(
+            playlist=self.playlist,
+            lti_id=self.lti_id or _("any playlist"),
+            consumer_site=self.consumer_site or _("any consumer site"),
+        )
+
+
 class PlaylistAccess(BaseModel):
     """
     Model representing accesses to playlists that are granted to users.
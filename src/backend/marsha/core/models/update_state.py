@@ -0,0 +1,50 @@
+"""This module holds the queue of upload state updates notified by the AWS lambdas."""
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from safedelete import HARD_DELETE
+
+from ..defaults import STATE_CHOICES
+from .base import BaseModel
+
+
+class QueuedStateUpdate(BaseModel):
+    """Model representing an upload state update waiting to be applied.
+
+    Updates are queued by the ``update_state`` view when ``UPDATE_STATE_QUEUE_ACTIVE`` is set,
+    and applied in batches by the ``process_state_updates`` management command.
+    """
+
+    # updates are deleted once applied, there is no point in keeping them
+    _safedelete_policy = HARD_DELETE
+
+    key = models.CharField(
+        max_length=255,
+        verbose_name=_("key"),
+        help_text=_("key of the object in the source bucket."),
+    )
+    state = models.CharField(
+        max_length=20,
+        verbose_name=_("state"),
+        help_text=_("new upload state of the object."),
+        choices=STATE_CHOICES,
+    )
+    extra_parameters = JSONField(
+        verbose_name=_("extra parameters"),
+        help_text=_("arbitrary data sent by the AWS lambda."),
+        default=dict,
+        blank=True,
+    )
+
+    class Meta:
+        """Options for the ``QueuedStateUpdate`` model."""
+
+        db_table = "queued_state_update"
+        ordering = ["created_on", "id"]
+        verbose_name = _("queued state update")
+        verbose_name_plural = _("queued state updates")
+
+    def __str__(self):
+        """Get the string representation of an instance."""
+        return f"{self.key}: {self.state}"
@@ -68,24 +68,16 @@ class Video(BaseFile):
         stamp = stamp or to_timestamp(self.uploaded_on)
         return "{pk!s}/video/{pk!s}/{stamp:s}".format(pk=self.pk, stamp=stamp)
 
-    def update_upload_state(self, upload_state, uploaded_on, **extra_parameters):
-        """Manage upload state.
+    def set_upload_state(self, upload_state, uploaded_on, **extra_parameters):
+        """Set the fields related to the upload state, including the resolutions of the video.
 
-        Parameters
-        ----------
-        upload_state: Type[string]
-            state of the upload in AWS.
-
-        uploaded_on: Type[DateTime]
-            datetime at which the active version of the file was uploaded.
-
-        extra_paramters: Type[Dict]
-            Dictionnary containing arbitrary data sent from AWS lambda.
+        See ``UploadableFileMixin.set_upload_state``.
         """
+        fields = super().set_upload_state(upload_state, uploaded_on, **extra_parameters)
         if "resolutions" in extra_parameters:
             self.resolutions = extra_parameters.get("resolutions")
-
-        super().update_upload_state(upload_state, uploaded_on, **extra_parameters)
+            fields.add("resolutions")
+        return fields
 
 
 class BaseTrack(UploadableFileMixin, BaseModel):
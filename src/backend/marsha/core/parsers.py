@@ -0,0 +1,46 @@
+"""Parsers of the Marsha API."""
+from django.conf import settings
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from . import renderers
+from .utils import json_utils
+
+
+class JSONParser(parsers.JSONParser):
+    """Parse JSON requests with ``json_utils``, which uses orjson when it is installed."""
+
+    renderer_class = renderers.JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the body of a request as JSON.
+
+        Parameters
+        ----------
+        stream: Type[file-like object]
+            The body of the request.
+        media_type: Type[string]
+            The media type of the request.
+        parser_context: Type[dictionary]
+            The context of the view, which gives the encoding of the request.
+
+        Raises
+        ------
+        ParseError
+            Raised if the body is not valid JSON.
+
+        Returns
+        -------
+        any
+            The decoded data.
+
+        """
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return json_utils.loads(stream.read())
+        except ValueError as error:
+            raise ParseError("JSON parse error - {!s}".format(error))
@@ -126,7 +126,7 @@ class BaseVideoRelatedPermission(BaseResourcePermission):
             The id of the video linked to the object passed as obj
 
         """
-        return obj.video.id
+        return obj.video_id
 
 
 class IsVideoRelatedInstructor(BaseVideoRelatedPermission):
@@ -0,0 +1,36 @@
+"""Renderers of the Marsha API."""
+from rest_framework import renderers
+
+from .utils import json_utils
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """Render API responses with ``json_utils``, which uses orjson when it is installed.
+
+    Pretty printed responses (e.g. for the browsable API) are still rendered by Django Rest
+    Framework.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into a compact JSON document.
+
+        Parameters
+        ----------
+        data: Type[any]
+            The data of the response.
+        accepted_media_type: Type[string]
+            The media type accepted by the client, which may ask for indentation.
+        renderer_context: Type[dictionary]
+            The context of the view, which may ask for indentation.
+
+        Returns
+        -------
+        bytes
+            The JSON document.
+
+        """
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return json_utils.dumps(data)
@@ -1,15 +1,13 @@
 """Define the structure of our API responses with Django Rest Framework serializers."""
-from datetime import timedelta
+import copy
 import re
 from urllib.parse import quote_plus
 import uuid
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.utils import timezone
 from django.utils.text import slugify
 
-from botocore.signers import CloudFrontSigner
 from rest_framework import serializers
 from rest_framework_simplejwt.models import TokenUser
 
@@ -34,6 +32,28 @@ KEY_PATTERN = (
 KEY_REGEX = re.compile(KEY_PATTERN)
 
 
+def to_active_stamp(value):
+    """Represent an upload datetime as ``TimestampField`` does.
+
+    Parameters
+    ----------
+    value: Type[datetime.datetime]
+        The datetime at which the active version of a file was uploaded
+
+    Returns
+    -------
+    string or `None`
+        Unix timestamp for the datetime value or `None`
+
+    """
+    return time_utils.to_timestamp(value) if value else None
+
+
+def to_string(value):
+    """Represent a value as ``serializers.CharField`` does, keeping `None` as is."""
+    return None if value is None else str(value)
+
+
 class TimestampField(serializers.DateTimeField):
     """A serializer field to serialize/deserialize a datetime to a Unix timestamp."""
 
@@ -80,7 +100,91 @@ class TimestampField(serializers.DateTimeField):
             raise ValidationError(error)
 
 
-class TimedTextTrackSerializer(serializers.ModelSerializer):
+class SignedUrlsMixin:
+    """Sign the CloudFront urls of the objects of a serializer.
+
+    When ``CLOUDFRONT_SIGNED_URLS_WILDCARD`` is active, a single custom policy covering all
+    the files of a resource ("https://<cloudfront>/<pk>/*") is signed and its signature is
+    shared, through the serializer context, by all the urls of the resource in the payload
+    (mp4 files, timed text tracks...). Otherwise, each url is signed with a canned policy.
+
+    When the serializer context sets ``signed_cookies`` to True, urls are left unsigned: LTI
+    views set signed cookies granting access to all the files of the resource when
+    ``CLOUDFRONT_SIGNED_COOKIES_ACTIVE`` is set. Payloads of the API are always signed as no
+    cookie is set with them.
+
+    Urls are also left unsigned when the serializer context sets ``sign_urls`` to False, to
+    build the snapshots of resources (see ``marsha.core.utils.snapshot_utils``). They are then
+    signed on top of the snapshot (see ``SignedSnapshotMixin``).
+    """
+
+    def sign_url(self, url, pk):
+        """Sign a CloudFront url.
+
+        Parameters
+        ----------
+        url : Type[string]
+            the url to sign
+        pk : Type[uuid.UUID]
+            the primary key of the resource (video or document) whose files the url points to
+
+        Returns
+        -------
+        string
+            The signed url.
+
+        """
+        if self.context.get("signed_cookies") or not self.context.get(
+            "sign_urls", True
+        ):
+            # Access is granted by the cookies set on LTI launch or urls are signed later
+            return url
+
+        if not settings.CLOUDFRONT_SIGNED_URLS_WILDCARD:
+            return cloudfront_utils.get_signed_url(url)
+
+        resource = "{protocol:s}://{cloudfront:s}/{pk!s}/*".format(
+            protocol=settings.AWS_S3_URL_PROTOCOL,
+            cloudfront=settings.CLOUDFRONT_DOMAIN,
+            pk=pk,
+        )
+        # The context is shared by all the serializers nested in the same payload
+        signed_queries = self.context.setdefault("cloudfront_signed_queries", {})
+        if resource not in signed_queries:
+            signed_queries[resource] = cloudfront_utils.get_signed_query(resource)
+        return cloudfront_utils.add_signed_query(url, signed_queries[resource])
+
+
+class SignedSnapshotMixin(SignedUrlsMixin):
+    """Sign the CloudFront urls of a resource on top of its snapshot.
+
+    Serializers of resources that have a snapshot (videos and documents) define
+    ``_sign_snapshot_urls`` to sign in place the urls of their representation, as they do
+    when they serialize an instance.
+    """
+
+    def sign_snapshot(self, data):
+        """Sign the urls of a representation serialized with unsigned urls.
+
+        Parameters
+        ----------
+        data : Type[dictionary]
+            the representation of a resource, as stored in its snapshot
+
+        Returns
+        -------
+        dictionary
+            A copy of the representation in which urls are signed if the functionality is
+            activated.
+
+        """
+        if not settings.CLOUDFRONT_SIGNED_URLS_ACTIVE:
+            return data
+        # pylint: disable=no-member
+        return self._sign_snapshot_urls(copy.deepcopy(data))
+
+
+class TimedTextTrackSerializer(SignedUrlsMixin, serializers.ModelSerializer):
     """Serializer to display a timed text track model."""
 
     class Meta:  # noqa
@@ -135,6 +239,38 @@ class TimedTextTrackSerializer(serializers.ModelSerializer):
             validated_data["video_id"] = user.id
         return super().create(validated_data)
 
+    def to_representation(self, instance):
+        """Serialize a timed text track without going through the fields of the serializer.
+
+        Binding the fields of a model serializer and dispatching to each of them costs more
+        than building the representation itself, so reads are flattened by hand. The result
+        must stay identical to what the fields would produce (see the parity tests in
+        ``test_serializers_representation``). Writes are still validated by the fields.
+
+        Parameters
+        ----------
+        instance : Type[models.TimedTextTrack]
+            The timed text track that we want to serialize
+
+        Returns
+        -------
+        dictionary
+            The representation of the timed text track.
+
+        """
+        if not isinstance(instance, TimedTextTrack):
+            return super().to_representation(instance)
+        return {
+            "active_stamp": to_active_stamp(instance.uploaded_on),
+            "id": str(instance.pk),
+            "is_ready_to_show": bool(instance.is_ready_to_show),
+            "mode": instance.mode,
+            "language": instance.language,
+            "upload_state": instance.upload_state,
+            "url": self.get_url(instance),
+            "video": to_string(instance.video_id),
+        }
+
     def get_url(self, obj):
         """Url of the timed text track, signed with a CloudFront key if activated.
 
@@ -155,7 +291,7 @@ class TimedTextTrackSerializer(serializers.ModelSerializer):
             base = "{protocol:s}://{cloudfront:s}/{video!s}".format(
                 protocol=settings.AWS_S3_URL_PROTOCOL,
                 cloudfront=settings.CLOUDFRONT_DOMAIN,
-                video=obj.video.pk,
+                video=obj.video_id,
             )
             url = "{base:s}/timedtext/{stamp:s}_{language:s}{mode:s}.vtt".format(
                 base=base,
@@ -166,15 +302,7 @@ class TimedTextTrackSerializer(serializers.ModelSerializer):
 
             # Sign the url only if the functionality is activated
             if settings.CLOUDFRONT_SIGNED_URLS_ACTIVE:
-                date_less_than = timezone.now() + timedelta(
-                    seconds=settings.CLOUDFRONT_SIGNED_URLS_VALIDITY
-                )
-                cloudfront_signer = CloudFrontSigner(
-                    settings.CLOUDFRONT_ACCESS_KEY_ID, cloudfront_utils.rsa_signer
-                )
-                url = cloudfront_signer.generate_presigned_url(
-                    url, date_less_than=date_less_than
-                )
+                url = self.sign_url(url, obj.video_id)
             return url
         return None
 
@@ -231,6 +359,33 @@ class ThumbnailSerializer(serializers.ModelSerializer):
             validated_data["video_id"] = user.id
         return super().create(validated_data)
 
+    def to_representation(self, instance):
+        """Serialize a thumbnail without going through the fields of the serializer.
+
+        See ``TimedTextTrackSerializer.to_representation``.
+
+        Parameters
+        ----------
+        instance : Type[models.Thumbnail]
+            The thumbnail that we want to serialize
+
+        Returns
+        -------
+        dictionary
+            The representation of the thumbnail.
+
+        """
+        if not isinstance(instance, Thumbnail):
+            return super().to_representation(instance)
+        return {
+            "active_stamp": to_active_stamp(instance.uploaded_on),
+            "id": str(instance.pk),
+            "is_ready_to_show": bool(instance.is_ready_to_show),
+            "upload_state": instance.upload_state,
+            "urls": self.get_urls(instance),
+            "video": to_string(instance.video_id),
+        }
+
     def get_urls(self, obj):
         """Urls of the thumbnail.
 
@@ -250,7 +405,7 @@ class ThumbnailSerializer(serializers.ModelSerializer):
             base = "{protocol:s}://{cloudfront:s}/{video!s}".format(
                 protocol=settings.AWS_S3_URL_PROTOCOL,
                 cloudfront=settings.CLOUDFRONT_DOMAIN,
-                video=obj.video.pk,
+                video=obj.video_id,
             )
             urls = {}
             for resolution in settings.VIDEO_RESOLUTIONS:
@@ -265,7 +420,7 @@ class ThumbnailSerializer(serializers.ModelSerializer):
         return None
 
 
-class VideoSerializer(serializers.ModelSerializer):
+class VideoSerializer(SignedSnapshotMixin, serializers.ModelSerializer):
     """Serializer to display a video model with all its resolution options."""
 
     class Meta:  # noqa
@@ -304,6 +459,88 @@ class VideoSerializer(serializers.ModelSerializer):
     is_ready_to_show = serializers.BooleanField(read_only=True)
     has_transcript = serializers.SerializerMethodField()
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Fetch the objects related to the videos of a queryset along with them.
+
+        A video is then serialized with a fixed number of queries whatever its number of
+        timed text tracks.
+
+        Parameters
+        ----------
+        queryset : Type[django.db.models.QuerySet]
+            a queryset of videos
+
+        Returns
+        -------
+        Type[django.db.models.QuerySet]
+            The queryset fetching the playlist, the thumbnail and the timed text tracks of
+            each video.
+
+        """
+        return queryset.select_related("playlist", "thumbnail").prefetch_related(
+            "timedtexttracks"
+        )
+
+    def to_representation(self, instance):
+        """Serialize a video without going through the fields of the serializer.
+
+        See ``TimedTextTrackSerializer.to_representation``. Nested serializers share the
+        context of this one, as bound fields do.
+
+        Parameters
+        ----------
+        instance : Type[models.Video]
+            The video that we want to serialize
+
+        Returns
+        -------
+        dictionary
+            The representation of the video, its timed text tracks and its thumbnail.
+
+        """
+        if not isinstance(instance, Video):
+            return super().to_representation(instance)
+
+        try:
+            thumbnail = instance.thumbnail
+        except Thumbnail.DoesNotExist:
+            thumbnail = None
+        track_serializer = TimedTextTrackSerializer(context=self.context)
+        return {
+            "active_stamp": to_active_stamp(instance.uploaded_on),
+            "description": to_string(instance.description),
+            "id": str(instance.pk),
+            "is_ready_to_show": bool(instance.is_ready_to_show),
+            "timed_text_tracks": [
+                track_serializer.to_representation(track)
+                for track in instance.timedtexttracks.all()
+            ],
+            "thumbnail": None
+            if thumbnail is None
+            else ThumbnailSerializer(context=self.context).to_representation(thumbnail),
+            "title": to_string(instance.title),
+            "upload_state": instance.upload_state,
+            "urls": self.get_urls(instance),
+            "show_download": bool(instance.show_download),
+            "should_use_subtitle_as_transcript": bool(
+                instance.should_use_subtitle_as_transcript
+            ),
+            "has_transcript": self.get_has_transcript(instance),
+        }
+
+    def _sign_snapshot_urls(self, data):
+        """Sign the urls of the mp4 files and timed text tracks of a video."""
+        for track in data["timed_text_tracks"]:
+            if track["url"] is not None:
+                track["url"] = self.sign_url(track["url"], data["id"])
+        if data["urls"] is not None:
+            data["urls"]["mp4"] = {
+                resolution: self.sign_url(url, data["id"])
+                for resolution, url in data["urls"]["mp4"].items()
+            }
+        return data
+
     def get_has_transcript(self, obj):
         """Compute if should_use_subtitle_as_transcript behavior is disabled.
 
@@ -318,7 +555,11 @@ class VideoSerializer(serializers.ModelSerializer):
             If there is at least one transcript ready to be shown the method will return True.
             Returns False otherwise.
         """
-        return obj.timedtexttracks.filter(mode="ts", uploaded_on__isnull=False).exists()
+        # Computed from the tracks prefetched for the "timed_text_tracks" field
+        return any(
+            track.mode == TimedTextTrack.TRANSCRIPT and track.uploaded_on is not None
+            for track in obj.timedtexttracks.all()
+        )
 
     def get_urls(self, obj):
         """Urls of the video for each type of encoding.
@@ -361,10 +602,6 @@ class VideoSerializer(serializers.ModelSerializer):
         )
         stamp = time_utils.to_timestamp(obj.uploaded_on)
 
-        date_less_than = timezone.now() + timedelta(
-            seconds=settings.CLOUDFRONT_SIGNED_URLS_VALIDITY
-        )
-        stamp = time_utils.to_timestamp(obj.uploaded_on)
         filename = "{playlist_title:s}_{stamp:s}.mp4".format(
             playlist_title=slugify(obj.playlist.title), stamp=stamp
         )
@@ -390,12 +627,7 @@ class VideoSerializer(serializers.ModelSerializer):
 
             # Sign the urls of mp4 videos only if the functionality is activated
             if settings.CLOUDFRONT_SIGNED_URLS_ACTIVE:
-                cloudfront_signer = CloudFrontSigner(
-                    settings.CLOUDFRONT_ACCESS_KEY_ID, cloudfront_utils.rsa_signer
-                )
-                mp4_url = cloudfront_signer.generate_presigned_url(
-                    mp4_url, date_less_than=date_less_than
-                )
+                mp4_url = self.sign_url(mp4_url, obj.pk)
 
             urls["mp4"][resolution] = mp4_url
 
@@ -422,12 +654,17 @@ class UpdateStateSerializer(serializers.Serializer):
     )
     extraParameters = serializers.DictField()
 
-    def get_key_elements(self):
-        """Use a regex to parse elements from the key."""
-        elements = KEY_REGEX.match(self.validated_data["key"]).groupdict()
+    @staticmethod
+    def parse_key(key):
+        """Use a regex to parse elements from a key, e.g. validated with ``many=True``."""
+        elements = KEY_REGEX.match(key).groupdict()
         elements["uploaded_on"] = time_utils.to_datetime(elements["stamp"])
         return elements
 
+    def get_key_elements(self):
+        """Use a regex to parse elements from the key."""
+        return self.parse_key(self.validated_data["key"])
+
 
 class InitiateUploadSerializer(serializers.Serializer):
     """A serializer to validate data submitted on the initiate-upload API endoint."""
@@ -471,7 +708,7 @@ class XAPIStatementSerializer(serializers.Serializer):
         return attrs
 
 
-class DocumentSerializer(serializers.ModelSerializer):
+class DocumentSerializer(SignedSnapshotMixin, serializers.ModelSerializer):
     """A serializer to display a Document resource."""
 
     class Meta:  # noqa
@@ -504,6 +741,59 @@ class DocumentSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
     is_ready_to_show = serializers.BooleanField(read_only=True)
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Fetch the playlist of the documents of a queryset, used in their filename.
+
+        Parameters
+        ----------
+        queryset : Type[django.db.models.QuerySet]
+            a queryset of documents
+
+        Returns
+        -------
+        Type[django.db.models.QuerySet]
+            The queryset fetching the playlist of each document.
+
+        """
+        return queryset.select_related("playlist")
+
+    def to_representation(self, instance):
+        """Serialize a document without going through the fields of the serializer.
+
+        See ``TimedTextTrackSerializer.to_representation``.
+
+        Parameters
+        ----------
+        instance : Type[models.Document]
+            The document that we want to serialize
+
+        Returns
+        -------
+        dictionary
+            The representation of the document.
+
+        """
+        if not isinstance(instance, Document):
+            return super().to_representation(instance)
+        return {
+            "active_stamp": to_active_stamp(instance.uploaded_on),
+            "extension": to_string(instance.extension),
+            "filename": self.get_filename(instance),
+            "id": str(instance.pk),
+            "is_ready_to_show": bool(instance.is_ready_to_show),
+            "title": to_string(instance.title),
+            "upload_state": instance.upload_state,
+            "url": self.get_url(instance),
+            "show_download": bool(instance.show_download),
+        }
+
+    def _sign_snapshot_urls(self, data):
+        """Sign the url of a document."""
+        if data["url"] is not None:
+            data["url"] = self.sign_url(data["url"], data["id"])
+        return data
+
     def _get_extension_string(self, obj):
         """Document extension with the leading dot.
 
@@ -575,15 +865,7 @@ class DocumentSerializer(serializers.ModelSerializer):
 
         # Sign the document urls only if the functionality is activated
         if settings.CLOUDFRONT_SIGNED_URLS_ACTIVE:
-            date_less_than = timezone.now() + timedelta(
-                seconds=settings.CLOUDFRONT_SIGNED_URLS_VALIDITY
-            )
-            cloudfront_signer = CloudFrontSigner(
-                settings.CLOUDFRONT_ACCESS_KEY_ID, cloudfront_utils.rsa_signer
-            )
-            url = cloudfront_signer.generate_presigned_url(
-                url, date_less_than=date_less_than
-            )
+            url = self.sign_url(url, obj.pk)
 
         return url
 
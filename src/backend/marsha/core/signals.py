@@ -0,0 +1,260 @@
+"""Signal receivers of the ``core`` app of the Marsha project."""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .lti.passports import invalidate_passports
+from .lti.portability import (
+    update_consumer_site_reachability,
+    update_playlist_reachability,
+)
+from .models import (
+    AudioTrack,
+    ConsumerSite,
+    ConsumerSitePortability,
+    Document,
+    LTIPassport,
+    Playlist,
+    PlaylistPortability,
+    SignTrack,
+    Thumbnail,
+    TimedTextTrack,
+    Video,
+)
+from .utils.cache_utils import (
+    CONSUMER_SITE_VERSION,
+    RESOURCE_VERSION,
+    invalidate_versions,
+)
+from .utils.snapshot_utils import (
+    get_invalidation_marker,
+    invalidate_snapshots,
+    refresh_snapshots_on_commit,
+)
+
+
+# pylint: disable=unused-argument
+
+
+@receiver(post_save, sender=LTIPassport)
+@receiver(post_delete, sender=LTIPassport)
+@receiver(post_save, sender=ConsumerSite)
+@receiver(post_delete, sender=ConsumerSite)
+@receiver(post_save, sender=Playlist)
+@receiver(post_delete, sender=Playlist)
+def invalidate_passports_cache(sender, **kwargs):
+    """Invalidate cached passports when a passport or the object it is scoped to changes."""
+    invalidate_passports()
+
+
+@receiver(post_save, sender=Playlist)
+def update_reachability_on_playlist_save(sender, instance, created, **kwargs):
+    """Rebuild the reachability of a playlist and of the playlists linked to it.
+
+    Linked playlists are reachable from the lti id and the consumer site of this playlist,
+    which may just have changed.
+    """
+    playlist_ids = {instance.id}
+    if not created:
+        playlist_ids.update(
+            PlaylistPortability.objects.filter(target_playlist=instance).values_list(
+                "source_playlist_id", flat=True
+            )
+        )
+    update_playlist_reachability(playlist_ids)
+
+
+@receiver(post_save, sender=PlaylistPortability)
+def update_reachability_on_playlist_portability_save(sender, instance, **kwargs):
+    """Rebuild the reachability of the source playlist of a portability link."""
+    update_playlist_reachability([instance.source_playlist_id])
+
+
+@receiver(post_save, sender=ConsumerSitePortability)
+def update_reachability_on_consumer_site_portability_save(sender, instance, **kwargs):
+    """Rebuild the reachability of the playlists in the source site of a portability link."""
+    update_consumer_site_reachability([instance.source_site_id])
+
+
+@receiver(m2m_changed, sender=Playlist.portable_to.through)
+def update_reachability_on_playlist_portable_to_add(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Rebuild the reachability of playlists linked with ``Playlist.portable_to.add``.
+
+    Links added in bulk are not saved one by one so they don't send the ``post_save`` signal.
+    Removed links don't need to be handled: rows derived from them are deleted in cascade.
+    """
+    if action == "post_add":
+        update_playlist_reachability(pk_set if reverse else [instance.id])
+
+
+@receiver(m2m_changed, sender=ConsumerSite.portable_to.through)
+def update_reachability_on_consumer_site_portable_to_add(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Rebuild the reachability of playlists in sites linked with ``ConsumerSite.portable_to.add``.
+
+    Links added in bulk are not saved one by one so they don't send the ``post_save`` signal.
+    Removed links don't need to be handled: rows derived from them are deleted in cascade.
+    """
+    if action == "post_add":
+        update_consumer_site_reachability(pk_set if reverse else [instance.id])
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalidate_resource_cache(sender, instance, **kwargs):
+    """Invalidate the data cached for a resource (e.g. the app data of LTI views)."""
+    invalidate_versions(RESOURCE_VERSION.format(model=sender.__name__, pk=instance.pk))
+
+
+@receiver(post_save, sender=AudioTrack)
+@receiver(post_delete, sender=AudioTrack)
+@receiver(post_save, sender=SignTrack)
+@receiver(post_delete, sender=SignTrack)
+@receiver(post_save, sender=TimedTextTrack)
+@receiver(post_delete, sender=TimedTextTrack)
+@receiver(post_save, sender=Thumbnail)
+@receiver(post_delete, sender=Thumbnail)
+def invalidate_video_cache(sender, instance, **kwargs):
+    """Invalidate the data cached for the video of a track or a thumbnail."""
+    invalidate_versions(
+        RESOURCE_VERSION.format(model=Video.__name__, pk=instance.video_id)
+    )
+
+
+def invalidate_playlists_cache(playlist_ids):
+    """Invalidate the data cached for the resources of some playlists.
+
+    Parameters
+    ----------
+    playlist_ids: Type[Iterable[uuid.UUID]]
+        The ids of the playlists.
+
+    """
+    names = [
+        RESOURCE_VERSION.format(model=model.__name__, pk=pk)
+        for model in (Video, Document)
+        for pk in model.all_objects.filter(playlist_id__in=playlist_ids).values_list(
+            "pk", flat=True
+        )
+    ]
+    if names:
+        invalidate_versions(*names)
+
+
+@receiver(post_save, sender=Playlist)
+@receiver(post_delete, sender=Playlist)
+def invalidate_playlist_cache(sender, instance, created=False, **kwargs):
+    """Invalidate the data cached for the resources a playlist change may make reachable or not.
+
+    These are the resources of the playlist and of the playlists portable to it. Creating a
+    playlist can't change the reachability of existing resources.
+    """
+    if not created:
+        playlist_ids = {instance.id}
+        playlist_ids.update(
+            PlaylistPortability.all_objects.filter(
+                target_playlist=instance
+            ).values_list("source_playlist_id", flat=True)
+        )
+        invalidate_playlists_cache(playlist_ids)
+
+
+@receiver(post_save, sender=PlaylistPortability)
+@receiver(post_delete, sender=PlaylistPortability)
+def invalidate_playlist_portability_cache(sender, instance, **kwargs):
+    """Invalidate the data cached for the resources of the source playlist of a link."""
+    invalidate_playlists_cache([instance.source_playlist_id])
+
+
+@receiver(m2m_changed, sender=Playlist.portable_to.through)
+def invalidate_playlist_portable_to_cache(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Invalidate the data cached for the resources of playlists linked or unlinked in bulk."""
+    if action in ("post_add", "post_remove"):
+        invalidate_playlists_cache(pk_set if reverse else [instance.id])
+    elif action == "pre_clear":
+        invalidate_playlists_cache(
+            instance.reachable_from.values_list("id", flat=True)
+            if reverse
+            else [instance.id]
+        )
+
+
+@receiver(post_save, sender=ConsumerSite)
+@receiver(post_delete, sender=ConsumerSite)
+def invalidate_consumer_site_cache(sender, instance, created=False, **kwargs):
+    """Invalidate the data cached for the launches from a consumer site."""
+    if not created:
+        invalidate_versions(CONSUMER_SITE_VERSION.format(pk=instance.pk))
+
+
+@receiver(post_save, sender=ConsumerSitePortability)
+@receiver(post_delete, sender=ConsumerSitePortability)
+def invalidate_consumer_site_portability_cache(sender, instance, **kwargs):
+    """Invalidate the data cached for the launches from the target site of a link.
+
+    Resources of the source site may become reachable or not from the target site.
+    """
+    invalidate_versions(CONSUMER_SITE_VERSION.format(pk=instance.target_site_id))
+
+
+@receiver(m2m_changed, sender=ConsumerSite.portable_to.through)
+def invalidate_consumer_site_portable_to_cache(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Invalidate the data cached for the launches from sites linked or unlinked in bulk."""
+    if action in ("post_add", "post_remove"):
+        site_ids = [instance.id] if reverse else pk_set
+    elif action == "pre_clear":
+        site_ids = (
+            [instance.id]
+            if reverse
+            else instance.portable_to.values_list("id", flat=True)
+        )
+    else:
+        return
+    invalidate_versions(*[CONSUMER_SITE_VERSION.format(pk=pk) for pk in site_ids])
+
+
+@receiver(pre_save, sender=Video)
+@receiver(pre_save, sender=Document)
+def invalidate_resource_snapshot(sender, instance, **kwargs):
+    """Replace the snapshot of a resource by an invalidation marker saved along with it."""
+    instance.snapshot = get_invalidation_marker()
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_save, sender=Document)
+def refresh_resource_snapshot(sender, instance, update_fields=None, **kwargs):
+    """Rebuild the snapshot of a resource once the transaction is committed.
+
+    The marker set before saving is not written if the snapshot is not among the updated
+    fields: the snapshot is then invalidated with a separate query.
+    """
+    resources = sender.all_objects.filter(pk=instance.pk)
+    if update_fields is not None and "snapshot" not in update_fields:
+        invalidate_snapshots(resources)
+    else:
+        refresh_snapshots_on_commit(resources, instance.snapshot)
+
+
+@receiver(post_save, sender=TimedTextTrack)
+@receiver(post_delete, sender=TimedTextTrack)
+@receiver(post_save, sender=Thumbnail)
+@receiver(post_delete, sender=Thumbnail)
+def invalidate_video_snapshot(sender, instance, **kwargs):
+    """Invalidate the snapshot of the video of a timed text track or a thumbnail."""
+    invalidate_snapshots(Video.all_objects.filter(pk=instance.video_id))
+
+
+@receiver(post_save, sender=Playlist)
+def invalidate_playlist_snapshots(sender, instance, created, **kwargs):
+    """Invalidate the snapshots of the resources of a playlist, their filenames use its title."""
+    if not created:
+        invalidate_snapshots(Video.all_objects.filter(playlist=instance))
+        invalidate_snapshots(Document.all_objects.filter(playlist=instance))
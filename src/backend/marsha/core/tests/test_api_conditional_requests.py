@@ -0,0 +1,197 @@
+"""Test conditional GET requests on the resource API endpoints."""
+from datetime import datetime, timedelta
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+
+import pytz
+from rest_framework_simplejwt.tokens import AccessToken
+from safedelete.models import HARD_DELETE
+
+from ..factories import (
+    DocumentFactory,
+    ThumbnailFactory,
+    TimedTextTrackFactory,
+    VideoFactory,
+)
+from ..models import Video
+from .test_utils_cloudfront_utils import write_private_key
+
+
+@override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False)
+class ConditionalRequestsAPITest(TestCase):
+    """Test the ETag and Last-Modified headers of videos, documents, tracks and thumbnails."""
+
+    def get(self, url, resource_id, **headers):
+        """Get an object of the API as an instructor of a resource."""
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(resource_id)
+        jwt_token.payload["roles"] = ["instructor"]
+        jwt_token.payload["permissions"] = {"can_update": True}
+        return self.client.get(
+            url, HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token), **headers
+        )
+
+    def assert_not_modified(self, url, resource_id, etag):
+        """Assert that an object is not serialized again if its ETag did not change."""
+        with self.assertNumQueries(1):
+            response = self.get(url, resource_id, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_api_conditional_requests_video(self):
+        """The ETag of a video should change with the video, its tracks and its thumbnail."""
+        video = VideoFactory(
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+            upload_state="ready",
+            resolutions=[144],
+        )
+        track = TimedTextTrackFactory(video=video, language="fr")
+        url = "/api/videos/{!s}/".format(video.id)
+
+        response = self.get(url, video.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Last-Modified"], http_date(track.updated_on.timestamp())
+        )
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        etags = [response["ETag"]]
+        self.assert_not_modified(url, video.id, etags[-1])
+
+        # Each change of the representation should give a new ETag
+        for change in [
+            lambda: TimedTextTrackFactory(video=video, language="en"),
+            lambda: ThumbnailFactory(video=video),
+            lambda: track.delete(),
+            lambda: track.delete(force_policy=HARD_DELETE),
+            lambda: Video.objects.get(pk=video.pk).save(),
+        ]:
+            change()
+            response = self.get(url, video.id, HTTP_IF_NONE_MATCH=etags[-1])
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(response["ETag"], etags)
+            etags.append(response["ETag"])
+            self.assert_not_modified(url, video.id, etags[-1])
+
+    def test_api_conditional_requests_if_modified_since(self):
+        """A video should not be serialized again if it was not updated since a date."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/".format(video.id)
+        last_modified = self.get(url, video.id)["Last-Modified"]
+
+        with self.assertNumQueries(1):
+            response = self.get(url, video.id, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        Video.objects.filter(pk=video.pk).update(
+            updated_on=video.updated_on + timedelta(seconds=2)
+        )
+        response = self.get(url, video.id, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["Last-Modified"], last_modified)
+
+    def test_api_conditional_requests_document_playlist(self):
+        """The ETag of a document should change with the title of its playlist."""
+        document = DocumentFactory(
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc), extension="pdf"
+        )
+        url = "/api/documents/{!s}/".format(document.id)
+        etag = self.get(url, document.id)["ETag"]
+        self.assert_not_modified(url, document.id, etag)
+
+        document.playlist.title = "new title"
+        document.playlist.save()
+
+        response = self.get(url, document.id, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            response.json()["filename"],
+            "new-title_{:s}.pdf".format(document.title.replace(" ", "-").lower()),
+        )
+
+    def test_api_conditional_requests_video_playlist(self):
+        """The ETag of a video should change with the title of its playlist."""
+        video = VideoFactory(
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+            upload_state="ready",
+            resolutions=[144],
+        )
+        url = "/api/videos/{!s}/".format(video.id)
+        etag = self.get(url, video.id)["ETag"]
+        self.assert_not_modified(url, video.id, etag)
+
+        video.playlist.title = "new title"
+        video.playlist.save()
+
+        response = self.get(url, video.id, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(
+            "filename%3Dnew-title_1533686400.mp4", response.json()["urls"]["mp4"]["144"]
+        )
+
+    def test_api_conditional_requests_video_related(self):
+        """Timed text tracks and thumbnails should answer conditional requests."""
+        video = VideoFactory()
+        for url in [
+            "/api/timedtexttracks/{!s}/".format(TimedTextTrackFactory(video=video).id),
+            "/api/thumbnails/{!s}/".format(ThumbnailFactory(video=video).id),
+        ]:
+            response = self.get(url, video.id)
+            self.assertEqual(response.status_code, 200)
+            self.assert_not_modified(url, video.id, response["ETag"])
+
+    def test_api_conditional_requests_permissions(self):
+        """Conditional requests should not bypass permissions."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/".format(video.id)
+        etag = self.get(url, video.id)["ETag"]
+
+        response = self.get(url, VideoFactory().id, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+    def test_api_conditional_requests_signed_urls(self):
+        """The ETag of a video should change with the signature of its urls."""
+        video = VideoFactory(
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+            upload_state="ready",
+            resolutions=[144],
+        )
+        url = "/api/videos/{!s}/".format(video.id)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "cloudfront_private_key")
+        write_private_key(path)
+        now = datetime(2020, 6, 8, 12, 1, tzinfo=pytz.utc)
+
+        try:
+            with override_settings(
+                CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+                CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+                CLOUDFRONT_PRIVATE_KEY_PATH=path,
+                CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET=600,
+            ):
+                with mock.patch.object(timezone, "now", return_value=now):
+                    etag = self.get(url, video.id)["ETag"]
+
+                # Urls signed during the same bucket are identical
+                with mock.patch.object(
+                    timezone, "now", return_value=now + timedelta(minutes=8)
+                ):
+                    self.assert_not_modified(url, video.id, etag)
+
+                with mock.patch.object(
+                    timezone, "now", return_value=now + timedelta(minutes=10)
+                ):
+                    response = self.get(url, video.id, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+        finally:
+            shutil.rmtree(directory)
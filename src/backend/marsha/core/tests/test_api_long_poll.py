@@ -0,0 +1,146 @@
+"""Test waiting for a change of a resource on the API instead of polling it."""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..defaults import PENDING, PROCESSING
+from ..factories import TimedTextTrackFactory, VideoFactory
+from ..utils import long_poll_utils
+
+
+@override_settings(
+    CLOUDFRONT_SIGNED_URLS_ACTIVE=False,
+    LONG_POLL_TIMEOUT=1,
+    LONG_POLL_INTERVAL=0.01,
+    LONG_POLL_MAX_WAITERS=1,
+)
+class LongPollAPITest(TestCase):
+    """Test the wait endpoint of the API objects."""
+
+    def setUp(self):
+        """Clear the versions of resources left in the cache by other tests.
+
+        The local memory cache of the tests stands for a cache shared by all the processes.
+        """
+        super().setUp()
+        cache.clear()
+        patcher = mock.patch.object(
+            long_poll_utils, "is_cache_shared", return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait(self, url, resource_id, etag):
+        """Wait for an object of the API to change, as an instructor of a resource."""
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(resource_id)
+        jwt_token.payload["roles"] = ["instructor"]
+        jwt_token.payload["permissions"] = {"can_update": True}
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(
+            url, HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token), **headers
+        )
+
+    def test_api_long_poll_changed(self):
+        """The new representation should be returned as soon as the object changes."""
+        video = VideoFactory(upload_state=PENDING)
+        url = "/api/videos/{!s}/wait/".format(video.id)
+        etag = self.wait(url, video.id, None)["ETag"]
+
+        def transcode(seconds):
+            # update_state recording a transition while the request is waiting
+            video.upload_state = PROCESSING
+            video.save()
+
+        with mock.patch.object(
+            long_poll_utils.time, "sleep", side_effect=transcode
+        ) as mock_sleep:
+            response = self.wait(url, video.id, etag)
+
+        mock_sleep.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["upload_state"], PROCESSING)
+
+    def test_api_long_poll_track_changed(self):
+        """Waiting on a timed text track should return when the track changes."""
+        track = TimedTextTrackFactory(upload_state=PENDING)
+        url = "/api/timedtexttracks/{!s}/wait/".format(track.id)
+        etag = self.wait(url, track.video_id, None)["ETag"]
+
+        def transcode(seconds):
+            track.upload_state = PROCESSING
+            track.save()
+
+        with mock.patch.object(long_poll_utils.time, "sleep", side_effect=transcode):
+            response = self.wait(url, track.video_id, etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["upload_state"], PROCESSING)
+
+    def test_api_long_poll_timeout(self):
+        """The request should be answered with 304 Not Modified once the timeout is reached."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/wait/".format(video.id)
+        etag = self.wait(url, video.id, None)["ETag"]
+
+        # A single query: the cache is polled while waiting
+        with self.assertNumQueries(1):
+            response = self.wait(url, video.id, etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(long_poll_utils.waiter_limit.count, 0)
+
+    def test_api_long_poll_outdated(self):
+        """A client with an outdated representation should not wait."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/wait/".format(video.id)
+
+        with mock.patch.object(long_poll_utils.time, "sleep") as mock_sleep:
+            response = self.wait(url, video.id, '"outdated"')
+
+        mock_sleep.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_long_poll_max_waiters(self):
+        """Requests should not wait when too many are already waiting in the process."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/wait/".format(video.id)
+        etag = self.wait(url, video.id, None)["ETag"]
+
+        self.assertTrue(long_poll_utils.waiter_limit.acquire())
+        try:
+            with mock.patch.object(long_poll_utils.time, "sleep") as mock_sleep:
+                response = self.wait(url, video.id, etag)
+        finally:
+            long_poll_utils.waiter_limit.release()
+
+        mock_sleep.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_long_poll_local_cache(self):
+        """Requests should not wait for a change other processes could not signal."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/wait/".format(video.id)
+        etag = self.wait(url, video.id, None)["ETag"]
+
+        with mock.patch.object(
+            long_poll_utils, "is_cache_shared", return_value=False
+        ), mock.patch.object(long_poll_utils.time, "sleep") as mock_sleep:
+            response = self.wait(url, video.id, etag)
+
+        mock_sleep.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(long_poll_utils.waiter_limit.count, 0)
+
+    def test_api_long_poll_permissions(self):
+        """Waiting on the object of another resource should be forbidden."""
+        video = VideoFactory()
+        url = "/api/videos/{!s}/wait/".format(video.id)
+
+        response = self.wait(url, VideoFactory().id, None)
+        self.assertEqual(response.status_code, 403)
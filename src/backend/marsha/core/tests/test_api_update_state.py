@@ -1,12 +1,21 @@
 """Tests for the upload & processing state update API of the Marsha project."""
 from datetime import datetime
+import hashlib
+import hmac
 import json
 
 from django.test import TestCase, override_settings
 
 import pytz
 
-from ..factories import DocumentFactory, TimedTextTrackFactory, VideoFactory
+from ..factories import (
+    DocumentFactory,
+    ThumbnailFactory,
+    TimedTextTrackFactory,
+    VideoFactory,
+)
+from ..models import QueuedStateUpdate
+from ..utils.cache_utils import RESOURCE_VERSION, get_versions
 
 
 class UpdateStateAPITest(TestCase):
@@ -121,6 +130,102 @@ class UpdateStateAPITest(TestCase):
         )
         self.assertEqual(timed_text_track.upload_state, "ready")
 
+    @override_settings(UPDATE_STATE_SHARED_SECRETS=["shared secret"])
+    def test_api_update_state_thumbnail(self):
+        """Confirming the successful upload of a thumbnail."""
+        thumbnail = ThumbnailFactory()
+        data = {
+            "extraParameters": {},
+            "key": "{!s}/thumbnail/{!s}/1533686400".format(
+                thumbnail.video.pk, thumbnail.id
+            ),
+            "state": "ready",
+        }
+
+        response = self.client.post(
+            "/api/update-state",
+            data,
+            content_type="application/json",
+            HTTP_X_MARSHA_SIGNATURE=hmac.new(
+                b"shared secret",
+                msg=json.dumps(data).encode("utf-8"),
+                digestmod=hashlib.sha256,
+            ).hexdigest(),
+        )
+        thumbnail.refresh_from_db()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"success": True})
+        self.assertEqual(thumbnail.uploaded_on, datetime(2018, 8, 8, tzinfo=pytz.utc))
+        self.assertEqual(thumbnail.upload_state, "ready")
+
+    @override_settings(UPDATE_STATE_SHARED_SECRETS=["shared secret"])
+    def test_api_update_state_video_outdated(self):
+        """A late processing notification should not revert a video to processing."""
+        video = VideoFactory(
+            upload_state="ready", uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc)
+        )
+        version_name = RESOURCE_VERSION.format(model="Video", pk=video.pk)
+        version = get_versions(version_name)
+        data = {
+            "extraParameters": {},
+            "key": "{video!s}/video/{video!s}/1533686400".format(video=video.pk),
+            "state": "processing",
+        }
+
+        # The select and the conditional update
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                "/api/update-state",
+                data,
+                content_type="application/json",
+                HTTP_X_MARSHA_SIGNATURE=hmac.new(
+                    b"shared secret",
+                    msg=json.dumps(data).encode("utf-8"),
+                    digestmod=hashlib.sha256,
+                ).hexdigest(),
+            )
+        video.refresh_from_db()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"success": True})
+        self.assertEqual(video.upload_state, "ready")
+        self.assertEqual(get_versions(version_name), version)
+
+    @override_settings(
+        UPDATE_STATE_SHARED_SECRETS=["shared secret"], UPDATE_STATE_QUEUE_ACTIVE=True
+    )
+    def test_api_update_state_queue(self):
+        """Updates should only be queued and accepted when the queue is active."""
+        video = VideoFactory()
+        data = {
+            "extraParameters": {"resolutions": [144, 240]},
+            "key": "{video!s}/video/{video!s}/1533686400".format(video=video.pk),
+            "state": "ready",
+        }
+
+        # A single insert, the object is not even fetched
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                "/api/update-state",
+                data,
+                content_type="application/json",
+                HTTP_X_MARSHA_SIGNATURE=hmac.new(
+                    b"shared secret",
+                    msg=json.dumps(data).encode("utf-8"),
+                    digestmod=hashlib.sha256,
+                ).hexdigest(),
+            )
+        video.refresh_from_db()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.content), {"success": True})
+        self.assertEqual(video.upload_state, "pending")
+        queued = QueuedStateUpdate.objects.get()
+        self.assertEqual(queued.key, data["key"])
+        self.assertEqual(queued.state, "ready")
+        self.assertEqual(queued.extra_parameters, {"resolutions": [144, 240]})
+
     @override_settings(UPDATE_STATE_SHARED_SECRETS=["shared secret"])
     def test_api_update_state_unknown_video(self):
         """Trying to update the state of a video that does not exist should return a 404."""
@@ -0,0 +1,267 @@
+"""Tests for the batched upload & processing state update API of the Marsha project."""
+from datetime import datetime
+import hashlib
+import hmac
+import json
+
+from django.test import TestCase, override_settings
+
+import pytz
+
+from ..factories import (
+    DocumentFactory,
+    ThumbnailFactory,
+    TimedTextTrackFactory,
+    VideoFactory,
+)
+from ..models import Video
+from ..utils import snapshot_utils
+from ..utils.cache_utils import RESOURCE_VERSION, get_versions
+
+
+@override_settings(UPDATE_STATE_SHARED_SECRETS=["shared secret"])
+class UpdateStateBatchAPITest(TestCase):
+    """Test the API that allows to update the state of several objects at once."""
+
+    def post(self, updates, secret="shared secret"):
+        """Post a batch of updates signed with a secret."""
+        body = json.dumps(updates).encode("utf-8")
+        return self.client.post(
+            "/api/update-state/batch",
+            body,
+            content_type="application/json",
+            HTTP_X_MARSHA_SIGNATURE=hmac.new(
+                secret.encode("utf-8"), msg=body, digestmod=hashlib.sha256
+            ).hexdigest(),
+        )
+
+    def test_api_update_state_batch(self):
+        """Each update should be applied to its object and reported in order."""
+        video = VideoFactory()
+        document = DocumentFactory()
+        track = TimedTextTrackFactory(video=video, language="fr", mode="st")
+        thumbnail = ThumbnailFactory(video=video)
+        updates = [
+            {
+                "extraParameters": {"resolutions": [144, 240]},
+                "key": "{video!s}/video/{video!s}/1533686400".format(video=video.pk),
+                "state": "ready",
+            },
+            {
+                "extraParameters": {},
+                "key": "{document!s}/document/{document!s}/1533686400.pdf".format(
+                    document=document.pk
+                ),
+                "state": "ready",
+            },
+            {
+                "extraParameters": {},
+                "key": "{video!s}/timedtexttrack/{track!s}/1533686400_fr_st".format(
+                    video=video.pk, track=track.pk
+                ),
+                "state": "processing",
+            },
+            {
+                "extraParameters": {},
+                "key": "{video!s}/thumbnail/{thumbnail!s}/1533686400".format(
+                    video=video.pk, thumbnail=thumbnail.pk
+                ),
+                "state": "error",
+            },
+            {
+                "extraParameters": {},
+                "key": "9f4cf4b8-6c5a-4c6b-a6d7-52a8b6fcdd3b/video/"
+                "9f4cf4b8-6c5a-4c6b-a6d7-52a8b6fcdd3b/1533686400",
+                "state": "ready",
+            },
+        ]
+
+        response = self.post(updates)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {"key": updates[0]["key"], "success": True},
+                    {"key": updates[1]["key"], "success": True},
+                    {"key": updates[2]["key"], "success": True},
+                    {"key": updates[3]["key"], "success": True},
+                    {"key": updates[4]["key"], "success": False, "error": "not found"},
+                ]
+            },
+        )
+        ready_on = datetime(2018, 8, 8, tzinfo=pytz.utc)
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "ready")
+        self.assertEqual(video.uploaded_on, ready_on)
+        self.assertEqual(video.resolutions, [144, 240])
+        document.refresh_from_db()
+        self.assertEqual(document.upload_state, "ready")
+        self.assertEqual(document.uploaded_on, ready_on)
+        self.assertEqual(document.extension, "pdf")
+        track.refresh_from_db()
+        self.assertEqual(track.upload_state, "processing")
+        self.assertIsNone(track.uploaded_on)
+        thumbnail.refresh_from_db()
+        self.assertEqual(thumbnail.upload_state, "error")
+
+    def test_api_update_state_batch_queries(self):
+        """The number of queries should not depend on the number of objects of a model."""
+        for count in [1, 10]:
+            videos = VideoFactory.create_batch(count)
+            updates = [
+                {
+                    "extraParameters": {},
+                    "key": "{video!s}/video/{video!s}/1533686400".format(
+                        video=video.pk
+                    ),
+                    "state": "processing",
+                }
+                for video in videos
+            ]
+            # A savepoint, a select, a bulk update and the invalidation of snapshots
+            with self.assertNumQueries(5):
+                response = self.post(updates)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                Video.objects.filter(
+                    pk__in=[video.pk for video in videos], upload_state="processing"
+                ).count(),
+                count,
+            )
+
+    def test_api_update_state_batch_invalidation(self):
+        """The snapshot and the cached data of updated resources should be invalidated."""
+        video = VideoFactory()
+        snapshot_utils.refresh_snapshots(Video.objects.filter(pk=video.pk))
+        version_name = RESOURCE_VERSION.format(model="Video", pk=video.pk)
+        version = get_versions(version_name)
+
+        response = self.post(
+            [
+                {
+                    "extraParameters": {},
+                    "key": "{video!s}/video/{video!s}/1533686400".format(
+                        video=video.pk
+                    ),
+                    "state": "processing",
+                }
+            ]
+        )
+
+        self.assertEqual(response.status_code, 200)
+        video.refresh_from_db()
+        self.assertFalse(snapshot_utils.is_fresh(video.snapshot))
+        self.assertNotEqual(get_versions(version_name), version)
+
+    def test_api_update_state_batch_same_object(self):
+        """The last update of an object should win, invalid updates being skipped."""
+        video = VideoFactory(resolutions=[144])
+        key = "{video!s}/video/{video!s}/1533686400".format(video=video.pk)
+
+        response = self.post(
+            [
+                {"extraParameters": {}, "key": key, "state": "processing"},
+                {
+                    "extraParameters": {"resolutions": [144, 240]},
+                    "key": key,
+                    "state": "ready",
+                },
+                {
+                    "extraParameters": {"resolutions": ["high"]},
+                    "key": "{video!s}/video/{video!s}/1533686401".format(
+                        video=video.pk
+                    ),
+                    "state": "error",
+                },
+            ]
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([result["success"] for result in results], [True, True, False])
+        self.assertIn("not supported", results[2]["error"])
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "ready")
+        self.assertEqual(video.resolutions, [144, 240])
+
+    def test_api_update_state_batch_outdated(self):
+        """Updates that are not transitions should be acknowledged but not applied."""
+        video = VideoFactory(
+            upload_state="ready", uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+        )
+        key = "{video!s}/video/{video!s}/1533686400".format(video=video.pk)
+
+        # A savepoint and the select: nothing is written
+        with self.assertNumQueries(3):
+            response = self.post(
+                [
+                    {"extraParameters": {}, "key": key, "state": "processing"},
+                    {"extraParameters": {}, "key": key, "state": "ready"},
+                ]
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["success"] for result in response.json()["results"]], [True, True]
+        )
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "ready")
+
+    def test_api_update_state_batch_invalid(self):
+        """An invalid update should reject the whole batch."""
+        video = VideoFactory()
+
+        response = self.post(
+            [
+                {
+                    "extraParameters": {},
+                    "key": "{video!s}/video/{video!s}/1533686400".format(
+                        video=video.pk
+                    ),
+                    "state": "ready",
+                },
+                {"extraParameters": {}, "key": "invalid key", "state": "ready"},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("key", response.json()[1])
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "pending")
+
+    @override_settings(UPDATE_STATE_BATCH_SIZE=1)
+    def test_api_update_state_batch_too_large(self):
+        """A batch should not hold more than UPDATE_STATE_BATCH_SIZE updates."""
+        video = VideoFactory()
+        update = {
+            "extraParameters": {},
+            "key": "{video!s}/video/{video!s}/1533686400".format(video=video.pk),
+            "state": "ready",
+        }
+
+        response = self.post([update, update])
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_update_state_batch_invalid_signature(self):
+        """A batch signed with an unknown secret should be forbidden."""
+        video = VideoFactory()
+
+        response = self.post(
+            [
+                {
+                    "extraParameters": {},
+                    "key": "{video!s}/video/{video!s}/1533686400".format(
+                        video=video.pk
+                    ),
+                    "state": "ready",
+                }
+            ],
+            secret="wrong secret",
+        )
+
+        self.assertEqual(response.status_code, 403)
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "pending")
@@ -1,4 +1,5 @@
 """Tests for the Video API of the Marsha project."""
+import base64
 from datetime import datetime
 import json
 import random
@@ -17,6 +18,7 @@ from ..factories import (
     VideoFactory,
 )
 from ..models import Video
+from ..utils import cloudfront_utils
 
 
 RSA_KEY_MOCK = b"""
@@ -229,6 +231,46 @@ class VideoAPITest(TestCase):
         )
         self.assertEqual(response.status_code, 403)
 
+    @override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False)
+    def test_api_video_read_detail_token_user_queries(self):
+        """The number of queries should not depend on the number of timed text tracks."""
+        for languages in [["fr"], ["fr", "en", "es", "de", "it"]]:
+            video = VideoFactory(
+                uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+                upload_state="ready",
+                resolutions=[144, 240],
+            )
+            ThumbnailFactory(
+                video=video,
+                uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+                upload_state="ready",
+            )
+            for language in languages:
+                TimedTextTrackFactory(
+                    video=video,
+                    mode="ts",
+                    language=language,
+                    uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+                    upload_state="ready",
+                )
+            jwt_token = AccessToken()
+            jwt_token.payload["resource_id"] = str(video.id)
+            jwt_token.payload["roles"] = ["instructor"]
+            jwt_token.payload["permissions"] = {"can_update": True}
+
+            # The video, its playlist and thumbnail in one query, its tracks in another
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    "/api/videos/{!s}/".format(video.id),
+                    HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token),
+                )
+
+            self.assertEqual(response.status_code, 200)
+            content = json.loads(response.content)
+            self.assertEqual(len(content["timed_text_tracks"]), len(languages))
+            self.assertTrue(content["has_transcript"])
+            self.assertIsNotNone(content["thumbnail"])
+
     @override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False)
     def test_api_video_read_detail_token_user_no_active_stamp(self):
         """A video with no active stamp should not fail and its "urls" should be set to `None`."""
@@ -352,6 +394,115 @@ class VideoAPITest(TestCase):
             ),
         )
 
+    @override_settings(
+        CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_DOMAIN=".cloudfront.net",
+        CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+    )
+    @mock.patch("builtins.open", new_callable=mock.mock_open, read_data=RSA_KEY_MOCK)
+    def test_api_video_read_detail_token_user_signed_cookies(self, mock_open):
+        """Urls returned by the API should be signed in signed cookies mode as no cookie is set."""
+        video = VideoFactory(
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+            upload_state="ready",
+            resolutions=[144],
+        )
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(video.id)
+        jwt_token.payload["roles"] = [random.choice(["instructor", "administrator"])]
+        jwt_token.payload["permissions"] = {"can_update": True}
+
+        response = self.client.get(
+            "/api/videos/{!s}/".format(video.id),
+            HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.cookies, {})
+        content = json.loads(response.content)
+        self.assertIn("&Signature=", content["urls"]["mp4"]["144"])
+        self.assertTrue(
+            content["urls"]["mp4"]["144"].endswith(
+                "&Key-Pair-Id=cloudfront-access-key-id"
+            )
+        )
+
+    @override_settings(
+        CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+        CLOUDFRONT_SIGNED_URLS_WILDCARD=True,
+        CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+    )
+    @mock.patch("builtins.open", new_callable=mock.mock_open, read_data=RSA_KEY_MOCK)
+    def test_api_video_read_detail_token_user_signed_urls_wildcard(self, mock_open):
+        """A single policy should be signed for all the urls of a video in wildcard mode."""
+        video = VideoFactory(
+            pk="a2f27fde-973a-4e89-8dca-cc59e01d255c",
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+            upload_state="ready",
+            resolutions=[144, 240, 480],
+            playlist__title="foo",
+        )
+        TimedTextTrackFactory(
+            video=video,
+            mode="cc",
+            language="fr",
+            uploaded_on=datetime(2018, 8, 8, tzinfo=pytz.utc),
+            upload_state="ready",
+        )
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(video.id)
+        jwt_token.payload["roles"] = [random.choice(["instructor", "administrator"])]
+        jwt_token.payload["permissions"] = {"can_update": True}
+
+        now = datetime(2018, 8, 8, tzinfo=pytz.utc)
+        with mock.patch.object(timezone, "now", return_value=now), mock.patch(
+            "marsha.core.utils.cloudfront_utils.rsa_signer",
+            wraps=cloudfront_utils.rsa_signer,
+        ) as mock_signer:
+            response = self.client.get(
+                "/api/videos/{!s}/".format(video.id),
+                HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token),
+            )
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)
+        mock_signer.assert_called_once()
+
+        urls = [
+            *content["urls"]["mp4"].values(),
+            content["timed_text_tracks"][0]["url"],
+        ]
+        self.assertEqual(len(urls), 4)
+        queries = {url.split("&Policy=")[-1].split("?Policy=")[-1] for url in urls}
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(
+            content["urls"]["mp4"]["144"].startswith(
+                "https://abc.cloudfront.net/a2f27fde-973a-4e89-8dca-cc59e01d255c/mp4/"
+                "1533686400_144.mp4?response-content-disposition=attachment%3B+filename%3D"
+                "foo_1533686400.mp4&Policy="
+            )
+        )
+
+        policy, _signature, key_pair_id = queries.pop().split("&")
+        self.assertEqual(key_pair_id, "Key-Pair-Id=cloudfront-access-key-id")
+        self.assertEqual(
+            json.loads(
+                base64.b64decode(
+                    policy.replace("-", "+").replace("_", "=").replace("~", "/")
+                )
+            ),
+            {
+                "Statement": [
+                    {
+                        "Resource": (
+                            "https://abc.cloudfront.net/"
+                            "a2f27fde-973a-4e89-8dca-cc59e01d255c/*"
+                        ),
+                        "Condition": {"DateLessThan": {"AWS:EpochTime": 1533693600}},
+                    }
+                ]
+            },
+        )
+
     def test_api_video_read_detail_staff_or_user(self):
         """Users authenticated via a session should not be allowed to read a video detail."""
         for user in [UserFactory(), UserFactory(is_staff=True)]:
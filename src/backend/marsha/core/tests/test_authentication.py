@@ -0,0 +1,84 @@
+"""Test the authentication classes of the Marsha API."""
+import json
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from rest_framework_simplejwt.state import token_backend
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..authentication import clear_token_cache, get_token_cache_stats
+from ..factories import VideoFactory
+
+
+class CachedJWTTokenUserAuthenticationTestCase(TestCase):
+    """Test the cache of verified JWT tokens."""
+
+    def setUp(self):
+        """Start each test with an empty cache."""
+        super().setUp()
+        clear_token_cache()
+        self.video = VideoFactory()
+
+    def _get_video(self, jwt_token):
+        """Get the video through the API with a JWT token."""
+        return self.client.get(
+            "/api/videos/{!s}/".format(self.video.id),
+            HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token),
+        )
+
+    def _get_token(self):
+        """Return an instructor JWT token for the video."""
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(self.video.id)
+        jwt_token.payload["roles"] = ["instructor"]
+        jwt_token.payload["permissions"] = {"can_update": True}
+        return str(jwt_token)
+
+    def test_authentication_cache_hit(self):
+        """A token should be verified only once."""
+        jwt_token = self._get_token()
+
+        with mock.patch.object(
+            token_backend, "decode", wraps=token_backend.decode
+        ) as mock_decode:
+            for _request in range(3):
+                response = self._get_video(jwt_token)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content)["id"], str(self.video.id))
+
+        mock_decode.assert_called_once()
+        self.assertEqual(
+            get_token_cache_stats(), {"hits": 2, "misses": 1, "hit_ratio": 2 / 3}
+        )
+
+    def test_authentication_cache_expired(self):
+        """A cached token should be verified again once expired."""
+        jwt_token = self._get_token()
+        expires_at = AccessToken(jwt_token)["exp"]
+
+        with mock.patch.object(
+            token_backend, "decode", wraps=token_backend.decode
+        ) as mock_decode:
+            self.assertEqual(self._get_video(jwt_token).status_code, 200)
+            with mock.patch.object(time, "time", return_value=expires_at):
+                self.assertEqual(self._get_video(jwt_token).status_code, 200)
+
+        self.assertEqual(mock_decode.call_count, 2)
+        self.assertEqual(
+            get_token_cache_stats(), {"hits": 0, "misses": 2, "hit_ratio": 0.0}
+        )
+
+    def test_authentication_cache_invalid(self):
+        """An invalid token should never be cached."""
+        jwt_token = self._get_token()
+        forged_token = jwt_token[:-2] + ("aa" if jwt_token[-2:] != "aa" else "bb")
+
+        for _request in range(2):
+            self.assertEqual(self._get_video(forged_token).status_code, 401)
+
+        self.assertEqual(
+            get_token_cache_stats(), {"hits": 0, "misses": 2, "hit_ratio": 0.0}
+        )
+        self.assertEqual(self._get_video(jwt_token).status_code, 200)
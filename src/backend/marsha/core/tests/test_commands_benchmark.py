@@ -0,0 +1,27 @@
+"""Test the benchmark management command of the Marsha project."""
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..benchmarks import BENCHMARKS
+
+
+class BenchmarkCommandTestCase(TestCase):
+    """Test running micro-benchmarks from the command line."""
+
+    def test_commands_benchmark_all(self):
+        """All registered benchmarks should run and report each of their variants."""
+        out = StringIO()
+        call_command("benchmark", iterations=2, stdout=out)
+
+        output = out.getvalue()
+        for name in BENCHMARKS:
+            self.assertIn("{:s} [".format(name), output)
+        self.assertIn("lti_signature [pylti]", output)
+        self.assertIn("lti_signature [native]", output)
+
+    def test_commands_benchmark_unknown(self):
+        """Asking for an unknown benchmark should fail."""
+        with self.assertRaises(CommandError):
+            call_command("benchmark", "unknown", iterations=1)
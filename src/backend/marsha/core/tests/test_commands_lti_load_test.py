@@ -0,0 +1,59 @@
+"""Test the lti_load_test management command of the Marsha project."""
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from ..benchmarks import lti_load
+from ..models import Playlist, Video
+
+
+class LTILoadTestCommandTestCase(TestCase):
+    """Test replaying LTI launches against seeded resources."""
+
+    def test_commands_lti_load_test(self):
+        """Statistics should be printed for each view and role and the seed rolled back."""
+        out = StringIO()
+        call_command(
+            "lti_load_test",
+            consumer_sites=2,
+            playlists=1,
+            videos=1,
+            documents=1,
+            tracks=1,
+            launches=3,
+            seed=1,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        for kind in ["video", "document"]:
+            for role in ["student", "instructor"]:
+                self.assertIn(
+                    "{:s} [{:s}]: 3 launches, p50 ".format(kind, role), output
+                )
+        self.assertFalse(Playlist.objects.exists())
+        self.assertFalse(Video.objects.exists())
+
+    @override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
+    def test_commands_lti_load_test_student_queries(self):
+        """A warm student launch should not query the database."""
+        targets = lti_load.seed(
+            consumer_sites=2, playlists=1, videos=1, documents=0, tracks=1
+        )
+        self.assertEqual(len(targets), 4)
+
+        client = Client()
+        for target in targets:
+            lti_load.launch(client, target, "student")
+            _latency, queries = lti_load.launch(client, target, "student")
+            self.assertEqual(queries, 0)
+
+    def test_commands_lti_load_test_percentile(self):
+        """Percentiles should be computed with the nearest-rank method."""
+        values = [0.5, 0.1, 0.4, 0.2, 0.3]
+        self.assertEqual(lti_load.percentile(values, 0), 0.1)
+        self.assertEqual(lti_load.percentile(values, 50), 0.3)
+        self.assertEqual(lti_load.percentile(values, 95), 0.5)
+        self.assertEqual(lti_load.percentile(values, 100), 0.5)
@@ -0,0 +1,162 @@
+"""Test the process_state_updates management command of the Marsha project."""
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+from django.test import TestCase
+
+import pytz
+
+from ..factories import DocumentFactory, VideoFactory
+from ..management.commands import process_state_updates
+from ..models import QueuedStateUpdate
+from ..utils import update_state_utils
+
+
+class StopLoop(Exception):
+    """Raised to stop the loop of the command in tests."""
+
+
+class ProcessStateUpdatesCommandTestCase(TestCase):
+    """Test applying the queued state updates from the command line."""
+
+    def queue(self, key, state, extra_parameters=None):
+        """Queue an update like the update-state endpoint does."""
+        QueuedStateUpdate.objects.create(
+            key=key, state=state, extra_parameters=extra_parameters or {}
+        )
+
+    def test_commands_process_state_updates(self):
+        """Queued updates should be applied in the order they were queued."""
+        video = VideoFactory()
+        document = DocumentFactory()
+        video_key = "{video!s}/video/{video!s}/1533686400".format(video=video.pk)
+        self.queue(video_key, "processing")
+        self.queue(
+            "{document!s}/document/{document!s}/1533686400.pdf".format(
+                document=document.pk
+            ),
+            "ready",
+        )
+        self.queue(video_key, "ready", {"resolutions": [144, 240]})
+        self.queue(
+            "9f4cf4b8-6c5a-4c6b-a6d7-52a8b6fcdd3b/video/"
+            "9f4cf4b8-6c5a-4c6b-a6d7-52a8b6fcdd3b/1533686400",
+            "ready",
+        )
+
+        out = StringIO()
+        with self.assertLogs(
+            "marsha.core.utils.update_state_utils", level="WARNING"
+        ) as logs:
+            call_command("process_state_updates", once=True, stdout=out)
+
+        self.assertEqual(out.getvalue(), "4 queued updates processed\n")
+        self.assertIn("not found", logs.output[0])
+        self.assertFalse(QueuedStateUpdate.objects.exists())
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "ready")
+        self.assertEqual(video.uploaded_on, datetime(2018, 8, 8, tzinfo=pytz.utc))
+        self.assertEqual(video.resolutions, [144, 240])
+        document.refresh_from_db()
+        self.assertEqual(document.upload_state, "ready")
+        self.assertEqual(document.extension, "pdf")
+
+    def test_commands_process_state_updates_late_update(self):
+        """An update queued late should not revert a more advanced state of the same key."""
+        video = VideoFactory()
+        video_key = "{video!s}/video/{video!s}/1533686400".format(video=video.pk)
+        self.queue(video_key, "ready", {"resolutions": [144, 240]})
+        self.queue(video_key, "processing")
+
+        call_command("process_state_updates", once=True, stdout=StringIO())
+
+        self.assertFalse(QueuedStateUpdate.objects.exists())
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, "ready")
+        self.assertEqual(video.uploaded_on, datetime(2018, 8, 8, tzinfo=pytz.utc))
+        self.assertEqual(video.resolutions, [144, 240])
+
+    def test_commands_process_state_updates_batch_size(self):
+        """Updates should be popped in batches, the oldest first."""
+        videos = VideoFactory.create_batch(3)
+        for video in videos:
+            self.queue(
+                "{video!s}/video/{video!s}/1533686400".format(video=video.pk),
+                "processing",
+            )
+
+        out = StringIO()
+        call_command("process_state_updates", once=True, batch_size=2, stdout=out)
+
+        self.assertEqual(
+            out.getvalue(), "2 queued updates processed\n1 queued updates processed\n"
+        )
+        for video in videos:
+            video.refresh_from_db()
+            self.assertEqual(video.upload_state, "processing")
+
+    def test_commands_process_state_updates_poison(self):
+        """An update failing with a database error should be dropped, not block the others."""
+        videos = VideoFactory.create_batch(2)
+        for video in videos:
+            self.queue(
+                "{video!s}/video/{video!s}/1533686400".format(video=video.pk),
+                "processing",
+            )
+        apply_updates = update_state_utils.apply_updates
+
+        def fail_on_first_video(updates):
+            if any(update["object_id"] == str(videos[0].pk) for update in updates):
+                raise DatabaseError("poison")
+            return apply_updates(updates)
+
+        with mock.patch.object(
+            update_state_utils, "apply_updates", side_effect=fail_on_first_video
+        ), self.assertLogs(
+            "marsha.core.utils.update_state_utils", level="WARNING"
+        ) as logs:
+            call_command("process_state_updates", once=True, stdout=StringIO())
+
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn(str(videos[0].pk), logs.output[1])
+        self.assertFalse(QueuedStateUpdate.objects.exists())
+        videos[0].refresh_from_db()
+        self.assertEqual(videos[0].upload_state, "pending")
+        videos[1].refresh_from_db()
+        self.assertEqual(videos[1].upload_state, "processing")
+
+    def test_commands_process_state_updates_error(self):
+        """The command should log errors and keep processing the queue."""
+        with mock.patch.object(
+            process_state_updates,
+            "process_queued_updates",
+            side_effect=[DatabaseError("unavailable"), 1, 0],
+        ) as mock_process, mock.patch.object(
+            process_state_updates.time, "sleep", side_effect=[None, StopLoop]
+        ), mock.patch.object(
+            # It would close the connection of the transaction of the test
+            process_state_updates,
+            "close_old_connections",
+        ) as mock_close, self.assertLogs(
+            "marsha.core.management.commands.process_state_updates", level="ERROR"
+        ) as logs:
+            with self.assertRaises(StopLoop):
+                call_command("process_state_updates", stdout=StringIO())
+
+        self.assertEqual(mock_process.call_count, 3)
+        mock_close.assert_called_once_with()
+        self.assertIn("unavailable", logs.output[0])
+
+    def test_commands_process_state_updates_error_once(self):
+        """The command should fail on errors when it only processes the queue once."""
+        with mock.patch.object(
+            process_state_updates,
+            "process_queued_updates",
+            side_effect=DatabaseError("unavailable"),
+        ):
+            with self.assertRaises(CommandError):
+                call_command("process_state_updates", once=True, stdout=StringIO())
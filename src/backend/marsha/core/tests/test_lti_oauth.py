@@ -0,0 +1,193 @@
+"""Test the native OAuth 1.0 verification of LTI launch requests."""
+import time
+from urllib.parse import unquote
+import uuid
+
+from django.test import RequestFactory, TestCase, override_settings
+
+from oauthlib import oauth1
+from oauthlib.oauth1.rfc5849 import signature as oauth_signature
+from pylti.common import LTIException
+
+from ..factories import ConsumerSiteLTIPassportFactory
+from ..lti import LTI
+from ..lti.oauth import compute_signature, normalize_url, verify_request
+
+
+class LTIOAuthTestCase(TestCase):
+    """Test our OAuth 1.0 HMAC-SHA1 verifier."""
+
+    def setUp(self):
+        """Override the setUp method to instanciate and serve a request factory."""
+        super().setUp()
+        self.factory = RequestFactory()
+
+    def _sign(self, url, lti_parameters, client_secret="secret"):
+        """Not a test but utility method to sign a launch request with oauthlib."""
+        client = oauth1.Client(client_key="ABC123", client_secret=client_secret)
+        _uri, headers, _body = client.sign(
+            url,
+            http_method="POST",
+            body=lti_parameters,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        oauth_dict = dict(
+            param.strip().replace('"', "").split("=")
+            for param in headers["Authorization"].split(",")
+        )
+        oauth_dict["oauth_signature"] = unquote(oauth_dict["oauth_signature"])
+        oauth_dict["oauth_nonce"] = oauth_dict.pop("OAuth oauth_nonce")
+        return {**lti_parameters, **oauth_dict}
+
+    def test_lti_oauth_normalize_url(self):
+        """The base string uri should exclude the query string and default ports."""
+        self.assertEqual(
+            normalize_url("HTTP://Example.com:80/lti/videos/?a=1#top"),
+            "http://example.com/lti/videos/",
+        )
+        self.assertEqual(
+            normalize_url("https://example.com:443"), "https://example.com/"
+        )
+        self.assertEqual(
+            normalize_url("https://example.com:8080/lti"),
+            "https://example.com:8080/lti",
+        )
+
+    def test_lti_oauth_compute_signature(self):
+        """Parameters in the query string should be signed whatever their order."""
+        # Parameters taken from https://tools.ietf.org/html/rfc5849#section-3.4.1.1
+        parameters = [
+            ("c2", ""),
+            ("a3", "2 q"),
+            ("oauth_consumer_key", "9djdj82h48djs9d2"),
+            ("oauth_token", "kkk9d7dh3k39sjv7"),
+            ("oauth_signature_method", "HMAC-SHA1"),
+            ("oauth_timestamp", "137131201"),
+            ("oauth_nonce", "7d8f3e4a"),
+            ("oauth_signature", "ignored"),
+        ]
+        signature = compute_signature(
+            "post",
+            "http://example.com/request?b5=%3D%253D&a3=a&c%40=",
+            parameters,
+            "j49sk3j29djd",
+        )
+        # The base string published in RFC 5849 section 3.4.1.1, signed by oauthlib with the
+        # consumer secret and no token secret
+        base_string = (
+            "POST&http%3A%2F%2Fexample.com%2Frequest&a3%3D2%2520q%26a3%3Da%26b5%3D%253D"
+            "%25253D%26c%2540%3D%26c2%3D%26oauth_consumer_key%3D9djdj82h48djs9d2"
+            "%26oauth_nonce%3D7d8f3e4a%26oauth_signature_method%3DHMAC-SHA1"
+            "%26oauth_timestamp%3D137131201%26oauth_token%3Dkkk9d7dh3k39sjv7"
+        )
+        self.assertEqual(
+            signature, oauth_signature.sign_hmac_sha1(base_string, "j49sk3j29djd", None)
+        )
+        self.assertEqual(signature, "LJdFBYqFI7lshfOnIONvwR8ALDE=")
+        self.assertEqual(
+            signature,
+            compute_signature(
+                "POST",
+                "http://example.com:80/request?a3=a&c%40=&b5=%3D%253D",
+                parameters[:-1],
+                "j49sk3j29djd",
+            ),
+        )
+
+    def test_lti_oauth_verify_request(self):
+        """A launch request signed by oauthlib should be verified."""
+        url = "http://testserver/lti/videos/{!s}".format(uuid.uuid4())
+        parameters = self._sign(
+            url, {"resource_link_id": "df7", "context_id": "course-v1:ufr+maths+01"}
+        )
+        request = self.factory.post(url, parameters)
+
+        # No exception should be raised
+        verify_request(request, url, "secret")
+
+        with self.assertRaises(LTIException):
+            verify_request(request, url, "other secret")
+
+        with self.assertRaises(LTIException):
+            verify_request(request, url.replace("http:", "https:"), "secret")
+
+    def test_lti_oauth_verify_request_tampered(self):
+        """A launch request whose parameters were modified after signing should fail."""
+        url = "http://testserver/lti/videos/{!s}".format(uuid.uuid4())
+        parameters = self._sign(url, {"resource_link_id": "df7", "roles": "Student"})
+        parameters["roles"] = "Instructor"
+        request = self.factory.post(url, parameters)
+
+        with self.assertRaises(LTIException):
+            verify_request(request, url, "secret")
+
+    def test_lti_oauth_verify_request_expired(self):
+        """A launch request signed more than 5 minutes ago should fail."""
+        url = "http://testserver/lti/videos/{!s}".format(uuid.uuid4())
+        parameters = {
+            "resource_link_id": "df7",
+            "oauth_consumer_key": "ABC123",
+            "oauth_nonce": "123",
+            "oauth_signature_method": "HMAC-SHA1",
+            "oauth_timestamp": str(int(time.time()) - 301),
+            "oauth_version": "1.0",
+        }
+        parameters["oauth_signature"] = compute_signature(
+            "POST", url, parameters.items(), "secret"
+        )
+        request = self.factory.post(url, parameters)
+
+        with self.assertRaises(LTIException) as context:
+            verify_request(request, url, "secret")
+        self.assertEqual(context.exception.args[0], "OAuth error: expired timestamp.")
+
+    def test_lti_oauth_verify_request_unsigned(self):
+        """A launch request without oauth parameters or with another method should fail."""
+        url = "http://testserver/lti/videos/{!s}".format(uuid.uuid4())
+        request = self.factory.post(url, {"resource_link_id": "df7"})
+        with self.assertRaises(LTIException):
+            verify_request(request, url, "secret")
+
+        request = self.factory.post(
+            url,
+            {
+                "oauth_consumer_key": "ABC123",
+                "oauth_nonce": "123",
+                "oauth_signature_method": "PLAINTEXT",
+                "oauth_signature": "secret&",
+                "oauth_timestamp": str(int(time.time())),
+            },
+        )
+        with self.assertRaises(LTIException) as context:
+            verify_request(request, url, "secret")
+        self.assertEqual(
+            context.exception.args[0], "OAuth error: unsupported signature method."
+        )
+
+    @override_settings(LTI_NATIVE_SIGNATURE_VERIFICATION=True)
+    def test_lti_oauth_lti_verify(self):
+        """LTI.verify should use the native verifier when it is activated."""
+        passport = ConsumerSiteLTIPassportFactory(
+            oauth_consumer_key="ABC123", consumer_site__domain="testserver"
+        )
+        url = "http://testserver/lti/videos/{!s}".format(uuid.uuid4())
+        parameters = self._sign(
+            url.replace("http:", "https:"),
+            {"resource_link_id": "df7", "context_id": "course-v1:ufr+maths+01"},
+            client_secret=passport.shared_secret,
+        )
+        # Behind a TLS termination proxy, the url seen by Django starts with "http"
+        request = self.factory.post(
+            url,
+            parameters,
+            HTTP_X_FORWARDED_PROTO="https",
+            HTTP_REFERER="https://testserver/",
+        )
+        lti = LTI(request, uuid.uuid4())
+        self.assertTrue(lti.verify())
+        self.assertEqual(lti.get_consumer_site(), passport.consumer_site)
+
+        # The same request without the proxy header should fail
+        request = self.factory.post(url, parameters)
+        with self.assertRaises(LTIException):
+            LTI(request, uuid.uuid4()).verify()
@@ -0,0 +1,159 @@
+"""Test the resolution and caching of LTI passports."""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..factories import ConsumerSiteLTIPassportFactory, PlaylistLTIPassportFactory
+from ..lti import passports
+from ..lti.passports import (
+    PASSPORT_CACHE_KEY,
+    _local_cache,
+    get_passport,
+    get_passport_cache_duration,
+)
+from ..models import LTIPassport
+from ..utils.cache_utils import LTI_PASSPORT_VERSION, VERSION_CACHE_KEY, get_versions
+
+
+# pylint: disable=protected-access
+
+
+class LTIPassportsTestCase(TestCase):
+    """Test the LTI passports resolver."""
+
+    def test_lti_passports_consumer_site_cached(self):
+        """A passport and its consumer site should be resolved without query once cached."""
+        passport = ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_passport("ABC123"), passport)
+
+        with self.assertNumQueries(0):
+            cached_passport = get_passport("ABC123")
+            self.assertEqual(cached_passport.consumer_site, passport.consumer_site)
+
+    def test_lti_passports_playlist_cached(self):
+        """The consumer site of a playlist passport should be resolved without query."""
+        passport = PlaylistLTIPassportFactory(oauth_consumer_key="ABC123")
+        get_passport("ABC123")
+
+        with self.assertNumQueries(0):
+            cached_passport = get_passport("ABC123")
+            self.assertIsNone(cached_passport.consumer_site)
+            self.assertEqual(
+                cached_passport.playlist.consumer_site, passport.playlist.consumer_site
+            )
+
+    def test_lti_passports_shared_cache(self):
+        """The shared cache should be used when the local cache is empty."""
+        ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123")
+        get_passport("ABC123")
+
+        _local_cache.clear()
+        with self.assertNumQueries(0):
+            get_passport("ABC123")
+
+    def test_lti_passports_unknown(self):
+        """Unknown or disabled passports should not be found."""
+        ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123", is_enabled=False)
+
+        with self.assertRaises(LTIPassport.DoesNotExist):
+            get_passport("ABC123")
+        with self.assertRaises(LTIPassport.DoesNotExist):
+            get_passport("unknown")
+
+    def test_lti_passports_invalidate_on_passport_change(self):
+        """Disabling a passport should take effect immediately."""
+        passport = ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123")
+        get_passport("ABC123")
+
+        passport.is_enabled = False
+        passport.save()
+
+        with self.assertRaises(LTIPassport.DoesNotExist):
+            get_passport("ABC123")
+
+    def test_lti_passports_invalidate_on_consumer_site_change(self):
+        """Changing the domain of a consumer site should be reflected in cached passports."""
+        passport = ConsumerSiteLTIPassportFactory(
+            oauth_consumer_key="ABC123", consumer_site__domain="example.com"
+        )
+        get_passport("ABC123")
+
+        passport.consumer_site.domain = "other.com"
+        passport.consumer_site.save()
+
+        self.assertEqual(get_passport("ABC123").consumer_site.domain, "other.com")
+
+    def test_lti_passports_invalidate_on_playlist_change(self):
+        """Moving a playlist to another consumer site should be reflected in cached passports."""
+        passport = PlaylistLTIPassportFactory(oauth_consumer_key="ABC123")
+        other_passport = ConsumerSiteLTIPassportFactory()
+        get_passport("ABC123")
+
+        passport.playlist.consumer_site = other_passport.consumer_site
+        passport.playlist.save()
+
+        self.assertEqual(
+            get_passport("ABC123").playlist.consumer_site, other_passport.consumer_site
+        )
+
+    def test_lti_passports_version_evicted(self):
+        """Cached passports should not be trusted if the version was evicted."""
+        passport = ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123")
+        get_passport("ABC123")
+
+        cache.delete(VERSION_CACHE_KEY.format(name=LTI_PASSPORT_VERSION))
+        LTIPassport.objects.filter(pk=passport.pk).update(is_enabled=False)
+
+        with self.assertRaises(LTIPassport.DoesNotExist):
+            get_passport("ABC123")
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    )
+    def test_lti_passports_dummy_cache(self):
+        """Passports should be resolved when the cache does not store anything."""
+        passport = ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123")
+
+        self.assertEqual(get_passport("ABC123"), passport)
+        self.assertEqual(get_passport("ABC123"), passport)
+
+    def test_lti_passports_local_cache_expired(self):
+        """Passports cached by a process should expire when the cache is not shared."""
+        passport = ConsumerSiteLTIPassportFactory(oauth_consumer_key="ABC123")
+        with mock.patch.object(passports.time, "monotonic", return_value=1000):
+            get_passport("ABC123")
+
+        # Another process disabled the passport: this process is not notified
+        LTIPassport.objects.filter(pk=passport.pk).update(is_enabled=False)
+
+        with mock.patch.object(passports.time, "monotonic", return_value=1059):
+            self.assertEqual(get_passport("ABC123"), passport)
+
+        # The entry expired in the Django cache of the process at the same time
+        cache.delete(
+            PASSPORT_CACHE_KEY.format(
+                version=get_versions(LTI_PASSPORT_VERSION), consumer_key="ABC123"
+            )
+        )
+        with mock.patch.object(passports.time, "monotonic", return_value=1060):
+            with self.assertRaises(LTIPassport.DoesNotExist):
+                get_passport("ABC123")
+
+    @override_settings(
+        LTI_PASSPORT_CACHE_DURATION=3600, APP_DATA_CACHE_LOCAL_DURATION=60
+    )
+    def test_lti_passports_cache_duration(self):
+        """The cache duration should be capped unless the cache is shared."""
+        self.assertEqual(get_passport_cache_duration(), 60)
+
+        with override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.memcached.MemcachedCache"
+                }
+            }
+        ):
+            self.assertEqual(get_passport_cache_duration(), 3600)
@@ -0,0 +1,144 @@
+"""Test the materialized reachability of playlists."""
+from django.test import TestCase
+
+from ..factories import ConsumerSiteFactory, PlaylistFactory
+from ..lti.portability import get_reachability_filter
+from ..models import ConsumerSitePortability, PlaylistPortability, PlaylistReachability
+
+
+class PlaylistReachabilityTestCase(TestCase):
+    """Test that playlist reachability rows follow portability changes."""
+
+    def _get_reachability(self, playlist):
+        """Return the (consumer site, lti id) pairs from which a playlist is reachable."""
+        return set(
+            PlaylistReachability.objects.filter(playlist=playlist).values_list(
+                "consumer_site_id", "lti_id"
+            )
+        )
+
+    def _is_reachable(self, playlist, consumer_site, lti_id):
+        """Return whether a playlist is reachable from an LTI context."""
+        return PlaylistReachability.objects.filter(
+            get_reachability_filter(consumer_site, lti_id), playlist=playlist
+        ).exists()
+
+    def test_lti_portability_flags(self):
+        """Rows should be rebuilt when the portability flags of a playlist change."""
+        playlist = PlaylistFactory(
+            is_portable_to_playlist=True, is_portable_to_consumer_site=False
+        )
+        self.assertEqual(
+            self._get_reachability(playlist), {(playlist.consumer_site_id, None)}
+        )
+
+        playlist.is_portable_to_playlist = False
+        playlist.is_portable_to_consumer_site = True
+        playlist.save()
+        self.assertEqual(self._get_reachability(playlist), {(None, None)})
+        self.assertTrue(self._is_reachable(playlist, ConsumerSiteFactory(), "any"))
+
+        playlist.is_portable_to_consumer_site = False
+        playlist.save()
+        self.assertEqual(self._get_reachability(playlist), set())
+
+    def test_lti_portability_playlist_link(self):
+        """A playlist should be reachable from the playlists it is linked to."""
+        playlist = PlaylistFactory(is_portable_to_playlist=False)
+        target = PlaylistFactory(lti_id="course-v1:ufr+mathematics+0001")
+        self.assertFalse(
+            self._is_reachable(playlist, target.consumer_site, target.lti_id)
+        )
+
+        link = PlaylistPortability.objects.create(
+            source_playlist=playlist, target_playlist=target
+        )
+        self.assertEqual(
+            self._get_reachability(playlist), {(target.consumer_site_id, target.lti_id)}
+        )
+        self.assertTrue(
+            self._is_reachable(playlist, target.consumer_site, target.lti_id)
+        )
+        self.assertFalse(self._is_reachable(playlist, target.consumer_site, "other"))
+
+        # Changing the lti id of the target playlist is propagated to the source playlist
+        target.lti_id = "course-v1:ufr+mathematics+0002"
+        target.save()
+        self.assertEqual(
+            self._get_reachability(playlist), {(target.consumer_site_id, target.lti_id)}
+        )
+
+        link.delete()
+        self.assertEqual(self._get_reachability(playlist), set())
+
+    def test_lti_portability_playlist_portable_to(self):
+        """Links managed through ``Playlist.portable_to`` should be taken into account."""
+        playlist = PlaylistFactory(is_portable_to_playlist=False)
+        target = PlaylistFactory()
+
+        playlist.portable_to.add(target)
+        self.assertEqual(
+            self._get_reachability(playlist), {(target.consumer_site_id, target.lti_id)}
+        )
+
+        playlist.portable_to.remove(target)
+        self.assertEqual(self._get_reachability(playlist), set())
+
+        target.reachable_from.add(playlist)
+        self.assertEqual(
+            self._get_reachability(playlist), {(target.consumer_site_id, target.lti_id)}
+        )
+
+        target.reachable_from.clear()
+        self.assertEqual(self._get_reachability(playlist), set())
+
+    def test_lti_portability_consumer_site_link(self):
+        """All playlists of a site should be reachable from the sites it is linked to."""
+        consumer_site = ConsumerSiteFactory()
+        playlist = PlaylistFactory(
+            consumer_site=consumer_site, is_portable_to_playlist=False
+        )
+        target_site = ConsumerSiteFactory()
+
+        link = ConsumerSitePortability.objects.create(
+            source_site=consumer_site, target_site=target_site
+        )
+        self.assertEqual(self._get_reachability(playlist), {(target_site.id, None)})
+
+        # Playlists created afterwards are reachable too
+        other_playlist = PlaylistFactory(
+            consumer_site=consumer_site, is_portable_to_playlist=False
+        )
+        self.assertEqual(
+            self._get_reachability(other_playlist), {(target_site.id, None)}
+        )
+        self.assertTrue(self._is_reachable(other_playlist, target_site, "any"))
+
+        link.delete()
+        self.assertEqual(self._get_reachability(playlist), set())
+        self.assertEqual(self._get_reachability(other_playlist), set())
+
+        consumer_site.portable_to.add(target_site)
+        self.assertEqual(self._get_reachability(playlist), {(target_site.id, None)})
+
+        target_site.reachable_from.clear()
+        self.assertEqual(self._get_reachability(playlist), set())
+
+    def test_lti_portability_deleted_playlist(self):
+        """A soft deleted playlist should not be reachable from anywhere."""
+        consumer_site = ConsumerSiteFactory()
+        playlist = PlaylistFactory(
+            consumer_site=consumer_site,
+            is_portable_to_playlist=True,
+            is_portable_to_consumer_site=True,
+        )
+        self.assertEqual(
+            self._get_reachability(playlist), {(consumer_site.id, None), (None, None)}
+        )
+
+        playlist.delete()
+        self.assertEqual(self._get_reachability(playlist), set())
+
+        # Rebuilding the rows of the playlists of its site does not restore them
+        consumer_site.portable_to.add(ConsumerSiteFactory())
+        self.assertEqual(self._get_reachability(playlist), set())
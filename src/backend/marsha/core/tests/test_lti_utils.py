@@ -3,6 +3,7 @@ import random
 from unittest import mock
 import uuid
 
+from django.db.models.signals import post_save
 from django.test import RequestFactory, TestCase
 from django.utils import timezone
 
@@ -12,6 +13,7 @@ from .. import factories, models
 from ..defaults import STATE_CHOICES
 from ..lti import LTI
 from ..lti.utils import PortabilityError, get_or_create_resource
+from ..utils.db_utils import insert_or_get
 
 
 # We don't enforce arguments documentation in tests
@@ -2040,3 +2042,112 @@ class PortabilityLTITestCase(TestCase):
         self._test_lti_get_resource_wrong_lti_id_student(
             factories.DocumentFactory, models.Document
         )
+
+    def _test_lti_get_resource_concurrent_creation_instructor(self, factory, model):
+        """Above case 2-1 when two instructors launch a new LTI link at the same time.
+
+        The resource created by the concurrent launch should be returned instead of
+        failing to insert it twice.
+        """
+        passport = factories.ConsumerSiteLTIPassportFactory(
+            consumer_site__domain="example.com"
+        )
+        playlist = factories.PlaylistFactory(consumer_site=passport.consumer_site)
+        data = {
+            "resource_link_id": "new_lti_id",
+            "context_id": playlist.lti_id,
+            "roles": "Instructor",
+            "oauth_consumer_key": passport.oauth_consumer_key,
+        }
+        request = self.factory.post("/", data, HTTP_REFERER="https://example.com/route")
+        resource_id = uuid.uuid4()
+        lti = LTI(request, resource_id)
+        lti.verify()
+
+        def concurrent_insert_or_get(instance, *args, **kwargs):
+            """Create the resource right before our launch tries to insert it."""
+            if isinstance(instance, model):
+                factory(id=resource_id, playlist=playlist, lti_id="new_lti_id")
+            return insert_or_get(instance, *args, **kwargs)
+
+        with mock.patch(
+            "marsha.core.lti.utils.insert_or_get", side_effect=concurrent_insert_or_get
+        ):
+            resource = get_or_create_resource(model, lti)
+
+        self.assertEqual(resource.id, resource_id)
+        self.assertEqual(model.objects.count(), 1)
+        self.assertEqual(models.Playlist.objects.count(), 1)
+
+    def _test_lti_get_resource_concurrent_portable_new_playlist(self, factory, model):
+        """Above case 2-1 when a concurrent launch creates a resource portable to a new playlist.
+
+        The playlist created by our launch is kept and the signals of its creation are sent.
+        """
+        passport = factories.ConsumerSiteLTIPassportFactory(
+            consumer_site__domain="example.com"
+        )
+        data = {
+            "resource_link_id": "new_lti_id",
+            "context_id": "new_playlist",
+            "roles": "Instructor",
+            "oauth_consumer_key": passport.oauth_consumer_key,
+        }
+        request = self.factory.post("/", data, HTTP_REFERER="https://example.com/route")
+        resource_id = uuid.uuid4()
+        lti = LTI(request, resource_id)
+        lti.verify()
+
+        def concurrent_insert_or_get(instance, *args, **kwargs):
+            """Create a portable resource right before our launch tries to insert it."""
+            if isinstance(instance, model):
+                factory(
+                    id=resource_id,
+                    playlist__is_portable_to_consumer_site=True,
+                    uploaded_on=timezone.now(),
+                )
+            return insert_or_get(instance, *args, **kwargs)
+
+        with mock.patch(
+            "marsha.core.lti.utils.insert_or_get", side_effect=concurrent_insert_or_get
+        ), mock.patch.object(post_save, "send", wraps=post_save.send) as mock_send:
+            resource = get_or_create_resource(model, lti)
+
+        self.assertEqual(resource.id, resource_id)
+        playlist = models.Playlist.objects.get(lti_id="new_playlist")
+        mock_send.assert_any_call(
+            sender=models.Playlist,
+            instance=playlist,
+            created=True,
+            update_fields=None,
+            raw=False,
+            using="default",
+        )
+
+    @mock.patch.object(LTIOAuthServer, "verify_request", return_value=True)
+    def test_lti_get_video_concurrent_portable_new_playlist(self, mock_verify):
+        """Above case 2-1 for Video with a concurrent launch creating a portable video."""
+        self._test_lti_get_resource_concurrent_portable_new_playlist(
+            factories.VideoFactory, models.Video
+        )
+
+    @mock.patch.object(LTIOAuthServer, "verify_request", return_value=True)
+    def test_lti_get_document_concurrent_portable_new_playlist(self, mock_verify):
+        """Above case 2-1 for Document with a concurrent launch creating a portable document."""
+        self._test_lti_get_resource_concurrent_portable_new_playlist(
+            factories.DocumentFactory, models.Document
+        )
+
+    @mock.patch.object(LTIOAuthServer, "verify_request", return_value=True)
+    def test_lti_get_video_concurrent_creation_instructor(self, mock_verify):
+        """Above case 2-1 for Video with a concurrent launch creating the video."""
+        self._test_lti_get_resource_concurrent_creation_instructor(
+            factories.VideoFactory, models.Video
+        )
+
+    @mock.patch.object(LTIOAuthServer, "verify_request", return_value=True)
+    def test_lti_get_document_concurrent_creation_instructor(self, mock_verify):
+        """Above case 2-1 for Document with a concurrent launch creating the document."""
+        self._test_lti_get_resource_concurrent_creation_instructor(
+            factories.DocumentFactory, models.Document
+        )
@@ -0,0 +1,65 @@
+"""Test the query instrumentation middleware of the Marsha project."""
+import random
+
+from django.test import TestCase, override_settings
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..factories import VideoFactory
+
+
+class QueryInstrumentationMiddlewareTestCase(TestCase):
+    """Test the statistics reported on the queries run by each request."""
+
+    def _get_video(self, **extra):
+        """Get a video through the API with an instructor token."""
+        video = VideoFactory()
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(video.id)
+        jwt_token.payload["roles"] = [random.choice(["instructor", "administrator"])]
+        jwt_token.payload["permissions"] = {"can_update": True}
+        return self.client.get(
+            "/api/videos/{!s}/".format(video.id),
+            HTTP_AUTHORIZATION="Bearer {!s}".format(jwt_token),
+            **extra,
+        )
+
+    def test_middleware_queries_inactive(self):
+        """Nothing should be reported if the instrumentation is not active."""
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("marsha.core.middleware"):
+                response = self._get_video()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Queries-Count", response)
+
+    @override_settings(QUERY_INSTRUMENTATION_ACTIVE=True, DEBUG=True)
+    def test_middleware_queries_debug_headers(self):
+        """Statistics should be returned as response headers in debug mode."""
+        response = self._get_video()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response["X-Queries-Count"]), 0)
+        self.assertGreaterEqual(float(response["X-Queries-Duration"]), 0)
+        self.assertEqual(response["X-Queries-Duplicates"], "0")
+        self.assertIn("X-Queries-Similar", response)
+
+        # Views that are not part of Marsha are not instrumented
+        response = self.client.get("/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Queries-Count", response)
+
+    @override_settings(QUERY_INSTRUMENTATION_ACTIVE=True)
+    def test_middleware_queries_log(self):
+        """Statistics should be logged as structured fields outside of debug mode."""
+        with self.assertLogs("marsha.core.middleware", "INFO") as logs:
+            response = self._get_video()
+
+        self.assertNotIn("X-Queries-Count", response)
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.view, "videos-detail")
+        self.assertEqual(record.method, "GET")
+        self.assertEqual(record.status_code, 200)
+        self.assertGreater(record.queries_count, 0)
+        self.assertEqual(record.queries_duplicates, 0)
@@ -1,11 +1,19 @@
 """Tests for the models in the ``core`` app of the Marsha project."""
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.utils import IntegrityError
 from django.test import TestCase
 
+import pytz
 from safedelete.models import SOFT_DELETE_CASCADE
 
-from ..factories import VideoFactory
+from ..defaults import PENDING, PROCESSING, READY
+from ..factories import TimedTextTrackFactory, VideoFactory
+from ..models import Video
+from ..utils import snapshot_utils
+from ..utils.cache_utils import RESOURCE_VERSION, get_versions
 
 
 class VideoModelsTestCase(TestCase):
@@ -38,3 +46,105 @@ class VideoModelsTestCase(TestCase):
         # Soft deleted videos should not count for unicity
         video.delete(force_policy=SOFT_DELETE_CASCADE)
         VideoFactory(lti_id=video.lti_id, playlist=video.playlist)
+
+    def test_models_video_save_update_fields(self):
+        """Saving with update_fields should only validate and write these fields."""
+        video = VideoFactory(title="first title", description="first description")
+
+        # The title is invalid but is neither validated nor written
+        video.title = ""
+        video.description = "second description"
+        # The update and the invalidation of the snapshot: no query validates uniqueness
+        with self.assertNumQueries(2):
+            video.save(update_fields=["description"])
+        video.refresh_from_db()
+        self.assertEqual(video.title, "first title")
+        self.assertEqual(video.description, "second description")
+
+        # The fields that are written are still validated
+        video.title = ""
+        with self.assertRaises(ValidationError) as context:
+            video.save(update_fields=["title"])
+        self.assertEqual(list(context.exception.message_dict), ["title"])
+
+    def test_models_video_update_upload_state(self):
+        """Updating the upload state should only write the fields related to it."""
+        video = VideoFactory(
+            title="first title", upload_state=PENDING, resolutions=[144]
+        )
+        snapshot_utils.refresh_snapshots(Video.objects.filter(pk=video.pk))
+        video.refresh_from_db()
+        updated_on = video.updated_on
+        ready_on = datetime(2018, 8, 8, tzinfo=pytz.utc)
+
+        video.title = "second title"
+        with self.assertNumQueries(1):
+            video.update_upload_state(READY, ready_on, resolutions=[144, 240])
+
+        video.refresh_from_db()
+        self.assertEqual(video.title, "first title")
+        self.assertEqual(video.upload_state, READY)
+        self.assertEqual(video.uploaded_on, ready_on)
+        self.assertEqual(video.resolutions, [144, 240])
+        self.assertGreater(video.updated_on, updated_on)
+        self.assertFalse(snapshot_utils.is_fresh(video.snapshot))
+
+    def test_models_video_update_upload_state_track(self):
+        """Tracks should also only write the fields related to their upload state."""
+        track = TimedTextTrackFactory(upload_state=PENDING)
+
+        # The update and the invalidation of the snapshot of its video
+        with self.assertNumQueries(2):
+            track.update_upload_state(READY, None)
+
+        track.refresh_from_db()
+        self.assertEqual(track.upload_state, READY)
+        self.assertIsNone(track.uploaded_on)
+
+    def test_models_video_update_upload_state_transitions(self):
+        """Duplicate and outdated updates should leave the row untouched."""
+        stamp = datetime(2018, 8, 8, tzinfo=pytz.utc)
+        video = VideoFactory(upload_state=PENDING)
+        version_name = RESOURCE_VERSION.format(model="Video", pk=video.pk)
+
+        self.assertTrue(video.update_upload_state(PROCESSING, None, stamp=stamp))
+        self.assertTrue(video.update_upload_state(READY, stamp, stamp=stamp))
+        video.refresh_from_db()
+        updated_on = video.updated_on
+        version = get_versions(version_name)
+
+        for upload_state, uploaded_on in [
+            # A late processing notification for the same upload
+            (PROCESSING, None),
+            # A retried ready notification
+            (READY, stamp),
+        ]:
+            # A single conditional query, no invalidation
+            with self.assertNumQueries(1):
+                self.assertFalse(
+                    video.update_upload_state(upload_state, uploaded_on, stamp=stamp)
+                )
+
+        # A ready notification for an older upload
+        older_stamp = datetime(2018, 8, 7, tzinfo=pytz.utc)
+        self.assertFalse(
+            video.update_upload_state(READY, older_stamp, stamp=older_stamp)
+        )
+
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, READY)
+        self.assertEqual(video.uploaded_on, stamp)
+        self.assertEqual(video.updated_on, updated_on)
+        self.assertEqual(get_versions(version_name), version)
+
+        # A duplicate processing notification for a new upload
+        newer_stamp = datetime(2018, 8, 9, tzinfo=pytz.utc)
+        self.assertTrue(video.update_upload_state(PROCESSING, None, stamp=newer_stamp))
+        self.assertFalse(video.update_upload_state(PROCESSING, None, stamp=newer_stamp))
+        self.assertTrue(
+            video.update_upload_state(READY, newer_stamp, stamp=newer_stamp)
+        )
+        video.refresh_from_db()
+        self.assertEqual(video.upload_state, READY)
+        self.assertEqual(video.uploaded_on, newer_stamp)
+        self.assertNotEqual(get_versions(version_name), version)
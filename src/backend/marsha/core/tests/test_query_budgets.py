@@ -0,0 +1,150 @@
+"""Enforce the maximum number of queries of the endpoints of the Marsha project.
+
+An endpoint running more queries than its budget fails the test suite. When a change
+legitimately needs more queries, raise the budget in ``QUERY_BUDGETS`` along with the change.
+"""
+import hashlib
+import hmac
+import json
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..benchmarks import lti_load
+from ..defaults import READY
+from ..utils.query_utils import query_budget
+
+
+# Maximum number of queries of each endpoint, by url name and case
+QUERY_BUDGETS = {
+    "video_lti_view": {"student": 2, "student_warm": 0, "instructor": 1},
+    "document_lti_view": {"student": 2, "student_warm": 0, "instructor": 1},
+    "videos-detail": {"get": 2, "patch": 6},
+    "documents-detail": {"get": 2},
+    "timed_text_tracks-list": {"get": 3},
+    "thumbnails-detail": {"get": 2},
+    "update_state": {"post": 3},
+}
+
+
+@override_settings(
+    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+    UPDATE_STATE_SHARED_SECRETS=["shared secret"],
+)
+class QueryBudgetsTestCase(TestCase):
+    """Check that each endpoint runs within its query budget."""
+
+    def setUp(self):
+        """Seed resources reachable from two consumer sites."""
+        super().setUp()
+        cache.clear()
+        self.targets = lti_load.seed(
+            consumer_sites=2, playlists=1, videos=1, documents=1, tracks=2
+        )
+        self.video = next(t.resource for t in self.targets if t.kind == "video")
+
+    def _get_token(self, resource):
+        """Return an instructor JWT token for a resource."""
+        jwt_token = AccessToken()
+        jwt_token.payload["resource_id"] = str(resource.id)
+        jwt_token.payload["roles"] = [random.choice(["instructor", "administrator"])]
+        jwt_token.payload["permissions"] = {"can_update": True}
+        return "Bearer {!s}".format(jwt_token)
+
+    def _check_lti_view(self, kind):
+        """Launch each target of a kind as a student, twice, and as an instructor."""
+        budgets = QUERY_BUDGETS[lti_load.LTI_VIEWS[kind]]
+        client = Client()
+        for target in [t for t in self.targets if t.kind == kind]:
+            with query_budget(budgets["student"]):
+                lti_load.launch(client, target, "student")
+            with query_budget(budgets["student_warm"]):
+                lti_load.launch(client, target, "student")
+            with query_budget(budgets["instructor"]):
+                lti_load.launch(client, target, "instructor")
+
+    def test_query_budgets_video_lti_view(self):
+        """Launching a video should run within its budget."""
+        self._check_lti_view("video")
+
+    def test_query_budgets_document_lti_view(self):
+        """Launching a document should run within its budget."""
+        self._check_lti_view("document")
+
+    def test_query_budgets_videos_detail(self):
+        """Reading and updating a video through the API should run within its budget."""
+        budgets = QUERY_BUDGETS["videos-detail"]
+        authorization = self._get_token(self.video)
+        url = "/api/videos/{!s}/".format(self.video.id)
+
+        with query_budget(budgets["get"]):
+            response = self.client.get(url, HTTP_AUTHORIZATION=authorization)
+        self.assertEqual(response.status_code, 200)
+
+        with query_budget(budgets["patch"]):
+            response = self.client.patch(
+                url,
+                {"title": "new title"},
+                content_type="application/json",
+                HTTP_AUTHORIZATION=authorization,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_budgets_documents_detail(self):
+        """Reading a document through the API should run within its budget."""
+        document = next(t.resource for t in self.targets if t.kind == "document")
+
+        with query_budget(QUERY_BUDGETS["documents-detail"]["get"]):
+            response = self.client.get(
+                "/api/documents/{!s}/".format(document.id),
+                HTTP_AUTHORIZATION=self._get_token(document),
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_budgets_timed_text_tracks_list(self):
+        """Listing the timed text tracks of a video should run within its budget."""
+        with query_budget(QUERY_BUDGETS["timed_text_tracks-list"]["get"]):
+            response = self.client.get(
+                "/api/timedtexttracks/", HTTP_AUTHORIZATION=self._get_token(self.video)
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 2)
+
+    def test_query_budgets_thumbnails_detail(self):
+        """Reading the thumbnail of a video should run within its budget."""
+        thumbnail = self.video.thumbnail
+
+        with query_budget(QUERY_BUDGETS["thumbnails-detail"]["get"]):
+            response = self.client.get(
+                "/api/thumbnails/{!s}/".format(thumbnail.id),
+                HTTP_AUTHORIZATION=self._get_token(self.video),
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_budgets_update_state(self):
+        """Updating the state of a video should run within its budget."""
+        body = json.dumps(
+            {
+                "extraParameters": {"resolutions": [144, 240, 480]},
+                "key": "{video!s}/video/{video!s}/1533686400".format(
+                    video=self.video.pk
+                ),
+                "state": READY,
+            }
+        )
+        signature = hmac.new(
+            b"shared secret", msg=body.encode("utf-8"), digestmod=hashlib.sha256
+        ).hexdigest()
+
+        with query_budget(QUERY_BUDGETS["update_state"]["post"]):
+            response = self.client.post(
+                "/api/update-state",
+                body,
+                content_type="application/json",
+                HTTP_X_MARSHA_SIGNATURE=signature,
+            )
+        self.assertEqual(response.status_code, 200)
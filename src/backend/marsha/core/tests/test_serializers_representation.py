@@ -0,0 +1,108 @@
+"""Test that serializers flattened by hand represent resources as their fields would."""
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from ..factories import (
+    DocumentFactory,
+    ThumbnailFactory,
+    TimedTextTrackFactory,
+    VideoFactory,
+)
+from ..serializers import (
+    DocumentSerializer,
+    ThumbnailSerializer,
+    TimedTextTrackSerializer,
+    VideoSerializer,
+)
+from .test_utils_cloudfront_utils import write_private_key
+
+
+class RepresentationParityTestCase(TestCase):
+    """Compare the read path of serializers to the representation built by their fields."""
+
+    def setUp(self):
+        """Create resources in all the states that change their representation."""
+        super().setUp()
+        cache.clear()
+        self.video = VideoFactory(
+            description="a description",
+            uploaded_on="2019-09-24 07:24:40+00",
+            upload_state="ready",
+            resolutions=[144, 240, 480],
+            should_use_subtitle_as_transcript=True,
+        )
+        ThumbnailFactory(
+            video=self.video, uploaded_on="2019-09-24 07:24:40+00", upload_state="ready"
+        )
+        TimedTextTrackFactory(
+            video=self.video,
+            language="fr",
+            mode="ts",
+            uploaded_on="2019-09-24 07:24:40+00",
+            upload_state="ready",
+        )
+        TimedTextTrackFactory(video=self.video, language="en", mode="cc")
+        self.pending_video = VideoFactory(description=None, show_download=False)
+        self.documents = [
+            DocumentFactory(
+                extension="pdf",
+                uploaded_on="2019-09-24 07:24:40+00",
+                upload_state="ready",
+            ),
+            DocumentFactory(extension=None),
+        ]
+
+    def assert_parity(self, serializer_class, instance):
+        """Assert that the read path renders the same bytes as the fields of the serializer."""
+        serializer = serializer_class(
+            serializer_class.setup_eager_loading(
+                type(instance).objects.filter(pk=instance.pk)
+            ).get()
+            if hasattr(serializer_class, "setup_eager_loading")
+            else type(instance).objects.get(pk=instance.pk)
+        )
+        expected = serializers.ModelSerializer.to_representation(
+            serializer, serializer.instance
+        )
+        self.assertEqual(
+            JSONRenderer().render(serializer.data), JSONRenderer().render(expected)
+        )
+
+    def check_all_resources(self):
+        """Check the parity of all serializers on all resources."""
+        for video in [self.video, self.pending_video]:
+            self.assert_parity(VideoSerializer, video)
+        for track in self.video.timedtexttracks.all():
+            self.assert_parity(TimedTextTrackSerializer, track)
+        self.assert_parity(ThumbnailSerializer, self.video.thumbnail)
+        for document in self.documents:
+            self.assert_parity(DocumentSerializer, document)
+
+    @override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False)
+    def test_serializers_representation_parity(self):
+        """The read path should be identical to the fields without signed urls."""
+        self.check_all_resources()
+
+    def test_serializers_representation_parity_signed_urls(self):
+        """The read path should be identical to the fields with signed urls."""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "cloudfront_private_key")
+        write_private_key(path)
+        try:
+            for wildcard in [False, True]:
+                with override_settings(
+                    CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+                    CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+                    CLOUDFRONT_PRIVATE_KEY_PATH=path,
+                    CLOUDFRONT_SIGNED_URLS_WILDCARD=wildcard,
+                ):
+                    self.check_all_resources()
+        finally:
+            shutil.rmtree(directory)
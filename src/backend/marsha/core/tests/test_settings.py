@@ -1,14 +1,15 @@
 """Test suite for Marsha's settings."""
 from unittest import mock
 
+from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
 
-from marsha.settings import get_release
+from marsha.settings import Test, get_release
 
 
 # pylint: disable=unused-argument
 class SettingsTestCase(TestCase):
-    """Battle test the settings.get_release function."""
+    """Battle test the settings.get_release function and the validation of the settings."""
 
     @mock.patch("builtins.open", side_effect=FileNotFoundError)
     def test_returns_default_without_version_file(self, *args):
@@ -25,3 +26,24 @@ class SettingsTestCase(TestCase):
         """Attempt (and fail) to get release from a broken version.json file."""
         with self.assertRaises(KeyError):
             get_release()
+
+    @mock.patch.multiple(
+        Test,
+        CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_DOMAIN=None,
+    )
+    def test_signed_cookies_without_domain(self, *args):
+        """Signed cookies can't be activated without the domain on which they are set."""
+        with self.assertRaises(ImproperlyConfigured):
+            Test.post_setup()
+
+    @mock.patch.multiple(
+        Test,
+        CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_DOMAIN=".example.com",
+    )
+    def test_signed_cookies_with_domain(self, *args):
+        """Signed cookies can be activated with the domain on which they are set."""
+        Test.post_setup()
@@ -0,0 +1,88 @@
+"""Test the aws_utils module of the Marsha project."""
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..utils import aws_utils, s3_utils
+
+
+class AWSUtilsTestCase(TestCase):
+    """Test sharing the clients of AWS services."""
+
+    def get_client(self, registry, access_key_id="access key"):
+        """Get a S3 client for an access key."""
+        return registry.get_client(
+            "s3",
+            region_name="eu-west-1",
+            signature_version="s3v4",
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key="secret",
+        )
+
+    def test_utils_aws_utils_get_client(self):
+        """A client should be created once for each configuration."""
+        registry = aws_utils.ClientRegistry()
+
+        client = self.get_client(registry)
+        self.assertIs(self.get_client(registry), client)
+        self.assertEqual(client.meta.region_name, "eu-west-1")
+        self.assertEqual(client.meta.config.signature_version, "s3v4")
+
+        other_client = self.get_client(registry, access_key_id="other access key")
+        self.assertIsNot(other_client, client)
+        self.assertIs(
+            self.get_client(registry, access_key_id="other access key"), other_client
+        )
+
+        registry.clear()
+        self.assertIsNot(self.get_client(registry), client)
+
+    def test_utils_aws_utils_get_client_threads(self):
+        """Threads getting a client at once should share a single client."""
+        registry = aws_utils.ClientRegistry()
+        barrier = threading.Barrier(4)
+        clients = []
+
+        def get_client():
+            barrier.wait()
+            clients.append(self.get_client(registry))
+
+        threads = [threading.Thread(target=get_client) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(clients), 4)
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    def test_utils_aws_utils_get_client_fork(self):
+        """Clients created before the process was forked should not be shared with it."""
+        registry = aws_utils.ClientRegistry()
+        client = self.get_client(registry)
+
+        with mock.patch.object(aws_utils.os, "getpid", return_value=registry._pid + 1):
+            child_client = self.get_client(registry)
+            self.assertIsNot(child_client, client)
+            self.assertIs(self.get_client(registry), child_client)
+
+    @override_settings(
+        AWS_ACCESS_KEY_ID="access key",
+        AWS_SECRET_ACCESS_KEY="secret",
+        AWS_S3_REGION_NAME="eu-west-1",
+        AWS_SOURCE_BUCKET_NAME="source-bucket",
+    )
+    def test_utils_s3_utils_create_presigned_post(self):
+        """Presigned posts should be computed with the S3 client shared by the process."""
+        client = s3_utils.get_s3_client()
+        self.assertIs(s3_utils.get_s3_client(), client)
+
+        policy = s3_utils.create_presigned_post(
+            [["content-length-range", 0, 1024]], {}, "abc/video/abc/1533686400"
+        )
+
+        self.assertEqual(policy["url"], "https://source-bucket.s3.amazonaws.com/")
+        self.assertEqual(policy["fields"]["key"], "abc/video/abc/1533686400")
+        self.assertEqual(policy["fields"]["acl"], "private")
+        self.assertIn("access key", policy["fields"]["x-amz-credential"])
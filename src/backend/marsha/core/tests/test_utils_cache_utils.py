@@ -0,0 +1,141 @@
+"""Test the cache utils of the Marsha core app."""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..utils.cache_utils import (
+    LOCK_CACHE_KEY,
+    VERSION_CACHE_KEY,
+    LRUCache,
+    get_or_compute,
+    get_versions,
+    invalidate_versions,
+)
+
+
+class LRUCacheTestCase(TestCase):
+    """Test our process-local LRU cache."""
+
+    def test_utils_cache_utils_lru_get_set(self):
+        """Values should be returned for known keys and the default otherwise."""
+        lru_cache = LRUCache(maxsize=2)
+        lru_cache.set("a", 1)
+
+        self.assertEqual(lru_cache.get("a"), 1)
+        self.assertIsNone(lru_cache.get("b"))
+        self.assertEqual(lru_cache.get("b", 2), 2)
+
+    def test_utils_cache_utils_lru_eviction(self):
+        """The least recently used entry should be evicted when the cache is full."""
+        lru_cache = LRUCache(maxsize=2)
+        lru_cache.set("a", 1)
+        lru_cache.set("b", 2)
+        # Reading "a" makes "b" the least recently used entry
+        lru_cache.get("a")
+        lru_cache.set("c", 3)
+
+        self.assertEqual(len(lru_cache), 2)
+        self.assertEqual(lru_cache.get("a"), 1)
+        self.assertIsNone(lru_cache.get("b"))
+        self.assertEqual(lru_cache.get("c"), 3)
+
+    def test_utils_cache_utils_lru_delete_clear(self):
+        """Entries can be removed one by one or all at once."""
+        lru_cache = LRUCache(maxsize=3)
+        lru_cache.set("a", 1)
+        lru_cache.set("b", 2)
+
+        lru_cache.delete("a")
+        lru_cache.delete("unknown")
+        self.assertIsNone(lru_cache.get("a"))
+        self.assertEqual(len(lru_cache), 1)
+
+        lru_cache.clear()
+        self.assertEqual(len(lru_cache), 0)
+
+
+class GetOrComputeTestCase(TestCase):
+    """Test the stampede protected access to the shared cache."""
+
+    def test_utils_cache_utils_get_or_compute_fresh(self):
+        """A fresh value should be computed once and then served from the cache."""
+        compute = mock.Mock(return_value={"a": 1})
+
+        self.assertEqual(get_or_compute("key", compute, 60, 60), {"a": 1})
+        self.assertEqual(get_or_compute("key", compute, 60, 60), {"a": 1})
+        self.assertEqual(compute.call_count, 1)
+        self.assertIsNone(cache.get(LOCK_CACHE_KEY.format(key="key")))
+
+    def test_utils_cache_utils_get_or_compute_none(self):
+        """A computed value of None should be cached as well."""
+        compute = mock.Mock(return_value=None)
+
+        self.assertIsNone(get_or_compute("key", compute, 60, 60))
+        self.assertIsNone(get_or_compute("key", compute, 60, 60))
+        self.assertEqual(compute.call_count, 1)
+
+    def test_utils_cache_utils_get_or_compute_stale(self):
+        """A stale value should be refreshed by the worker acquiring the lock."""
+        cache.set("key", {"value": "stale", "expires_at": 0}, 60)
+
+        self.assertEqual(get_or_compute("key", lambda: "fresh", 60, 60), "fresh")
+        self.assertEqual(get_or_compute("key", lambda: "other", 60, 60), "fresh")
+
+    def test_utils_cache_utils_get_or_compute_stale_locked(self):
+        """A stale value should be served while another worker refreshes it."""
+        cache.set("key", {"value": "stale", "expires_at": 0}, 60)
+        cache.set(LOCK_CACHE_KEY.format(key="key"), True, 10)
+        compute = mock.Mock(return_value="fresh")
+
+        self.assertEqual(get_or_compute("key", compute, 60, 60), "stale")
+        compute.assert_not_called()
+
+    def test_utils_cache_utils_get_or_compute_missing_locked(self):
+        """A missing value should be awaited while another worker computes it."""
+        compute = mock.Mock(return_value="other")
+        lock_key = LOCK_CACHE_KEY.format(key="key")
+        cache.set(lock_key, True, 10)
+
+        def compute_elsewhere(_seconds):
+            """Simulate the other worker storing the value while we are waiting."""
+            cache.delete(lock_key)
+            get_or_compute("key", lambda: "computed", 60, 60)
+
+        with mock.patch("time.sleep", side_effect=compute_elsewhere):
+            self.assertEqual(get_or_compute("key", compute, 60, 60), "computed")
+
+        compute.assert_not_called()
+
+    def test_utils_cache_utils_get_or_compute_lock_timeout(self):
+        """The value should be computed anyway if the lock is held for too long."""
+        cache.set(LOCK_CACHE_KEY.format(key="key"), True, 10)
+        compute = mock.Mock(return_value="computed")
+
+        with mock.patch("time.sleep"):
+            self.assertEqual(
+                get_or_compute("key", compute, 60, 60, lock_timeout=0), "computed"
+            )
+        compute.assert_called_once_with()
+
+
+class VersionsTestCase(TestCase):
+    """Test the versions scoping cached data."""
+
+    def test_utils_cache_utils_versions(self):
+        """Versions should be stable until they are invalidated, one by one."""
+        versions = get_versions("a", "b")
+        self.assertEqual(get_versions("a", "b"), versions)
+        version_a, version_b = versions.split("|")
+
+        invalidate_versions("a")
+        new_version_a, new_version_b = get_versions("a", "b").split("|")
+        self.assertNotEqual(new_version_a, version_a)
+        self.assertEqual(new_version_b, version_b)
+
+    def test_utils_cache_utils_versions_evicted(self):
+        """A new version should be started if a version was evicted from the cache."""
+        versions = get_versions("a")
+        cache.delete(VERSION_CACHE_KEY.format(name="a"))
+
+        self.assertNotEqual(get_versions("a"), versions)
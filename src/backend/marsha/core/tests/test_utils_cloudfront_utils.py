@@ -0,0 +1,215 @@
+"""Test the CloudFront utils of the Marsha core app."""
+from datetime import datetime
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+import pytz
+
+from ..utils import cloudfront_utils
+
+
+def write_private_key(path):
+    """Write a new RSA private key in a PEM file and return it."""
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048, backend=default_backend()
+    )
+    with open(path, "wb") as key_file:
+        key_file.write(
+            private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.TraditionalOpenSSL,
+                encryption_algorithm=serialization.NoEncryption(),
+            )
+        )
+    return private_key
+
+
+class PrivateKeyManagerTestCase(TestCase):
+    """Test loading and reloading the private keys signing CloudFront urls."""
+
+    def setUp(self):
+        """Create a directory for private keys and start with an empty key manager."""
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "cloudfront_private_key")
+        cloudfront_utils.key_manager.clear()
+        self.addCleanup(cloudfront_utils.key_manager.clear)
+
+    def _get_public_numbers(self, private_key):
+        """Return the public numbers of a private key to compare keys."""
+        return private_key.public_key().public_numbers()
+
+    def test_utils_cloudfront_utils_key_parsed_once(self):
+        """The private key should be parsed once for all signatures."""
+        write_private_key(self.path)
+
+        with override_settings(CLOUDFRONT_PRIVATE_KEY_PATH=self.path), mock.patch(
+            "marsha.core.utils.cloudfront_utils.serialization.load_pem_private_key",
+            wraps=serialization.load_pem_private_key,
+        ) as mock_load:
+            signatures = {cloudfront_utils.rsa_signer(b"message") for _ in range(3)}
+
+        mock_load.assert_called_once()
+        self.assertEqual(len(signatures), 1)
+
+    def test_utils_cloudfront_utils_key_reloaded(self):
+        """The private key should be reloaded when its file is modified."""
+        old_key = write_private_key(self.path)
+        self.assertEqual(
+            self._get_public_numbers(
+                cloudfront_utils.key_manager.get_private_key(self.path)
+            ),
+            self._get_public_numbers(old_key),
+        )
+
+        new_key = write_private_key(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        self.assertEqual(
+            self._get_public_numbers(
+                cloudfront_utils.key_manager.get_private_key(self.path)
+            ),
+            self._get_public_numbers(new_key),
+        )
+
+    def test_utils_cloudfront_utils_key_missing(self):
+        """Signing with a missing private key should fail."""
+        with override_settings(CLOUDFRONT_PRIVATE_KEY_PATH=self.path):
+            with self.assertRaises(cloudfront_utils.MissingRSAKey):
+                cloudfront_utils.rsa_signer(b"message")
+
+        with self.assertRaises(cloudfront_utils.MissingRSAKey):
+            cloudfront_utils.get_private_key_path("unknown-key-id")
+
+    def test_utils_cloudfront_utils_key_pairs(self):
+        """Urls should be signed with the key pair they are asked for."""
+        next_path = os.path.join(self.directory, "next_cloudfront_private_key")
+        write_private_key(self.path)
+        write_private_key(next_path)
+
+        with override_settings(
+            CLOUDFRONT_ACCESS_KEY_ID="current-key-id",
+            CLOUDFRONT_PRIVATE_KEY_PATH=self.path,
+            CLOUDFRONT_PRIVATE_KEY_PATHS={"next-key-id": next_path},
+        ):
+            self.assertEqual(cloudfront_utils.get_private_key_path(), self.path)
+            self.assertEqual(
+                cloudfront_utils.get_private_key_path("next-key-id"), next_path
+            )
+
+            date_less_than = datetime(2018, 8, 8, tzinfo=pytz.utc)
+            current_url = cloudfront_utils.get_cloudfront_signer().generate_presigned_url(
+                "https://abc.cloudfront.net/a.mp4", date_less_than=date_less_than
+            )
+            next_url = cloudfront_utils.get_cloudfront_signer(
+                "next-key-id"
+            ).generate_presigned_url(
+                "https://abc.cloudfront.net/a.mp4", date_less_than=date_less_than
+            )
+
+        self.assertIn("Key-Pair-Id=current-key-id", current_url)
+        self.assertIn("Key-Pair-Id=next-key-id", next_url)
+        self.assertNotEqual(
+            current_url.split("Signature=")[1], next_url.split("Signature=")[1]
+        )
+
+
+@override_settings(
+    CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+    CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET=600,
+)
+class SignedUrlCacheTestCase(TestCase):
+    """Test sharing the urls signed during the same bucket of time."""
+
+    def setUp(self):
+        """Create a private key and start with empty caches."""
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "cloudfront_private_key")
+        write_private_key(path)
+        settings_override = override_settings(CLOUDFRONT_PRIVATE_KEY_PATH=path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        cloudfront_utils.signature_counter.reset()
+
+    def test_utils_cloudfront_utils_expiration(self):
+        """The expiration date should be rounded up to the end of the bucket."""
+        now = datetime(2018, 8, 8, 0, 3, 20, tzinfo=pytz.utc)
+        with mock.patch.object(timezone, "now", return_value=now):
+            self.assertEqual(
+                cloudfront_utils.get_expiration(),
+                datetime(2018, 8, 8, 2, 10, tzinfo=pytz.utc),
+            )
+            with override_settings(CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET=0):
+                self.assertEqual(
+                    cloudfront_utils.get_expiration(),
+                    datetime(2018, 8, 8, 2, 3, 20, tzinfo=pytz.utc),
+                )
+
+    def test_utils_cloudfront_utils_signed_url_cached(self):
+        """A url should be signed once per bucket."""
+        url = "https://abc.cloudfront.net/a2f27fde/mp4/1533686400_144.mp4"
+
+        with mock.patch(
+            "marsha.core.utils.cloudfront_utils.rsa_signer",
+            wraps=cloudfront_utils.rsa_signer,
+        ) as mock_signer:
+            with mock.patch.object(
+                timezone,
+                "now",
+                return_value=datetime(2018, 8, 8, 0, 1, tzinfo=pytz.utc),
+            ):
+                signed_url = cloudfront_utils.get_signed_url(url)
+            with mock.patch.object(
+                timezone,
+                "now",
+                return_value=datetime(2018, 8, 8, 0, 9, tzinfo=pytz.utc),
+            ):
+                self.assertEqual(cloudfront_utils.get_signed_url(url), signed_url)
+                self.assertEqual(mock_signer.call_count, 1)
+
+            # The next bucket gets a new signature
+            with mock.patch.object(
+                timezone,
+                "now",
+                return_value=datetime(2018, 8, 8, 0, 11, tzinfo=pytz.utc),
+            ):
+                next_signed_url = cloudfront_utils.get_signed_url(url)
+            self.assertEqual(mock_signer.call_count, 2)
+
+        self.assertIn("Expires=1533694200&", signed_url)
+        self.assertIn("Expires=1533694800&", next_signed_url)
+        self.assertEqual(
+            cloudfront_utils.signature_counter.get_stats(),
+            {"hits": 1, "misses": 2, "hit_ratio": 1 / 3},
+        )
+
+    def test_utils_cloudfront_utils_signed_query_cached(self):
+        """A wildcard policy should be signed once per bucket."""
+        resource = "https://abc.cloudfront.net/a2f27fde/*"
+
+        with mock.patch(
+            "marsha.core.utils.cloudfront_utils.rsa_signer",
+            wraps=cloudfront_utils.rsa_signer,
+        ) as mock_signer:
+            signed_query = cloudfront_utils.get_signed_query(resource)
+            self.assertEqual(cloudfront_utils.get_signed_query(resource), signed_query)
+
+            with override_settings(CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET=0):
+                cloudfront_utils.get_signed_query(resource)
+
+        self.assertEqual(mock_signer.call_count, 2)
+        self.assertTrue(signed_query.startswith("Policy="))
@@ -0,0 +1,91 @@
+"""Test the database utils of the Marsha core app."""
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from ..factories import ConsumerSiteFactory, PlaylistFactory, VideoFactory
+from ..models import Playlist, Video
+from ..utils.db_utils import insert_or_get
+
+
+class InsertOrGetTestCase(TestCase):
+    """Test the race-free insertion of model instances."""
+
+    def test_utils_db_utils_insert_or_get_insert(self):
+        """A new instance should be inserted in a single query."""
+        consumer_site = ConsumerSiteFactory()
+
+        with self.assertNumQueries(1):
+            playlist, created = insert_or_get(
+                Playlist(lti_id="a-playlist", consumer_site=consumer_site, title="a"),
+                ["lti_id", "consumer_site"],
+                conflict_condition="deleted IS NULL",
+            )
+
+        self.assertTrue(created)
+        self.assertFalse(playlist._state.adding)  # pylint: disable=protected-access
+        self.assertEqual(Playlist.objects.get(), playlist)
+        self.assertIsNotNone(Playlist.objects.get().created_on)
+
+    def test_utils_db_utils_insert_or_get_existing(self):
+        """The existing row should be returned when the instance conflicts with it."""
+        existing = PlaylistFactory(title="existing")
+
+        with self.assertNumQueries(1):
+            playlist, created = insert_or_get(
+                Playlist(
+                    lti_id=existing.lti_id,
+                    consumer_site=existing.consumer_site,
+                    title="new",
+                ),
+                ["lti_id", "consumer_site"],
+                conflict_condition="deleted IS NULL",
+            )
+
+        self.assertFalse(created)
+        self.assertEqual(playlist.id, existing.id)
+        self.assertIsInstance(playlist.id, uuid.UUID)
+        self.assertEqual(playlist.title, "existing")
+        self.assertEqual(playlist.created_on, existing.created_on)
+        self.assertEqual(Playlist.objects.count(), 1)
+
+    def test_utils_db_utils_insert_or_get_partial_index(self):
+        """Rows excluded from a partial unique index should not conflict."""
+        existing = PlaylistFactory()
+        existing.delete()
+
+        playlist, created = insert_or_get(
+            Playlist(
+                lti_id=existing.lti_id, consumer_site=existing.consumer_site, title="a"
+            ),
+            ["lti_id", "consumer_site"],
+            conflict_condition="deleted IS NULL",
+        )
+
+        self.assertTrue(created)
+        self.assertNotEqual(playlist.id, existing.id)
+
+    def test_utils_db_utils_insert_or_get_primary_key(self):
+        """Instances can be identified by their primary key, array fields included."""
+        video = VideoFactory(title="existing", resolutions=[144, 240])
+
+        existing, created = insert_or_get(
+            Video(id=video.id, lti_id="new", playlist=video.playlist, title="new"),
+            ["id"],
+        )
+
+        self.assertFalse(created)
+        self.assertEqual(existing.title, "existing")
+        self.assertEqual(existing.resolutions, [144, 240])
+        self.assertEqual(existing.playlist_id, video.playlist_id)
+
+    def test_utils_db_utils_insert_or_get_invalid(self):
+        """Instances should be validated before being inserted."""
+        with self.assertRaises(ValidationError):
+            insert_or_get(
+                Playlist(lti_id="", consumer_site=ConsumerSiteFactory(), title="a"),
+                ["lti_id", "consumer_site"],
+                conflict_condition="deleted IS NULL",
+            )
+        self.assertEqual(Playlist.objects.count(), 0)
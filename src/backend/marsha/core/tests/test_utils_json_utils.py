@@ -0,0 +1,107 @@
+"""Test the JSON utils, renderer and parser of the Marsha core app."""
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+import unittest
+from unittest import mock
+import uuid
+
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+
+import pytz
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+
+from ..benchmarks.api import build_video
+from ..parsers import JSONParser
+from ..renderers import JSONRenderer
+from ..serializers import VideoSerializer
+from ..utils import json_utils
+
+
+class JSONUtilsTestCase(TestCase):
+    """Test encoding and decoding JSON with or without orjson."""
+
+    def _check_dumps(self):
+        """Check the types we encode and the format of the document."""
+        pk = uuid.UUID("4b7a6ab6-6b43-4d78-bdbd-5a3cbe56fdd5")
+        self.assertEqual(
+            json_utils.dumps(
+                {
+                    "id": pk,
+                    "uploaded_on": datetime(2020, 6, 8, 12, 30, tzinfo=pytz.utc),
+                    "label": gettext_lazy("video"),
+                    "price": Decimal("1.10"),
+                    "thumbnails": {144: "a.jpg", 240: "b.jpg"},
+                    "title": "Leçon\u2028d'été",
+                }
+            ),
+            (
+                '{"id":"4b7a6ab6-6b43-4d78-bdbd-5a3cbe56fdd5",'
+                '"uploaded_on":"2020-06-08T12:30:00+00:00","label":"video",'
+                '"price":"1.10","thumbnails":{"144":"a.jpg","240":"b.jpg"},'
+                '"title":"Leçon\\u2028d\'été"}'
+            ).encode("utf-8"),
+        )
+
+        with self.assertRaises(TypeError):
+            json_utils.dumps({"value": object()})
+
+    def _check_loads(self):
+        """Check decoding valid and invalid documents."""
+        self.assertEqual(
+            json_utils.loads('{"title":"Leçon","count":2}'.encode("utf-8")),
+            {"title": "Leçon", "count": 2},
+        )
+        for content in [b"{", b'{"value": NaN}']:
+            with self.assertRaises(ValueError):
+                json_utils.loads(content)
+
+    def test_utils_json_utils_standard_library(self):
+        """The standard library should be used if orjson is not installed."""
+        with mock.patch.object(json_utils, "orjson", None):
+            self._check_dumps()
+            self._check_loads()
+
+    @unittest.skipIf(json_utils.orjson is None, "orjson is not installed")
+    def test_utils_json_utils_orjson(self):
+        """orjson should produce the same documents as the standard library."""
+        self._check_dumps()
+        self._check_loads()
+
+    def test_utils_json_utils_renderer_parity(self):
+        """A video should be rendered as Django Rest Framework renders it."""
+        data = VideoSerializer(build_video()).data
+        with mock.patch.object(json_utils, "orjson", None):
+            self.assertEqual(
+                JSONRenderer().render(data), renderers.JSONRenderer().render(data)
+            )
+        self.assertEqual(
+            JSONRenderer().render(data), renderers.JSONRenderer().render(data)
+        )
+
+    def test_utils_json_utils_renderer_indent(self):
+        """Pretty printed responses should still be rendered by Django Rest Framework."""
+        self.assertEqual(JSONRenderer().render(None), b"")
+        self.assertEqual(
+            JSONRenderer().render({"a": 1}, "application/json; indent=2"),
+            b'{\n  "a": 1\n}',
+        )
+
+    def test_utils_json_utils_parser(self):
+        """Requests should be parsed as JSON and invalid ones rejected."""
+        parser = JSONParser()
+        self.assertEqual(
+            parser.parse(BytesIO('{"title":"Leçon"}'.encode("utf-8"))),
+            {"title": "Leçon"},
+        )
+        self.assertEqual(
+            parser.parse(
+                BytesIO('{"title":"Leçon"}'.encode("latin-1")),
+                parser_context={"encoding": "latin-1"},
+            ),
+            {"title": "Leçon"},
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b"{"))
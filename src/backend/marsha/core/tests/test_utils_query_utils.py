@@ -0,0 +1,44 @@
+"""Test the query instrumentation utils of the Marsha core app."""
+from django.test import TestCase
+
+from ..factories import VideoFactory
+from ..models import Video
+from ..utils.query_utils import QueryBudgetExceeded, QueryRecorder, query_budget
+
+
+class QueryRecorderTestCase(TestCase):
+    """Test recording the queries run by a block of code."""
+
+    def test_utils_query_utils_recorder(self):
+        """Queries should be counted, timed and duplicates detected."""
+        videos = VideoFactory.create_batch(2)
+
+        with QueryRecorder() as recorder:
+            Video.objects.get(id=videos[0].id)
+            Video.objects.get(id=videos[0].id)
+            Video.objects.get(id=videos[1].id)
+        # Queries run after the block are not recorded
+        Video.objects.count()
+
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicates, 1)
+        self.assertEqual(recorder.similar, 2)
+        self.assertGreater(recorder.duration, 0)
+        stats = recorder.get_stats()
+        self.assertEqual(stats["queries_count"], 3)
+        self.assertEqual(stats["queries_duplicates"], 1)
+        self.assertEqual(stats["queries_similar"], 2)
+
+    def test_utils_query_utils_budget(self):
+        """A block of code running more queries than its budget should fail."""
+        with query_budget(2):
+            Video.objects.count()
+            Video.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded) as context:
+            with query_budget(1):
+                Video.objects.count()
+                Video.objects.exists()
+
+        self.assertIn("2 queries run for a budget of 1", str(context.exception))
+        self.assertIn("2. SELECT", str(context.exception))
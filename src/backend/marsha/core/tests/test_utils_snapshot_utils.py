@@ -0,0 +1,137 @@
+"""Test the snapshot utils of the Marsha core app."""
+import json
+
+from django.test import TestCase, override_settings
+
+from ..factories import (
+    DocumentFactory,
+    ThumbnailFactory,
+    TimedTextTrackFactory,
+    VideoFactory,
+)
+from ..models import Document, Video
+from ..serializers import VideoSerializer
+from ..utils import snapshot_utils
+
+
+@override_settings(CLOUDFRONT_SIGNED_URLS_ACTIVE=False)
+class SnapshotUtilsTestCase(TestCase):
+    """Test maintaining the snapshots of resources served to LTI launches."""
+
+    def _refresh(self, resource):
+        """Simulate the commit of the transaction, which never happens in a test."""
+        snapshot_utils.refresh_snapshots(type(resource).objects.filter(pk=resource.pk))
+        resource.refresh_from_db()
+        return resource
+
+    def test_utils_snapshot_utils_refresh(self):
+        """The snapshot of a video should be its representation with unsigned urls."""
+        video = VideoFactory(
+            uploaded_on="2019-09-24 07:24:40+00",
+            upload_state="ready",
+            resolutions=[144, 240],
+        )
+        TimedTextTrackFactory(
+            video=video, uploaded_on="2019-09-24 07:24:40+00", upload_state="ready"
+        )
+        self.assertIn("invalidated", Video.objects.get(pk=video.pk).snapshot)
+
+        video = self._refresh(video)
+        self.assertEqual(
+            video.snapshot["version"], snapshot_utils.get_snapshot_version()
+        )
+        self.assertEqual(
+            video.snapshot["data"], json.loads(json.dumps(VideoSerializer(video).data))
+        )
+
+        # A fresh snapshot is read without any query
+        with self.assertNumQueries(0):
+            data = snapshot_utils.get_snapshot_data(video)
+        self.assertEqual(data["id"], str(video.pk))
+        self.assertEqual(len(data["timed_text_tracks"]), 1)
+
+    def test_utils_snapshot_utils_invalidation(self):
+        """Saving an object a snapshot is built from should invalidate the snapshot."""
+        video = self._refresh(VideoFactory(title="first title"))
+
+        video.title = "second title"
+        video.save()
+        self.assertFalse(snapshot_utils.is_fresh(video.snapshot))
+        self.assertEqual(
+            snapshot_utils.get_snapshot_data(video)["title"], "second title"
+        )
+
+        video.title = "third title"
+        video.save(update_fields=["title"])
+        video.refresh_from_db()
+        self.assertFalse(snapshot_utils.is_fresh(video.snapshot))
+        self.assertEqual(
+            snapshot_utils.get_snapshot_data(video)["title"], "third title"
+        )
+
+        ThumbnailFactory(video=video)
+        video.refresh_from_db()
+        self.assertFalse(snapshot_utils.is_fresh(video.snapshot))
+        self.assertIsNotNone(snapshot_utils.get_snapshot_data(video)["thumbnail"])
+
+    def test_utils_snapshot_utils_playlist_title(self):
+        """Renaming a playlist should invalidate the snapshots of its resources."""
+        document = self._refresh(
+            DocumentFactory(
+                title="notes",
+                extension="pdf",
+                playlist__title="first playlist",
+                uploaded_on="2019-09-24 07:24:40+00",
+            )
+        )
+        self.assertEqual(
+            document.snapshot["data"]["filename"], "first-playlist_notes.pdf"
+        )
+
+        playlist = document.playlist
+        playlist.title = "second playlist"
+        playlist.save()
+
+        document.refresh_from_db()
+        self.assertEqual(
+            snapshot_utils.get_snapshot_data(document)["filename"],
+            "second-playlist_notes.pdf",
+        )
+
+    def test_utils_snapshot_utils_compare_and_set(self):
+        """A snapshot invalidated while it is rebuilt should not be overwritten."""
+        video = VideoFactory()
+        stale_video = Video.objects.get(pk=video.pk)
+        snapshot_utils.invalidate_snapshots(Video.objects.filter(pk=video.pk))
+
+        self.assertFalse(
+            snapshot_utils.save_snapshot(
+                stale_video, snapshot_utils.build_snapshot(stale_video)
+            )
+        )
+        video.refresh_from_db()
+        self.assertIn("invalidated", video.snapshot)
+
+        self.assertTrue(
+            snapshot_utils.save_snapshot(video, snapshot_utils.build_snapshot(video))
+        )
+        video.refresh_from_db()
+        self.assertTrue(snapshot_utils.is_fresh(video.snapshot))
+
+    @override_settings(CLOUDFRONT_DOMAIN="xyz.cloudfront.net")
+    def test_utils_snapshot_utils_version(self):
+        """Snapshots built with other settings should be rebuilt."""
+        document = DocumentFactory(uploaded_on="2019-09-24 07:24:40+00")
+        with override_settings(CLOUDFRONT_DOMAIN="abc.cloudfront.net"):
+            document = self._refresh(document)
+            self.assertTrue(snapshot_utils.is_fresh(document.snapshot))
+
+        self.assertFalse(snapshot_utils.is_fresh(document.snapshot))
+        self.assertTrue(
+            snapshot_utils.get_snapshot_data(document)["url"].startswith(
+                "https://xyz.cloudfront.net/"
+            )
+        )
+        self.assertTrue(
+            snapshot_utils.is_fresh(Document.objects.get(pk=document.pk).snapshot)
+        )
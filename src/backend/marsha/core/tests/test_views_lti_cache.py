@@ -6,11 +6,26 @@ import re
 import time
 from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from rest_framework_simplejwt.tokens import AccessToken
 
 from ..defaults import STATE_CHOICES
-from ..factories import ConsumerSiteFactory, VideoFactory
+from ..factories import (
+    ConsumerSiteFactory,
+    PlaylistFactory,
+    TimedTextTrackFactory,
+    VideoFactory,
+)
 from ..lti import LTI
+from ..utils.cache_utils import (
+    CONSUMER_SITE_VERSION,
+    LOCK_CACHE_KEY,
+    RESOURCE_VERSION,
+    get_versions,
+)
+from ..views import BaseLTIView
 
 
 # We don't enforce arguments documentation in tests
@@ -56,6 +71,7 @@ class CacheLTIViewTestCase(TestCase):
             "user_id": "111",
         }
 
+        # The snapshot of the video is built on the first launch since tests never commit
         with self.assertNumQueries(4):
             elapsed, resource_origin = self._post_lti_request(url, data)
         self.assertEqual(resource_origin["id"], str(video1.id))
@@ -68,9 +84,10 @@ class CacheLTIViewTestCase(TestCase):
         self.assertEqual(resource, resource_origin)
         self.assertTrue(elapsed < 0.01)
 
-        # The cache should not be hit on first call if we change the playlist id
+        # The cache should not be hit on first call if we change the playlist id but
+        # the snapshot of the video is read in a single query
         data["context_id"] = "other_playlist"
-        with self.assertNumQueries(4):
+        with self.assertNumQueries(1):
             elapsed, resource = self._post_lti_request(url, data)
         self.assertEqual(resource, resource_origin)
         self.assertTrue(elapsed < 0.1)
@@ -82,7 +99,7 @@ class CacheLTIViewTestCase(TestCase):
 
         # The cache should not be hit on first call if we change the domain
         mock_get_consumer_site.return_value = ConsumerSiteFactory()
-        with self.assertNumQueries(4):
+        with self.assertNumQueries(1):
             elapsed, resource = self._post_lti_request(url, data)
         self.assertEqual(resource, resource_origin)
         self.assertTrue(elapsed < 0.1)
@@ -140,7 +157,204 @@ class CacheLTIViewTestCase(TestCase):
 
         # Calling the same resource a second time with the same LTI parameters
         # should not hit the cache
-        with self.assertNumQueries(4):
+        with self.assertNumQueries(1):
             elapsed, resource = self._post_lti_request(url, data)
         self.assertEqual(resource, resource_origin)
         self.assertTrue(elapsed < 0.1)
+
+    @mock.patch.object(LTI, "verify")
+    @mock.patch.object(LTI, "get_consumer_site")
+    def test_views_lti_cache_student_stale(self, mock_get_consumer_site, mock_verify):
+        """Stale responses should be served to students while another worker refreshes them."""
+        video = VideoFactory(
+            playlist__is_portable_to_playlist=True,
+            uploaded_on="2019-09-24 07:24:40+00",
+            resolutions=[144, 240],
+        )
+        mock_get_consumer_site.return_value = video.playlist.consumer_site
+
+        url = "/lti/videos/{!s}".format(video.pk)
+        data = {
+            "resource_link_id": video.lti_id,
+            "context_id": video.playlist.lti_id,
+            "roles": "student",
+            "user_id": "111",
+        }
+        _elapsed, resource_origin = self._post_lti_request(url, data)
+
+        # Expire the cached app data and simulate another worker refreshing it
+        cache_key = "app_data|Video|{domain:s}|{context:s}|{resource!s}|{version:s}".format(
+            domain=video.playlist.consumer_site.domain,
+            context=video.playlist.lti_id,
+            resource=video.pk,
+            version=get_versions(
+                RESOURCE_VERSION.format(model="Video", pk=video.pk),
+                CONSUMER_SITE_VERSION.format(pk=video.playlist.consumer_site.pk),
+            ),
+        )
+        entry = cache.get(cache_key)
+        entry["expires_at"] = 0
+        cache.set(cache_key, entry)
+        cache.set(LOCK_CACHE_KEY.format(key=cache_key), True)
+
+        with self.assertNumQueries(0):
+            _elapsed, resource = self._post_lti_request(url, data)
+        self.assertEqual(resource, resource_origin)
+
+        # Once the lock is released, the next request refreshes the app data
+        cache.delete(LOCK_CACHE_KEY.format(key=cache_key))
+        with self.assertNumQueries(1):
+            self._post_lti_request(url, data)
+        self.assertGreater(cache.get(cache_key)["expires_at"], 0)
+
+    @mock.patch.object(LTI, "verify")
+    @mock.patch.object(LTI, "get_consumer_site")
+    def test_views_lti_cache_student_invalidation(
+        self, mock_get_consumer_site, mock_verify
+    ):
+        """Cached responses should be invalidated when the resource or portability changes."""
+        video = VideoFactory(
+            playlist__is_portable_to_playlist=True,
+            uploaded_on="2019-09-24 07:24:40+00",
+            resolutions=[144, 240],
+        )
+        mock_get_consumer_site.return_value = video.playlist.consumer_site
+
+        url = "/lti/videos/{!s}".format(video.pk)
+        data = {
+            "resource_link_id": video.lti_id,
+            "context_id": "other_playlist",
+            "roles": "student",
+            "user_id": "111",
+        }
+        _elapsed, resource = self._post_lti_request(url, data)
+        self.assertEqual(resource["title"], video.title)
+        with self.assertNumQueries(0):
+            self._post_lti_request(url, data)
+
+        # Updating the video invalidates the cache
+        video.title = "new title"
+        video.save()
+        _elapsed, resource = self._post_lti_request(url, data)
+        self.assertEqual(resource["title"], "new title")
+        with self.assertNumQueries(0):
+            self._post_lti_request(url, data)
+
+        # Adding a timed text track to the video invalidates the cache
+        TimedTextTrackFactory(video=video, upload_state="ready")
+        with self.assertNumQueries(4):
+            _elapsed, resource = self._post_lti_request(url, data)
+        self.assertEqual(len(resource["timed_text_tracks"]), 1)
+
+        # Changing portability invalidates the cache
+        playlist = video.playlist
+        playlist.is_portable_to_playlist = False
+        playlist.save()
+        _elapsed, resource = self._post_lti_request(url, data)
+        self.assertIsNone(resource)
+
+    @mock.patch.object(LTI, "verify")
+    @mock.patch.object(LTI, "get_consumer_site")
+    def test_views_lti_cache_student_portability_scope(
+        self, mock_get_consumer_site, mock_verify
+    ):
+        """Only portability changes that may affect a cached launch should invalidate it."""
+        video = VideoFactory(
+            uploaded_on="2019-09-24 07:24:40+00", resolutions=[144, 240],
+        )
+        consumer_site = ConsumerSiteFactory()
+        mock_get_consumer_site.return_value = consumer_site
+
+        url = "/lti/videos/{!s}".format(video.pk)
+        data = {
+            "resource_link_id": video.lti_id,
+            "context_id": "other_playlist",
+            "roles": "student",
+            "user_id": "111",
+        }
+        _elapsed, resource = self._post_lti_request(url, data)
+        self.assertIsNone(resource)
+
+        # Renaming another playlist or saving another consumer site keeps the cache
+        playlist = PlaylistFactory()
+        playlist.title = "new title"
+        playlist.save()
+        ConsumerSiteFactory().save()
+        with self.assertNumQueries(0):
+            _elapsed, resource = self._post_lti_request(url, data)
+        self.assertIsNone(resource)
+
+        # Making the consumer site of the video portable to the launching site invalidates it
+        video.playlist.consumer_site.portable_to.add(consumer_site)
+        _elapsed, resource = self._post_lti_request(url, data)
+        self.assertEqual(resource["id"], str(video.pk))
+
+        # And so does removing the link
+        video.playlist.consumer_site.portable_to.remove(consumer_site)
+        _elapsed, resource = self._post_lti_request(url, data)
+        self.assertIsNone(resource)
+
+    def test_views_lti_cache_duration_local_cache(self):
+        """App data should only be cached briefly when the cache is local to each process."""
+        with override_settings(
+            CLOUDFRONT_SIGNED_URLS_ACTIVE=False,
+            APP_DATA_CACHE_DURATION=3600,
+            APP_DATA_CACHE_LOCAL_DURATION=60,
+        ):
+            # The default cache of the test settings is local to the process
+            self.assertEqual(BaseLTIView._get_app_data_cache_duration(), 60)
+
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+                        "LOCATION": "memcached:11211",
+                    }
+                }
+            ):
+                self.assertEqual(BaseLTIView._get_app_data_cache_duration(), 3600)
+
+    @mock.patch.object(LTI, "verify")
+    @mock.patch.object(LTI, "get_consumer_site")
+    def test_views_lti_cache_student_jwt(self, mock_get_consumer_site, mock_verify):
+        """Each student should get its own JWT token spliced into the cached page."""
+        video = VideoFactory(
+            # Try to confuse the placeholder replacement with a crafted title
+            title='"jwt": ""',
+            playlist__is_portable_to_playlist=True,
+            uploaded_on="2019-09-24 07:24:40+00",
+            resolutions=[144, 240],
+        )
+        mock_get_consumer_site.return_value = video.playlist.consumer_site
+
+        url = "/lti/videos/{!s}".format(video.pk)
+        data = {
+            "resource_link_id": video.lti_id,
+            "context_id": video.playlist.lti_id,
+            "roles": "student",
+            "launch_presentation_locale": "fr",
+        }
+
+        tokens = []
+        for user_id in ["111", "222"]:
+            response = self.client.post(url, {**data, "user_id": user_id})
+            match = re.search(
+                '<div id="marsha-frontend-data" data-context="(.*)">',
+                response.content.decode("utf-8"),
+            )
+            context = json.loads(unescape(match.group(1)))
+            self.assertEqual(context["resource"]["title"], '"jwt": ""')
+
+            jwt_token = AccessToken(context["jwt"])
+            self.assertEqual(jwt_token.payload["user_id"], user_id)
+            self.assertEqual(jwt_token.payload["resource_id"], str(video.id))
+            self.assertEqual(jwt_token.payload["locale"], "fr_FR")
+            self.assertEqual(
+                jwt_token.payload["permissions"],
+                {"can_access_dashboard": False, "can_update": False},
+            )
+            tokens.append(jwt_token)
+
+        self.assertNotEqual(
+            tokens[0].payload["session_id"], tokens[1].payload["session_id"]
+        )
@@ -1,4 +1,5 @@
 """Test the LTI video view."""
+import base64
 from html import unescape
 import json
 from logging import Logger
@@ -7,6 +8,7 @@ import re
 from unittest import mock
 import uuid
 
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 
 from pylti.common import LTIException
@@ -19,6 +21,7 @@ from ..factories import (
     VideoFactory,
 )
 from ..lti import LTI
+from .test_api_video import RSA_KEY_MOCK
 
 
 # We don't enforce arguments documentation in tests
@@ -569,6 +572,119 @@ class VideoLTIViewTestCase(TestCase):
         # signature)
         self.assertEqual(mock_verify.call_count, 1)
 
+    @mock.patch.object(LTI, "verify")
+    @mock.patch.object(LTI, "get_consumer_site")
+    @mock.patch("builtins.open", new_callable=mock.mock_open, read_data=RSA_KEY_MOCK)
+    @override_settings(
+        CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_DOMAIN=".cloudfront.net",
+        CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+    )
+    def test_views_lti_video_post_student_signed_cookies(
+        self, mock_open, mock_get_consumer_site, mock_verify
+    ):
+        """Signed cookies should grant access to the files of the video in cookie mode."""
+        cache.clear()
+        passport = ConsumerSiteLTIPassportFactory()
+        video = VideoFactory(
+            id="59c0fc7a-0f64-46c0-993f-bdf47ecd837f",
+            playlist__lti_id="course-v1:ufr+mathematics+00001",
+            playlist__consumer_site=passport.consumer_site,
+            playlist__title="playlist-002",
+            upload_state=READY,
+            uploaded_on="2019-09-24 07:24:40+00",
+            resolutions=[144],
+        )
+        data = {
+            "resource_link_id": video.lti_id,
+            "context_id": video.playlist.lti_id,
+            "roles": "student",
+            "oauth_consumer_key": passport.oauth_consumer_key,
+            "user_id": "56255f3807599c377bf0e5bf072359fd",
+        }
+        mock_get_consumer_site.return_value = passport.consumer_site
+
+        response = self.client.post("/lti/videos/{!s}".format(video.pk), data)
+        self.assertEqual(response.status_code, 200)
+
+        for name in ["Policy", "Signature", "Key-Pair-Id"]:
+            cookie = response.cookies["CloudFront-{:s}".format(name)]
+            self.assertEqual(cookie["domain"], ".cloudfront.net")
+            self.assertEqual(cookie["path"], "/59c0fc7a-0f64-46c0-993f-bdf47ecd837f/")
+            self.assertTrue(cookie["secure"])
+            self.assertTrue(cookie["httponly"])
+            self.assertEqual(cookie["samesite"], "None")
+        self.assertEqual(
+            response.cookies["CloudFront-Key-Pair-Id"].value, "cloudfront-access-key-id"
+        )
+        policy = json.loads(
+            base64.b64decode(
+                response.cookies["CloudFront-Policy"]
+                .value.replace("-", "+")
+                .replace("_", "=")
+                .replace("~", "/")
+            )
+        )
+        self.assertEqual(
+            policy["Statement"][0]["Resource"],
+            "https://abc.cloudfront.net/59c0fc7a-0f64-46c0-993f-bdf47ecd837f/*",
+        )
+
+        # Urls are not signed
+        match = re.search(
+            '<div id="marsha-frontend-data" data-context="(.*)">',
+            response.content.decode("utf-8"),
+        )
+        context = json.loads(unescape(match.group(1)))
+        self.assertEqual(
+            context["resource"]["urls"]["mp4"]["144"],
+            "https://abc.cloudfront.net/59c0fc7a-0f64-46c0-993f-bdf47ecd837f/mp4/"
+            "1569309880_144.mp4?response-content-disposition=attachment%3B+filename%3D"
+            "playlist-002_1569309880.mp4",
+        )
+
+    @mock.patch.object(LTI, "verify")
+    @mock.patch.object(LTI, "get_consumer_site")
+    @mock.patch("builtins.open", new_callable=mock.mock_open, read_data=RSA_KEY_MOCK)
+    @override_settings(
+        CLOUDFRONT_SIGNED_URLS_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_ACTIVE=True,
+        CLOUDFRONT_SIGNED_COOKIES_DOMAIN=".cloudfront.net",
+        CLOUDFRONT_ACCESS_KEY_ID="cloudfront-access-key-id",
+    )
+    def test_views_lti_video_post_student_signed_cookies_unreachable(
+        self, mock_open, mock_get_consumer_site, mock_verify
+    ):
+        """No signed cookie should be set when the video is not reachable from the launch."""
+        cache.clear()
+        passport = ConsumerSiteLTIPassportFactory()
+        # The video is ready but in a playlist of another site that is not portable
+        video = VideoFactory(
+            upload_state=READY, uploaded_on="2019-09-24 07:24:40+00", resolutions=[144],
+        )
+        data = {
+            "resource_link_id": video.lti_id,
+            "context_id": "course-v1:ufr+mathematics+00001",
+            "roles": "student",
+            "oauth_consumer_key": passport.oauth_consumer_key,
+            "user_id": "56255f3807599c377bf0e5bf072359fd",
+        }
+        mock_get_consumer_site.return_value = passport.consumer_site
+
+        # Neither when the page is rendered nor when it is served from the cache
+        for _ in range(2):
+            response = self.client.post("/lti/videos/{!s}".format(video.pk), data)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(
+                [name for name in response.cookies if name.startswith("CloudFront-")]
+            )
+            match = re.search(
+                '<div id="marsha-frontend-data" data-context="(.*)">',
+                response.content.decode("utf-8"),
+            )
+            self.assertIsNone(json.loads(unescape(match.group(1)))["resource"])
+
     @mock.patch.object(LTI, "verify")
     @mock.patch.object(LTI, "get_consumer_site")
     def test_views_lti_video_post_student_no_video(
@@ -0,0 +1,87 @@
+"""Utils to share the clients of AWS services across the requests served by a process."""
+import os
+import threading
+
+import boto3
+from botocore.client import Config
+
+
+class ClientRegistry:
+    """Create the clients of AWS services once per process and configuration.
+
+    Creating a client loads the models of its service with botocore, which costs much more
+    than the call made with it (e.g. computing a presigned post). Clients are thread-safe once
+    created, so a client is shared by all the threads of a process. They are not shared with a
+    forked process though (e.g. when gunicorn preloads the application): their connection
+    pools would be shared with the parent process.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._pid = os.getpid()
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _check_pid(self):
+        """Forget the clients created before the process was forked."""
+        pid = os.getpid()
+        if self._pid != pid:
+            # The lock may have been held by another thread of the parent process
+            self._lock = threading.Lock()
+            self._clients = {}
+            self._pid = pid
+
+    def get_client(
+        self, service_name, region_name=None, signature_version=None, **credentials
+    ):
+        """Return the client of an AWS service for a configuration, creating it only once.
+
+        Parameters
+        ----------
+        service_name: Type[string]
+            The name of the AWS service, e.g. "s3".
+        region_name: Type[string]
+            The region of the service.
+        signature_version: Type[string]
+            The version of the signature of the requests, e.g. "s3v4".
+        credentials: Type[Dict]
+            The ``aws_access_key_id`` and ``aws_secret_access_key`` of the client.
+
+        Returns
+        -------
+        Type[botocore.client.BaseClient]
+            The client, shared with all the threads of the process.
+
+        """
+        self._check_pid()
+        key = (
+            service_name,
+            region_name,
+            signature_version,
+            tuple(sorted(credentials.items())),
+        )
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # The default session of ``boto3.client`` is not thread-safe
+                client = boto3.session.Session().client(
+                    service_name,
+                    config=Config(
+                        region_name=region_name, signature_version=signature_version
+                    ),
+                    **credentials,
+                )
+                self._clients[key] = client
+        return client
+
+    def clear(self):
+        """Forget all clients."""
+        with self._lock:
+            self._clients.clear()
+
+
+client_registry = ClientRegistry()
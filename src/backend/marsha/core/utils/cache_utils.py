@@ -0,0 +1,273 @@
+"""Utils to cache data in the process and in the shared Django cache."""
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+LOCK_CACHE_KEY = "{key:s}|lock"
+VERSION_CACHE_KEY = "version|{name:s}"
+
+# Names of the versions scoping cached data (see ``get_versions``)
+RESOURCE_VERSION = "resource|{model:s}|{pk!s}"
+CONSUMER_SITE_VERSION = "consumer_site|{pk!s}"
+LTI_PASSPORT_VERSION = "lti_passport"
+
+# Backends of which each process has its own cache
+LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+class LRUCache:
+    """A bounded, thread-safe, process-local cache evicting the least recently used entries.
+
+    It is meant to hold a small number of hot objects that are expensive to fetch (e.g. from
+    the database) and are read on every request. Entries must be invalidated by the caller.
+    """
+
+    def __init__(self, maxsize):
+        """Initialize an empty cache.
+
+        Parameters
+        ----------
+        maxsize: Type[integer]
+            The maximum number of entries kept in the cache. When the cache is full, setting a
+            new entry evicts the least recently used one.
+
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of entries currently held in the cache."""
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Return the value stored for a key and mark it as recently used.
+
+        Parameters
+        ----------
+        key: Type[hashable]
+            The key to look for.
+        default: Type[any]
+            The value returned if the key is not in the cache.
+
+        Returns
+        -------
+        any
+            The value stored for this key or the default value.
+
+        """
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        """Store a value for a key, evicting the least recently used entries if necessary.
+
+        Parameters
+        ----------
+        key: Type[hashable]
+            The key under which the value is stored.
+        value: Type[any]
+            The value to store.
+
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a key from the cache if it is present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+
+class HitCounter:
+    """Thread-safe counters of the hits and misses of a cache, local to the process."""
+
+    def __init__(self):
+        """Initialize counters at zero."""
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        """Count a value served from the cache."""
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        """Count a value that had to be computed."""
+        with self._lock:
+            self.misses += 1
+
+    def reset(self):
+        """Reset the counters to zero."""
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def get_stats(self):
+        """Return the counters and the hit ratio.
+
+        Returns
+        -------
+        dictionary
+            - hits: the number of values served from the cache,
+            - misses: the number of values that had to be computed,
+            - hit_ratio: the share of values served from the cache, between 0 and 1.
+
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+def get_or_compute(key, compute, timeout, stale_timeout, lock_timeout=10, wait=0.05):
+    """Return a value from the shared cache, computing it once when it is missing or stale.
+
+    The value is considered fresh for ``timeout`` seconds and then stale for ``stale_timeout``
+    more seconds. To protect the database from a cache stampede, a lock is taken in the cache
+    so that a single worker computes the value while the others:
+
+    - serve the stale value if there is one,
+    - wait for the value to be computed otherwise (at most ``lock_timeout`` seconds, after
+      which they compute it themselves).
+
+    Parameters
+    ----------
+    key: Type[string]
+        The key under which the value is cached.
+    compute: Type[callable]
+        A function without argument returning the value to cache.
+    timeout: Type[integer]
+        The number of seconds during which the cached value is fresh.
+    stale_timeout: Type[integer]
+        The number of seconds during which the cached value can still be served once stale,
+        while it is being refreshed.
+    lock_timeout: Type[integer]
+        The maximum number of seconds a worker can hold the lock to compute the value.
+    wait: Type[float]
+        The number of seconds to wait between two polls of the cache while another worker
+        computes a missing value.
+
+    Returns
+    -------
+    any
+        The cached or computed value.
+
+    """
+    lock_key = LOCK_CACHE_KEY.format(key=key)
+    deadline = time.monotonic() + lock_timeout
+
+    while True:
+        entry = cache.get(key)
+        if entry is not None and entry["expires_at"] > time.time():
+            return entry["value"]
+
+        if cache.add(lock_key, True, lock_timeout):
+            try:
+                value = compute()
+                cache.set(
+                    key,
+                    {"value": value, "expires_at": time.time() + timeout},
+                    timeout + stale_timeout,
+                )
+            finally:
+                cache.delete(lock_key)
+            return value
+
+        # Another worker is computing the value
+        if entry is not None:
+            return entry["value"]
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(wait)
+
+
+def is_cache_shared():
+    """Whether the default cache is shared by all the processes serving the application.
+
+    With a cache local to each process, versions are only renewed in the process that
+    handled the change: data cached by the other processes is not invalidated.
+
+    Returns
+    -------
+    boolean
+        False if the backend of the default cache is local to each process.
+
+    """
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def get_versions(*names):
+    """Return the current versions of some cached data, initializing them if necessary.
+
+    Including versions in cache keys allows to invalidate all the entries depending on some
+    data at once by calling ``invalidate_versions``, without knowing their keys.
+
+    Parameters
+    ----------
+    names: Type[Tuple[string]]
+        The names of the versions to return.
+
+    Returns
+    -------
+    string
+        The versions joined in a string suitable for a cache key.
+
+    """
+    keys = [VERSION_CACHE_KEY.format(name=name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # The version may have been evicted from the cache: start a new one so that
+            # entries computed before can not be considered as fresh.
+            version = uuid.uuid4().hex
+            cache.add(key, version, None)
+            # The dummy cache does not store anything
+            versions[key] = cache.get(key) or version
+    return "|".join(versions[key] for key in keys)
+
+
+def _renew_versions(keys):
+    """Set a new version for each key."""
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def invalidate_versions(*names):
+    """Renew some versions so that cached data depending on them is computed again.
+
+    Versions are renewed right away and once more after the current transaction is committed
+    so that a concurrent request can not cache the state preceding the commit.
+
+    Parameters
+    ----------
+    names: Type[Tuple[string]]
+        The names of the versions to renew.
+
+    """
+    keys = [VERSION_CACHE_KEY.format(name=name) for name in names]
+    _renew_versions(keys)
+    transaction.on_commit(lambda: _renew_versions(keys))
@@ -4,11 +4,26 @@ Utils to sign CloudFront urls and cookies.
 Following boto3's documentation to sign CloudFront urls
 https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront.html
 """
+import base64
+from datetime import datetime, timedelta
+import hashlib
+import os
+import threading
+
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 
+from botocore.signers import CloudFrontSigner
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
+import pytz
+
+from .cache_utils import HitCounter
+
+
+SIGNED_URL_CACHE_KEY = "cloudfront|{key_id:s}|{expires:d}|{digest:s}"
 
 
 class MissingRSAKey(Exception):
@@ -17,13 +32,111 @@ class MissingRSAKey(Exception):
     pass
 
 
-def rsa_signer(message):
+class PrivateKeyManager:
+    """Load the private keys used to sign CloudFront urls once and keep them parsed.
+
+    Parsing a PEM private key is much more expensive than computing a signature, and urls are
+    signed several times per serialized video. Keys are cached by path along with the
+    modification time of their file, so that a key rotated in place (e.g. a mounted secret) is
+    reloaded on the next signature without restarting the application.
+    """
+
+    def __init__(self):
+        """Initialize an empty key manager."""
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get_private_key(self, path):
+        """Return the private key stored in a file, parsing it only if the file changed.
+
+        Parameters
+        ----------
+        path: Type[string]
+            The path of the PEM private key file.
+
+        Raises
+        ------
+        MissingRSAKey
+            Raised if there is no file at this path.
+
+        Returns
+        -------
+        Type[cryptography.hazmat.primitives.asymmetric.rsa.RSAPrivateKey]
+            The parsed private key.
+
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # Let opening the file decide whether it is missing, and do not cache a key
+            # whose modification can not be detected.
+            mtime = None
+
+        entry = self._keys.get(path)
+        if entry is not None and mtime is not None and entry[0] == mtime:
+            return entry[1]
+
+        try:
+            with open(path, "rb") as key_file:
+                private_key = serialization.load_pem_private_key(
+                    key_file.read(), password=None, backend=default_backend()
+                )
+        except FileNotFoundError:
+            raise MissingRSAKey()
+
+        if mtime is not None:
+            with self._lock:
+                self._keys[path] = (mtime, private_key)
+        return private_key
+
+    def clear(self):
+        """Forget all parsed keys."""
+        with self._lock:
+            self._keys.clear()
+
+
+key_manager = PrivateKeyManager()
+signature_counter = HitCounter()
+
+
+def get_private_key_path(key_id=None):
+    """Return the path of the private key of a CloudFront key pair.
+
+    Parameters
+    ----------
+    key_id: Type[string]
+        The id of the key pair. Defaults to ``CLOUDFRONT_ACCESS_KEY_ID``, whose private key is
+        found at ``CLOUDFRONT_PRIVATE_KEY_PATH``. Other key pairs, e.g. the next key pair
+        during a rotation, are declared in ``CLOUDFRONT_PRIVATE_KEY_PATHS``.
+
+    Raises
+    ------
+    MissingRSAKey
+        Raised if no private key is declared for this key pair.
+
+    Returns
+    -------
+    string
+        The path of the private key file.
+
+    """
+    if key_id is None or key_id == settings.CLOUDFRONT_ACCESS_KEY_ID:
+        return settings.CLOUDFRONT_PRIVATE_KEY_PATH
+    try:
+        return settings.CLOUDFRONT_PRIVATE_KEY_PATHS[key_id]
+    except KeyError:
+        raise MissingRSAKey()
+
+
+def rsa_signer(message, key_id=None):
     """Sign a message with an rsa key pair found on the file system for CloudFront signed urls.
 
     Parameters
     ----------
     message : Type[string]
         the message for which we want to compute a signature
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
 
     Returns
     -------
@@ -31,14 +144,321 @@ def rsa_signer(message):
         The rsa signature
 
     """
-    try:
-        with open(settings.CLOUDFRONT_PRIVATE_KEY_PATH, "rb") as key_file:
-            private_key = serialization.load_pem_private_key(
-                key_file.read(), password=None, backend=default_backend()
-            )
-    except FileNotFoundError:
-        raise MissingRSAKey()
+    private_key = key_manager.get_private_key(get_private_key_path(key_id))
 
     # The following line is excluded from bandit security check because cloudfront supports
     # only sha1 hash for signed URLs.
     return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())  # nosec
+
+
+def get_cloudfront_signer(key_id=None):
+    """Return a signer of CloudFront urls using a key pair.
+
+    Parameters
+    ----------
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    Type[botocore.signers.CloudFrontSigner]
+        The signer, with the key pair id it adds to signed urls.
+
+    """
+    key_id = key_id or settings.CLOUDFRONT_ACCESS_KEY_ID
+    return CloudFrontSigner(key_id, lambda message: rsa_signer(message, key_id))
+
+
+def _url_b64encode(data):
+    """Encode bytes in the url-safe variant of base64 expected by CloudFront."""
+    return (
+        base64.b64encode(data)
+        .replace(b"+", b"-")
+        .replace(b"=", b"_")
+        .replace(b"/", b"~")
+        .decode("utf-8")
+    )
+
+
+def build_signed_policy(resource, date_less_than, key_id=None):
+    """Sign a custom policy granting access to all the urls matching a resource.
+
+    Unlike signing each url with a canned policy, the signed policy can be attached to any
+    number of urls matching the resource (e.g. "https://<cloudfront>/<pk>/*"), as query string
+    parameters or as cookies, for the cost of a single RSA signature.
+
+    Parameters
+    ----------
+    resource : Type[string]
+        the url pattern, possibly with "*" wildcards, covered by the policy
+    date_less_than : Type[datetime.datetime]
+        the date after which the signed urls expire
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    dictionary
+        The "Policy", "Signature" and "Key-Pair-Id" parameters expected by CloudFront.
+
+    """
+    cloudfront_signer = get_cloudfront_signer(key_id)
+    policy = cloudfront_signer.build_policy(resource, date_less_than).encode("utf-8")
+    signature = cloudfront_signer.rsa_signer(policy)
+    return {
+        "Policy": _url_b64encode(policy),
+        "Signature": _url_b64encode(signature),
+        "Key-Pair-Id": cloudfront_signer.key_id,
+    }
+
+
+def build_signed_query(resource, date_less_than, key_id=None):
+    """Sign a custom policy for a resource and return it as query string parameters.
+
+    Parameters
+    ----------
+    resource : Type[string]
+        the url pattern, possibly with "*" wildcards, covered by the policy
+    date_less_than : Type[datetime.datetime]
+        the date after which the signed urls expire
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    string
+        The "Policy", "Signature" and "Key-Pair-Id" query string parameters.
+
+    """
+    return _join_signed_policy(build_signed_policy(resource, date_less_than, key_id))
+
+
+def _join_signed_policy(signed_policy):
+    """Format a signed policy as query string parameters."""
+    return "&".join(
+        "{:s}={:s}".format(name, signed_policy[name])
+        for name in ["Policy", "Signature", "Key-Pair-Id"]
+    )
+
+
+def add_signed_query(url, signed_query):
+    """Append a query string returned by ``build_signed_query`` to a url.
+
+    Parameters
+    ----------
+    url : Type[string]
+        the url to sign, which may already have a query string
+    signed_query : Type[string]
+        the signed query string parameters
+
+    Returns
+    -------
+    string
+        The signed url.
+
+    """
+    return "{:s}{:s}{:s}".format(url, "&" if "?" in url else "?", signed_query)
+
+
+def get_expiration():
+    """Return the expiration date of the urls signed now.
+
+    Urls are valid for ``CLOUDFRONT_SIGNED_URLS_VALIDITY`` seconds. If
+    ``CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET`` is set, the expiration date is rounded up to a
+    multiple of this duration, so that all the urls signed during the same bucket of time are
+    identical and can be cached.
+
+    Returns
+    -------
+    datetime.datetime
+        The expiration date of signed urls.
+
+    """
+    date_less_than = timezone.now() + timedelta(
+        seconds=settings.CLOUDFRONT_SIGNED_URLS_VALIDITY
+    )
+    bucket = settings.CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET
+    if not bucket:
+        return date_less_than
+    expires = -(-int(date_less_than.timestamp()) // bucket) * bucket
+    return datetime.fromtimestamp(expires, tz=pytz.utc)
+
+
+def get_signature_date():
+    """Return the date since which urls signed now are identical.
+
+    Without ``CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET``, the expiration date of signed urls changes
+    with each second and this is the current date. Otherwise, it is the beginning of the
+    current bucket.
+
+    Returns
+    -------
+    datetime.datetime
+        The date at which the signature of urls last changed.
+
+    """
+    return get_expiration() - timedelta(
+        seconds=settings.CLOUDFRONT_SIGNED_URLS_VALIDITY
+        + (settings.CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET or 0)
+    )
+
+
+def _get_or_sign(value, date_less_than, sign, key_id=None):
+    """Return a signature from the cache if it was computed during the same bucket.
+
+    Signatures are only shared by all the processes if the default cache is (see
+    ``DJANGO_CACHES``): with a cache local to each process, each process signs a url once per
+    bucket.
+
+    Parameters
+    ----------
+    value : Type[string]
+        the url or resource that is signed
+    date_less_than : Type[datetime.datetime]
+        the expiration date returned by ``get_expiration``
+    sign : Type[callable]
+        computes the signature if it is not cached
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    string
+        The value returned by ``sign``.
+
+    """
+    if not settings.CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET:
+        return sign()
+
+    expires = int(date_less_than.timestamp())
+    cache_key = SIGNED_URL_CACHE_KEY.format(
+        key_id=key_id or settings.CLOUDFRONT_ACCESS_KEY_ID or "",
+        expires=expires,
+        digest=hashlib.sha256(value.encode("utf-8")).hexdigest(),
+    )
+    signed = cache.get(cache_key)
+    if signed is not None:
+        signature_counter.hit()
+        return signed
+
+    signature_counter.miss()
+    signed = sign()
+    # The entry is useless once the bucket is over, as the expiration date changes
+    timeout = expires - int(timezone.now().timestamp())
+    if timeout > 0:
+        cache.set(
+            cache_key,
+            signed,
+            min(timeout, settings.CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET),
+        )
+    return signed
+
+
+def get_signed_url(url, key_id=None):
+    """Sign a url with a canned policy, reusing the signature computed during the same bucket.
+
+    Parameters
+    ----------
+    url : Type[string]
+        the url to sign
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    string
+        The signed url.
+
+    """
+    date_less_than = get_expiration()
+    return _get_or_sign(
+        url,
+        date_less_than,
+        lambda: get_cloudfront_signer(key_id).generate_presigned_url(
+            url, date_less_than=date_less_than
+        ),
+        key_id=key_id,
+    )
+
+
+def get_signed_policy(resource, key_id=None):
+    """Sign a custom policy for a resource, reusing the one signed during the same bucket.
+
+    Parameters
+    ----------
+    resource : Type[string]
+        the url pattern, possibly with "*" wildcards, covered by the policy
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    Tuple[dictionary, datetime.datetime]
+        The parameters returned by ``build_signed_policy`` and their expiration date.
+
+    """
+    date_less_than = get_expiration()
+    signed_policy = _get_or_sign(
+        resource,
+        date_less_than,
+        lambda: build_signed_policy(resource, date_less_than, key_id=key_id),
+        key_id=key_id,
+    )
+    return signed_policy, date_less_than
+
+
+def get_signed_query(resource, key_id=None):
+    """Return a policy signed by ``get_signed_policy`` as query string parameters.
+
+    Parameters
+    ----------
+    resource : Type[string]
+        the url pattern, possibly with "*" wildcards, covered by the policy
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    Returns
+    -------
+    string
+        The "Policy", "Signature" and "Key-Pair-Id" query string parameters.
+
+    """
+    signed_policy, _date_less_than = get_signed_policy(resource, key_id=key_id)
+    return _join_signed_policy(signed_policy)
+
+
+def set_signed_cookies(response, resource, path="/", key_id=None):
+    """Set the CloudFront cookies granting access to all the urls matching a resource.
+
+    The browser then sends the same signature with each request on the files of the resource
+    (e.g. the thousands of segments of an adaptive streaming video), which can be served with
+    plain urls.
+
+    Parameters
+    ----------
+    response : Type[django.http.HttpResponse]
+        the response on which cookies are set
+    resource : Type[string]
+        the url pattern, possibly with "*" wildcards, covered by the policy
+    path : Type[string]
+        the path of the urls to which the browser sends the cookies, so that the cookies set
+        for different resources do not overwrite each other
+    key_id : Type[string]
+        the id of the key pair to sign with, ``CLOUDFRONT_ACCESS_KEY_ID`` by default
+
+    """
+    signed_policy, date_less_than = get_signed_policy(resource, key_id=key_id)
+    for name, value in signed_policy.items():
+        cookie = "CloudFront-{:s}".format(name)
+        response.set_cookie(
+            cookie,
+            value,
+            expires=date_less_than,
+            path=path,
+            domain=settings.CLOUDFRONT_SIGNED_COOKIES_DOMAIN,
+            secure=True,
+            httponly=True,
+        )
+        # Cookies are sent by the player from an iframe embedded in another site.
+        # Django 3.0 does not accept "None" as "samesite" argument.
+        response.cookies[cookie]["samesite"] = "None"
@@ -0,0 +1,167 @@
+"""Utils to write to the database in fewer round trips than the Django ORM."""
+from django.db import IntegrityError, connections, router
+
+
+def insert_or_get(instance, conflict_fields, conflict_condition=None, attempts=3):
+    """Insert a model instance unless it conflicts with an existing row, which is returned.
+
+    This is a race-free ``get_or_create`` running a single ``INSERT ... ON CONFLICT DO
+    NOTHING`` statement (PostgreSQL only). The instance is validated like in
+    ``BaseModel.save``, except for related objects and uniqueness which are enforced by the
+    database.
+
+    Signals are not sent: it is up to the caller to send ``post_save`` for created instances.
+
+    Parameters
+    ----------
+    instance: Type[models.Model]
+        The unsaved instance to insert.
+    conflict_fields: Type[List[string]]
+        The names of the fields of a unique index or constraint identifying the row.
+    conflict_condition: Type[string]
+        The SQL predicate of the unique index if it is partial (e.g. "deleted IS NULL").
+    attempts: Type[integer]
+        The number of times the statement is run if a conflicting row is neither inserted
+        nor visible (it was committed by a concurrent transaction after our statement began).
+
+    Raises
+    ------
+    ValidationError
+        Raised if the instance is not valid.
+    IntegrityError
+        Raised if no row could be inserted nor found.
+
+    Returns
+    -------
+    Tuple[models.Model, boolean]
+        The inserted instance or the existing one, and whether it was inserted.
+
+    """
+    model = type(instance)
+    meta = model._meta  # pylint: disable=protected-access
+    fields = meta.concrete_fields
+    instance.full_clean(
+        exclude=[field.name for field in fields if field.is_relation],
+        validate_unique=False,
+    )
+
+    using = router.db_for_write(model, instance=instance)
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    conflict_columns = [meta.get_field(name).column for name in conflict_fields]
+    index_predicate = f" WHERE {conflict_condition}" if conflict_condition else ""
+    lookup = " AND ".join(f"{quote_name(column)} = %s" for column in conflict_columns)
+    if conflict_condition:
+        lookup = f"{lookup} AND {conflict_condition}"
+
+    sql = (
+        "WITH inserted AS ("
+        f"INSERT INTO {quote_name(meta.db_table)} ({columns}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        f"ON CONFLICT ({', '.join(quote_name(c) for c in conflict_columns)})"
+        f"{index_predicate} DO NOTHING RETURNING {columns}"
+        f") SELECT {columns}, true FROM inserted "
+        f"UNION ALL SELECT {columns}, false FROM {quote_name(meta.db_table)} "
+        f"WHERE {lookup} LIMIT 1"
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(instance, True), connection)
+        for field in fields
+    ]
+    params.extend(
+        meta.get_field(name).get_db_prep_save(
+            getattr(instance, meta.get_field(name).attname), connection
+        )
+        for name in conflict_fields
+    )
+
+    with connection.cursor() as cursor:
+        for _attempt in range(attempts):
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+            if row is not None:
+                break
+        else:
+            raise IntegrityError(
+                f"Could neither insert nor find the {meta.object_name} instance."
+            )
+
+    if row[-1]:
+        # pylint: disable=protected-access
+        instance._state.adding = False
+        instance._state.db = using
+        return instance, True
+
+    return model.from_db(using, [field.attname for field in fields], row[:-1]), False
+
+
+def pop_unlocked(queryset, limit):
+    """Delete and return the first rows of a queryset that are not locked by a transaction.
+
+    This is a queue consumer running a single ``DELETE ... RETURNING`` statement on the rows
+    selected with ``FOR UPDATE SKIP LOCKED`` (PostgreSQL only): concurrent consumers skip the
+    rows popped by each other. It must be run in a transaction, so that the rows are restored
+    if they can not be processed and the transaction is rolled back.
+
+    Signals are not sent.
+
+    Parameters
+    ----------
+    queryset: Type[models.QuerySet]
+        The rows of the queue, ordered.
+    limit: Type[integer]
+        The maximum number of rows to pop.
+
+    Returns
+    -------
+    List[models.Model]
+        The instances of the popped rows, in no particular order.
+
+    """
+    model = queryset.model
+    meta = model._meta  # pylint: disable=protected-access
+    fields = meta.concrete_fields
+
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+
+    selected_sql, params = (
+        queryset.select_for_update(skip_locked=True)
+        .values("pk")[:limit]
+        .query.sql_with_params()
+    )
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    sql = (
+        f"DELETE FROM {quote_name(meta.db_table)} "
+        f"WHERE {quote_name(meta.pk.column)} IN ({selected_sql}) RETURNING {columns}"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # Convert the values like the ORM does when it fetches rows (e.g. to decode json)
+    converters = []
+    for field in fields:
+        column = field.get_col(meta.db_table)
+        converters.append(
+            (
+                column,
+                connection.ops.get_db_converters(column)
+                + field.get_db_converters(connection),
+            )
+        )
+
+    attnames = [field.attname for field in fields]
+    instances = []
+    for row in rows:
+        values = []
+        for value, (column, field_converters) in zip(row, converters):
+            for converter in field_converters:
+                value = converter(value, column, connection)
+            values.append(value)
+        instances.append(model.from_db(using, attnames, values))
+    return instances
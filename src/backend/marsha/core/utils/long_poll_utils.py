@@ -0,0 +1,85 @@
+"""Utils to let API clients wait for a resource to change instead of polling it.
+
+Saving a resource, or one of its tracks or its thumbnail, renews its version in the cache
+(see ``cache_utils.invalidate_versions``). This is what happens when ``update_state`` or the
+``process_state_updates`` command records an upload state transition. A request waiting for a
+change polls this version in the cache, which is much cheaper than having the client poll the
+API. The change is usually made by another process: requests only wait if the cache is shared
+by all the processes (see ``cache_utils.is_cache_shared``), otherwise they would never see it.
+
+A waiting request holds a worker thread, so the number of requests waiting at once in a
+process is limited by ``LONG_POLL_MAX_WAITERS``.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .cache_utils import get_versions, is_cache_shared
+
+
+class WaiterLimit:
+    """Thread-safe count of the requests waiting in the process."""
+
+    def __init__(self):
+        """Initialize the count at zero."""
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Count a new waiting request if the limit is not reached.
+
+        Returns
+        -------
+        boolean
+            True if the request can wait, in which case ``release`` must be called once it is
+            done waiting.
+
+        """
+        with self._lock:
+            if self.count >= settings.LONG_POLL_MAX_WAITERS:
+                return False
+            self.count += 1
+            return True
+
+    def release(self):
+        """Stop counting a waiting request."""
+        with self._lock:
+            self.count -= 1
+
+
+waiter_limit = WaiterLimit()
+
+
+def wait_for_version_change(name, version):
+    """Block until a version is renewed, for at most ``LONG_POLL_TIMEOUT`` seconds.
+
+    Parameters
+    ----------
+    name: Type[string]
+        The name of the version, e.g. ``RESOURCE_VERSION`` formatted for a resource.
+    version: Type[string]
+        The version read before the state of the resource was checked, so that a change
+        committed in between is not missed.
+
+    Returns
+    -------
+    boolean
+        True if the version changed, False if the timeout was reached, if too many requests
+        are already waiting in the process or if the cache is local to the process.
+
+    """
+    if not is_cache_shared() or not waiter_limit.acquire():
+        return False
+
+    try:
+        deadline = time.monotonic() + settings.LONG_POLL_TIMEOUT
+        while True:
+            if get_versions(name) != version:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(settings.LONG_POLL_INTERVAL, remaining))
+    finally:
+        waiter_limit.release()
@@ -0,0 +1,139 @@
+"""Utils to instrument the SQL queries run while serving a request or a block of code."""
+from collections import Counter
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class QueryRecorder:
+    """Context manager recording the queries run on a database connection.
+
+    It relies on ``connection.execute_wrapper`` so it works whatever the value of ``DEBUG``,
+    unlike ``connection.queries``.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        """Initialize an empty recorder.
+
+        Parameters
+        ----------
+        using: Type[string]
+            The alias of the database connection to instrument.
+
+        """
+        self.connection = connections[using]
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run a query and record its SQL, parameters and duration."""
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, time.perf_counter() - started_at))
+
+    def __enter__(self):
+        """Start recording queries."""
+        self._wrapper = self.connection.execute_wrapper(self)
+        # pylint: disable=no-member
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop recording queries."""
+        # pylint: disable=no-member
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+
+    @property
+    def count(self):
+        """Return the number of queries."""
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        """Return the total time spent running queries, in seconds."""
+        return sum(duration for _sql, _params, duration in self.queries)
+
+    @property
+    def duplicates(self):
+        """Return the number of queries that ran the same SQL with the same parameters again."""
+        counter = Counter(
+            (sql, repr(params)) for sql, params, _duration in self.queries
+        )
+        return sum(count - 1 for count in counter.values())
+
+    @property
+    def similar(self):
+        """Return the number of queries that ran the same SQL again, e.g. in an N+1 pattern."""
+        counter = Counter(sql for sql, _params, _duration in self.queries)
+        return sum(count - 1 for count in counter.values())
+
+    def get_stats(self):
+        """Return the statistics of the recorded queries.
+
+        Returns
+        -------
+        dictionary
+            - queries_count: the number of queries,
+            - queries_duration: the time spent running them, in milliseconds,
+            - queries_duplicates: the number of identical queries run again,
+            - queries_similar: the number of queries with the same SQL run again.
+
+        """
+        return {
+            "queries_count": self.count,
+            "queries_duration": round(self.duration * 1000, 3),
+            "queries_duplicates": self.duplicates,
+            "queries_similar": self.similar,
+        }
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code runs more queries than its budget."""
+
+
+class query_budget(QueryRecorder):  # pylint: disable=invalid-name
+    """Context manager failing if a block of code runs more queries than its budget.
+
+    Tests use it to declare the maximum number of queries of an endpoint, so that an N+1
+    regression fails the test suite instead of being discovered in production.
+    """
+
+    def __init__(self, budget, using=DEFAULT_DB_ALIAS):
+        """Initialize a budget.
+
+        Parameters
+        ----------
+        budget: Type[integer]
+            The maximum number of queries the block of code may run.
+        using: Type[string]
+            The alias of the database connection to instrument.
+
+        """
+        super().__init__(using=using)
+        self.budget = budget
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop recording queries and check the budget if the block succeeded.
+
+        Raises
+        ------
+        QueryBudgetExceeded
+            Raised if more queries than the budget were run.
+
+        """
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.count > self.budget:
+            raise QueryBudgetExceeded(
+                "{:d} queries run for a budget of {:d}:\n{:s}".format(
+                    self.count,
+                    self.budget,
+                    "\n".join(
+                        "{:d}. {:s}".format(index, sql)
+                        for index, (sql, _params, _duration) in enumerate(
+                            self.queries, 1
+                        )
+                    ),
+                )
+            )
@@ -1,8 +1,25 @@
 """Utils for direct upload to AWS S3."""
 from django.conf import settings
 
-import boto3
-from botocore.client import Config
+from .aws_utils import client_registry
+
+
+def get_s3_client():
+    """Return the S3 client shared by the process, signing requests with signature V4.
+
+    Returns
+    -------
+    Type[botocore.client.BaseClient]
+        The client for the region and the credentials configured in the settings.
+
+    """
+    return client_registry.get_client(
+        "s3",
+        region_name=settings.AWS_S3_REGION_NAME,
+        signature_version="s3v4",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+    )
 
 
 def create_presigned_post(conditions, fields, key):
@@ -46,20 +63,10 @@ def create_presigned_post(conditions, fields, key):
         the post.
 
     """
-    # Configure S3 client using sugnature V4
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(
-            region_name=settings.AWS_S3_REGION_NAME, signature_version="s3v4",
-        ),
-    )
-
     acl = "private"
     fields.update({"acl": acl})
 
-    return s3_client.generate_presigned_post(
+    return get_s3_client().generate_presigned_post(
         settings.AWS_SOURCE_BUCKET_NAME,
         key,
         Fields=fields,
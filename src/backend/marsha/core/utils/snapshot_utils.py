@@ -0,0 +1,212 @@
+"""Utils to maintain the denormalized snapshots of the resources served to LTI launches.
+
+The representation of a video or a document only changes when an upload completes or when an
+instructor edits it, its tracks or its thumbnail, yet building it reads up to four tables. It
+is thus stored, with unsigned urls, in the ``snapshot`` column of the resource: an LTI launch
+reads a single row and only signs the CloudFront urls on top of it.
+
+Saving one of the objects a snapshot is built from replaces it by an invalidation marker (see
+``marsha.core.signals``). The snapshot is rebuilt once the transaction is committed or, failing
+that, by the next launch. It is only written if the marker read along with the resource is
+still in place, so a snapshot built from outdated objects never hides a later invalidation.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Document, Video
+from ..serializers import DocumentSerializer, VideoSerializer
+
+
+# Increment it each time the representation of resources changes to rebuild all snapshots
+SNAPSHOT_VERSION = 1
+
+SNAPSHOT_SERIALIZERS = {Document: DocumentSerializer, Video: VideoSerializer}
+
+
+def get_snapshot_version():
+    """Return the version of snapshots built by this code with the current settings.
+
+    Returns
+    -------
+    string
+        A hash of ``SNAPSHOT_VERSION`` and of the settings used to build urls.
+
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [
+                SNAPSHOT_VERSION,
+                settings.AWS_S3_URL_PROTOCOL,
+                settings.CLOUDFRONT_DOMAIN,
+                settings.VIDEO_RESOLUTIONS,
+            ]
+        ).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def get_invalidation_marker():
+    """Return a unique value stored in place of an invalidated snapshot.
+
+    Returns
+    -------
+    dictionary
+        A snapshot without data.
+
+    """
+    return {"invalidated": uuid.uuid4().hex}
+
+
+def is_fresh(snapshot):
+    """Return whether a snapshot can be served.
+
+    Parameters
+    ----------
+    snapshot: Type[dictionary]
+        The value of the ``snapshot`` column of a resource.
+
+    Returns
+    -------
+    boolean
+        True if the snapshot holds data built with the current version.
+
+    """
+    return (
+        snapshot is not None
+        and "data" in snapshot
+        and snapshot.get("version") == get_snapshot_version()
+    )
+
+
+def build_snapshot(resource):
+    """Serialize a resource with unsigned urls.
+
+    Parameters
+    ----------
+    resource: Type[models.Video|models.Document]
+        The resource, with its related objects fetched by ``setup_eager_loading``.
+
+    Returns
+    -------
+    dictionary
+        The snapshot of the resource, with the version it was built with.
+
+    """
+    serializer = SNAPSHOT_SERIALIZERS[type(resource)](
+        resource, context={"sign_urls": False}
+    )
+    # Round trip through JSON so that the data is the same as when it is read from the column
+    return {
+        "version": get_snapshot_version(),
+        "data": json.loads(json.dumps(serializer.data)),
+    }
+
+
+def save_snapshot(resource, snapshot):
+    """Write the snapshot of a resource unless it was invalidated since the resource was read.
+
+    Parameters
+    ----------
+    resource: Type[models.Video|models.Document]
+        The resource the snapshot was built from.
+    snapshot: Type[dictionary]
+        The snapshot, as returned by ``build_snapshot``.
+
+    Returns
+    -------
+    boolean
+        True if the snapshot was written.
+
+    """
+    rows = type(resource).all_objects.filter(pk=resource.pk)
+    if resource.snapshot is None:
+        rows = rows.filter(snapshot__isnull=True)
+    else:
+        rows = rows.filter(snapshot=resource.snapshot)
+    return rows.update(snapshot=snapshot) == 1
+
+
+def refresh_snapshots(queryset):
+    """Rebuild the snapshots of the resources of a queryset that are not fresh.
+
+    Parameters
+    ----------
+    queryset: Type[django.db.models.QuerySet]
+        A queryset of videos or documents.
+
+    Returns
+    -------
+    dictionary
+        The data of the snapshot of each resource, by primary key.
+
+    """
+    snapshots = {}
+    for resource in SNAPSHOT_SERIALIZERS[queryset.model].setup_eager_loading(queryset):
+        if is_fresh(resource.snapshot):
+            snapshots[resource.pk] = resource.snapshot["data"]
+            continue
+
+        snapshot = build_snapshot(resource)
+        save_snapshot(resource, snapshot)
+        snapshots[resource.pk] = snapshot["data"]
+    return snapshots
+
+
+def refresh_snapshots_on_commit(queryset, marker):
+    """Rebuild the snapshots of resources once the transaction is committed.
+
+    Parameters
+    ----------
+    queryset: Type[django.db.models.QuerySet]
+        A queryset of videos or documents.
+    marker: Type[dictionary]
+        The invalidation marker stored in their snapshot, or None for resources inserted
+        without one. Resources of which the snapshot was since rebuilt or invalidated again
+        are left alone.
+
+    """
+    if marker is None:
+        queryset = queryset.filter(snapshot__isnull=True)
+    else:
+        queryset = queryset.filter(snapshot=marker)
+    transaction.on_commit(lambda: refresh_snapshots(queryset))
+
+
+def invalidate_snapshots(queryset):
+    """Invalidate the snapshots of resources and rebuild them once the transaction is committed.
+
+    Parameters
+    ----------
+    queryset: Type[django.db.models.QuerySet]
+        A queryset of the videos or documents of which a related object changed.
+
+    """
+    marker = get_invalidation_marker()
+    queryset.update(snapshot=marker)
+    refresh_snapshots_on_commit(queryset, marker)
+
+
+def get_snapshot_data(resource):
+    """Return the representation of a resource, with unsigned urls, from its snapshot.
+
+    The snapshot is rebuilt if it is not fresh.
+
+    Parameters
+    ----------
+    resource: Type[models.Video|models.Document]
+        The resource, fetched without its related objects.
+
+    Returns
+    -------
+    dictionary
+        The representation of the resource.
+
+    """
+    if is_fresh(resource.snapshot):
+        return resource.snapshot["data"]
+    return refresh_snapshots(type(resource).all_objects.filter(pk=resource.pk))[
+        resource.pk
+    ]
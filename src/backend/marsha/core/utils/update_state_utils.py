@@ -0,0 +1,281 @@
+"""Utils to apply the upload state updates notified by the AWS lambdas."""
+from collections import defaultdict
+import copy
+import logging
+import uuid
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from ..defaults import READY
+from ..models import QueuedStateUpdate, Video
+from ..models.base import is_upload_state_transition
+from ..serializers import UpdateStateSerializer
+from .cache_utils import RESOURCE_VERSION, invalidate_versions
+from .db_utils import pop_unlocked
+from .snapshot_utils import invalidate_snapshots
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_update(data):
+    """Parse an update validated by ``UpdateStateSerializer``.
+
+    Parameters
+    ----------
+    data: Type[dictionary]
+        The validated data, with the key of an object in the source bucket, its new state and
+        the extra parameters sent by the lambda.
+
+    Returns
+    -------
+    dictionary
+        - model: the model of the object,
+        - object_id: the primary key of the object,
+        - upload_state: the new upload state,
+        - uploaded_on: the datetime at which the file was uploaded if it is ready,
+        - stamp: the datetime at which the file was uploaded, whatever its state,
+        - extra_parameters: the arguments of ``set_upload_state`` specific to the model.
+
+    """
+    elements = UpdateStateSerializer.parse_key(data["key"])
+    model = apps.get_model(app_label="core", model_name=elements["model_name"])
+
+    extra_parameters = dict(data["extraParameters"])
+    if data["state"] == READY and hasattr(model, "extension"):
+        # The extension is part of the s3 key name and added in this key
+        # when generated by the initiate upload
+        extra_parameters["extension"] = elements.get("extension")
+
+    return {
+        "model": model,
+        "object_id": elements["object_id"],
+        "upload_state": data["state"],
+        "uploaded_on": elements["uploaded_on"] if data["state"] == READY else None,
+        "stamp": elements["uploaded_on"],
+        "extra_parameters": extra_parameters,
+    }
+
+
+def apply_updates(updates):
+    """Apply upload state updates with one query per model.
+
+    Updates are applied in order, so the last update of an object wins, unless it is not a
+    transition (see ``get_upload_state_condition``): duplicate and outdated updates are
+    skipped and reported as applied. Objects are locked while updated. They are not saved
+    one by one: the fields set by their updates are validated and written with a bulk update
+    for each model. The signals invalidating the caches and snapshots of their resources are
+    thus not sent, they are invalidated for all the objects of a model at once.
+
+    Parameters
+    ----------
+    updates: Type[List[dictionary]]
+        The updates, as returned by ``get_update``.
+
+    Returns
+    -------
+    list
+        For each update, None if it was applied or the reason why it was not.
+
+    """
+    errors = [None] * len(updates)
+    indexes_by_model = defaultdict(list)
+    for index, update in enumerate(updates):
+        indexes_by_model[update["model"]].append(index)
+
+    with transaction.atomic():
+        for model, indexes in indexes_by_model.items():
+            objects = model.objects.select_for_update().in_bulk(
+                {uuid.UUID(updates[index]["object_id"]) for index in indexes}
+            )
+            updated = {}
+            fields = {"updated_on"}
+
+            for index in indexes:
+                update = updates[index]
+                pk = uuid.UUID(update["object_id"])
+                if pk not in objects:
+                    errors[index] = "not found"
+                    continue
+
+                current = updated.get(pk, objects[pk])
+                if not is_upload_state_transition(
+                    current, update["upload_state"], update["stamp"]
+                ):
+                    continue
+
+                # Set the fields on a copy so that an invalid update is not written
+                candidate = copy.copy(current)
+                changed = candidate.set_upload_state(
+                    update["upload_state"],
+                    update["uploaded_on"],
+                    **update["extra_parameters"],
+                )
+                try:
+                    candidate.clean_fields(
+                        exclude=[
+                            field.name
+                            for field in model._meta.fields
+                            if field.name not in changed
+                        ]
+                    )
+                except ValidationError as error:
+                    errors[index] = error.message_dict
+                    continue
+                except (TypeError, ValueError) as error:
+                    # Validators of array fields compare items without converting them
+                    errors[index] = str(error)
+                    continue
+                updated[pk] = candidate
+                fields.update(changed)
+
+            if not updated:
+                continue
+
+            now = timezone.now()
+            for obj in updated.values():
+                obj.updated_on = now
+            model.objects.bulk_update(updated.values(), sorted(fields))
+            invalidate_resources(model, updated.values())
+
+    return errors
+
+
+def invalidate_resources(model, objects):
+    """Invalidate what the signals sent by saving objects one by one would invalidate.
+
+    Parameters
+    ----------
+    model: Type[django.db.models.Model]
+        The model of the objects: a resource (video or document) or a track or thumbnail
+        related to a video.
+    objects: Type[Iterable[models.Model]]
+        The objects that were updated.
+
+    """
+    if hasattr(model, "video"):
+        model, pks = Video, {obj.video_id for obj in objects}
+    else:
+        pks = {obj.pk for obj in objects}
+
+    invalidate_snapshots(model.all_objects.filter(pk__in=pks))
+    invalidate_versions(
+        *[RESOURCE_VERSION.format(model=model.__name__, pk=pk) for pk in pks]
+    )
+
+
+def queue_update(data):
+    """Queue an update validated by ``UpdateStateSerializer`` to apply it later.
+
+    The update is inserted with a single query, without the validation of ``BaseModel.save``:
+    its data was already validated by the serializer.
+
+    Parameters
+    ----------
+    data: Type[dictionary]
+        The validated data, with the key of an object in the source bucket, its new state and
+        the extra parameters sent by the lambda.
+
+    """
+    QueuedStateUpdate.objects.bulk_create(
+        [
+            QueuedStateUpdate(
+                key=data["key"],
+                state=data["state"],
+                extra_parameters=data["extraParameters"],
+            )
+        ]
+    )
+
+
+def process_queued_updates(batch_size):
+    """Pop a batch of queued updates and apply them.
+
+    Several workers can process the queue at once: each pops updates the others have not
+    popped. Updates are applied in the order they were queued, so that the updates of an
+    object notified late (e.g. "processing" after "ready") are skipped as they are not
+    transitions (see ``apply_updates``). Updates that can not be applied are logged and
+    dropped, like they would be rejected by the ``update_state`` view. If applying the batch
+    at once fails, e.g. on a database error raised by one of its updates, each update is
+    applied in its own savepoint so that the failing ones are dropped without blocking the
+    others in the queue.
+
+    Parameters
+    ----------
+    batch_size: Type[integer]
+        The maximum number of queued updates to pop.
+
+    Returns
+    -------
+    integer
+        The number of queued updates that were popped.
+
+    """
+    with transaction.atomic():
+        queued = sorted(
+            pop_unlocked(QueuedStateUpdate.objects.order_by("created_on"), batch_size),
+            key=lambda item: item.created_on,
+        )
+
+        items, updates = [], []
+        for item in queued:
+            try:
+                updates.append(
+                    get_update(
+                        {
+                            "key": item.key,
+                            "state": item.state,
+                            "extraParameters": item.extra_parameters,
+                        }
+                    )
+                )
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(
+                    "Queued update of %s to %s dropped", item.key, item.state
+                )
+            else:
+                items.append(item)
+
+        # apply_updates runs in a savepoint: if it fails, the batch stays popped
+        try:
+            errors = apply_updates(updates)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Queued updates failed, applying them one by one")
+            errors = [
+                _apply_queued_update(item, update)
+                for item, update in zip(items, updates)
+            ]
+
+        for item, error in zip(items, errors):
+            if error is not None:
+                logger.warning(
+                    "Queued update of %s to %s dropped: %s", item.key, item.state, error
+                )
+
+    return len(queued)
+
+
+def _apply_queued_update(item, update):
+    """Apply a queued update in its own savepoint (see ``apply_updates``).
+
+    Parameters
+    ----------
+    item: Type[QueuedStateUpdate]
+        The queued update.
+    update: Type[dictionary]
+        The update, as returned by ``get_update``.
+
+    Returns
+    -------
+    string
+        None if the update was applied or the reason why it was not.
+
+    """
+    try:
+        return apply_updates([update])[0]
+    except Exception as error:  # pylint: disable=broad-except
+        logger.exception("Queued update of %s to %s failed", item.key, item.state)
+        return repr(error)
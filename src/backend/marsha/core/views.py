@@ -1,14 +1,15 @@
 """Views of the ``core`` app of the Marsha project."""
 from abc import ABC, abstractmethod
-import json
 from logging import getLogger
 import uuid
 
 from django.conf import settings
-from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.template.loader import render_to_string
 from django.templatetags.static import static
 from django.utils.decorators import method_decorator
+from django.utils.html import escape
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import View
@@ -21,11 +22,47 @@ from .lti import LTI
 from .lti.utils import PortabilityError, get_or_create_resource
 from .models import Document, Video
 from .serializers import DocumentSerializer, VideoSerializer
+from .utils import cloudfront_utils, json_utils
+from .utils.cache_utils import (
+    CONSUMER_SITE_VERSION,
+    RESOURCE_VERSION,
+    get_or_compute,
+    get_versions,
+    is_cache_shared,
+)
 from .utils.react_locales_utils import react_locale
+from .utils.snapshot_utils import get_snapshot_data
 
 
 logger = getLogger(__name__)
 
+STUDENT_PERMISSIONS = {"can_access_dashboard": False, "can_update": False}
+# JSON of an empty JWT token as rendered in the "data-context" attribute of the LTI template
+JWT_PLACEHOLDER = escape(json_utils.dumps({"jwt": ""}).decode("utf-8")[1:-1])
+
+
+def splice_jwt(content, jwt_token):
+    """Replace the JWT placeholder in a rendered LTI page by a JWT token.
+
+    Parameters
+    ----------
+    content: Type[string]
+        The HTML content of the page rendered with an empty JWT token.
+    jwt_token: Type[string]
+        The encoded JWT token.
+
+    Returns
+    -------
+    string
+        The HTML content of the page with the JWT token.
+
+    """
+    return content.replace(
+        JWT_PLACEHOLDER,
+        escape(json_utils.dumps({"jwt": jwt_token}).decode("utf-8")[1:-1]),
+        1,
+    )
+
 
 @method_decorator(csrf_exempt, name="dispatch")
 @method_decorator(xframe_options_exempt, name="dispatch")
@@ -48,122 +85,239 @@ class BaseLTIView(ABC, TemplateResponseMixin, View):
     def serializer_class(self):
         """Return the serializer used by the view."""
 
-    def get_context_data(self):
+    def get_context_data(self, app_data):
         """Build context for template rendering of configuration data for the frontend.
 
+        Parameters
+        ----------
+        app_data: Type[dictionary]
+            Configuration data to bootstrap the frontend (see ``_get_app_data``).
+
         Returns
         -------
         dictionary
             context with configuration data for the frontend
 
         """
-        try:
-            app_data = self._get_app_data()
-        except (LTIException, PortabilityError) as error:
-            logger.warning(str(error))
-            app_data = {
-                "state": "error",
-                "modelName": self.model.RESOURCE_NAME,
-                "resource": None,
-            }
-
         return {
-            "app_data": json.dumps(app_data),
+            "app_data": json_utils.dumps(app_data).decode("utf-8"),
             "static_base_url": f"{settings.ABSOLUTE_STATIC_URL}js/",
             "external_javascript_scripts": settings.EXTERNAL_JAVASCRIPT_SCRIPTS,
         }
 
-    def _get_app_data(self):
+    def _get_app_data(self, lti):
         """Build app data for the frontend with information retrieved from the LTI launch request.
 
+        Parameters
+        ----------
+        lti: Type[LTI]
+            The verified LTI launch request.
+
         Returns
         -------
         dictionary
             Configuration data to bootstrap the frontend:
 
-            For all roles
-            +++++++++++++
-
             - state: state of the LTI launch request. Can be one of `success` or `error`.
             - modelName: the type of resource (video, document,...)
             - resource: representation of the targetted resource including urls for the resource
                 file (e.g. for a video: all resolutions, thumbnails and timed text tracks).
-
-            For instructors only
-            ++++++++++++++++++++
-
             - jwt_token: a short-lived JWT token linked to the resource ID that will be
                 used for authentication and authorization on the API.
 
         """
-        lti = LTI(self.request, self.kwargs["uuid"])
-        lti.verify()
-
-        app_data = None
-        if lti.is_student:
-            cache_key = "app_data|{model:s}|{domain:s}|{context:s}|{resource!s}".format(
-                model=self.model.__name__,
-                domain=lti.get_consumer_site().domain,
-                context=lti.context_id,
-                resource=lti.resource_id,
-            )
+        app_data, permissions = self._build_app_data(lti)
+        if app_data["resource"] is not None:
+            app_data["jwt"] = self._get_jwt(lti, permissions)
+        return app_data
 
-            app_data = cache.get(cache_key)
-            permissions = {"can_access_dashboard": False, "can_update": False}
+    def _get_student_content(self, lti):
+        """Return the page rendered for a student, from the cache if possible.
 
-        if not app_data:
-            resource = get_or_create_resource(self.model, lti)
-            permissions = {
-                "can_access_dashboard": lti.is_instructor or lti.is_admin,
-                "can_update": (lti.is_instructor or lti.is_admin)
-                and resource.playlist.lti_id == lti.context_id,
-            }
-            app_data = {
-                "modelName": self.model.RESOURCE_NAME,
-                "resource": self.serializer_class(resource).data if resource else None,
-                "state": "success",
-                "sentry_dsn": settings.SENTRY_DSN,
-                "environment": settings.ENVIRONMENT,
-                "release": settings.RELEASE,
-                "static": {"svg": {"plyr": static("svg/plyr.svg")}},
-            }
-            if lti.is_student:
-                cache.set(cache_key, app_data, settings.APP_DATA_CACHE_DURATION)
+        All students launching a resource from the same context get the same page except
+        for their JWT token. The page is thus cached with a placeholder in place of the token,
+        and a warm launch only has to mint a token and splice it into the cached page.
+
+        Parameters
+        ----------
+        lti: Type[LTI]
+            The verified LTI launch request.
+
+        Returns
+        -------
+        Tuple[string, boolean]
+            The HTML content of the page and whether the launch resolved a resource, which
+            students can only reach once it is uploaded.
+
+        """
+        # The key is scoped by versions renewed each time the resource or the portability
+        # rules reaching it from the consumer site change (see `marsha.core.signals`) so
+        # the page never goes stale, provided the cache is shared by all the processes.
+        cache_key = (
+            "app_data|{model:s}|{domain:s}|{context:s}|{resource!s}|{version:s}"
+        ).format(
+            model=self.model.__name__,
+            domain=lti.get_consumer_site().domain,
+            context=lti.context_id,
+            resource=lti.resource_id,
+            version=get_versions(
+                RESOURCE_VERSION.format(model=self.model.__name__, pk=lti.resource_id),
+                CONSUMER_SITE_VERSION.format(pk=lti.get_consumer_site().pk),
+            ),
+        )
+        # Only one worker renders the page when it expires while the others keep
+        # serving the previous one, to avoid a stampede when a course session opens.
+        content = get_or_compute(
+            cache_key,
+            lambda: self._render_student_content(lti),
+            self._get_app_data_cache_duration(),
+            settings.APP_DATA_CACHE_STALE_DURATION,
+        )
+
+        # The placeholder is only rendered in the page of a resolved resource
+        if JWT_PLACEHOLDER not in content:
+            return content, False
+        return splice_jwt(content, self._get_jwt(lti, STUDENT_PERMISSIONS)), True
+
+    def _render_student_content(self, lti):
+        """Render the page of a student with a placeholder in place of the JWT token.
+
+        Parameters
+        ----------
+        lti: Type[LTI]
+            The verified LTI launch request.
+
+        Returns
+        -------
+        string
+            The HTML content of the page.
 
+        """
+        app_data, _permissions = self._build_app_data(lti)
         if app_data["resource"] is not None:
-            try:
-                locale = react_locale(lti.launch_presentation_locale)
-            except ImproperlyConfigured:
-                locale = "en_US"
-
-            # Create a short-lived JWT token for the video
-            jwt_token = AccessToken()
-            jwt_token.payload.update(
-                {
-                    "session_id": str(uuid.uuid4()),
-                    "context_id": lti.context_id,
-                    "resource_id": str(lti.resource_id),
-                    "roles": lti.roles,
-                    "course": lti.get_course_info(),
-                    "locale": locale,
-                    "permissions": permissions,
-                    "maintenance": settings.MAINTENANCE_MODE,
-                }
+            app_data["jwt"] = ""
+        # The placeholder is the escaped JSON of an empty token: quotes inside any other
+        # string of the app data are escaped with a backslash so it can't match them.
+        return render_to_string(
+            self.get_template_names(), self.get_context_data(app_data)
+        )
+
+    @staticmethod
+    def _get_app_data_cache_duration():
+        """Return the number of seconds during which cached app data is fresh.
+
+        Cached app data contains signed urls (unless access is granted by signed cookies): it
+        must be renewed early enough for the urls served from the cache to remain valid for at
+        least half of their validity. When the cache is local to each process, a change is
+        only invalidated in the process that handled it: other processes may serve stale data
+        for ``APP_DATA_CACHE_LOCAL_DURATION`` seconds at most.
+
+        Returns
+        -------
+        integer
+            The duration, in seconds.
+
+        """
+        duration = settings.APP_DATA_CACHE_DURATION
+        if not is_cache_shared():
+            duration = min(duration, settings.APP_DATA_CACHE_LOCAL_DURATION)
+        if (
+            settings.CLOUDFRONT_SIGNED_URLS_ACTIVE
+            and not settings.CLOUDFRONT_SIGNED_COOKIES_ACTIVE
+        ):
+            duration = min(
+                duration,
+                settings.CLOUDFRONT_SIGNED_URLS_VALIDITY // 2
+                - settings.APP_DATA_CACHE_STALE_DURATION,
             )
-            try:
-                jwt_token.payload["user_id"] = lti.user_id
-            except AttributeError:
-                pass
+        return max(duration, 0)
 
-            app_data["jwt"] = str(jwt_token)
+    def _build_app_data(self, lti):
+        """Build the app data of the resource targeted by an LTI launch request.
 
-        return app_data
+        Parameters
+        ----------
+        lti: Type[LTI]
+            The verified LTI launch request.
+
+        Returns
+        -------
+        Tuple[dictionary, dictionary]
+            The app data, without the JWT token, and the permissions of the user on the
+            resource.
+
+        """
+        resource = get_or_create_resource(self.model, lti)
+        permissions = {
+            "can_access_dashboard": lti.is_instructor or lti.is_admin,
+            "can_update": (lti.is_instructor or lti.is_admin)
+            and resource.playlist.lti_id == lti.context_id,
+        }
+        app_data = {
+            "modelName": self.model.RESOURCE_NAME,
+            # Read from the snapshot of the resource, only urls are signed on each build
+            "resource": self.serializer_class(
+                resource,
+                context={"signed_cookies": settings.CLOUDFRONT_SIGNED_COOKIES_ACTIVE},
+            ).sign_snapshot(get_snapshot_data(resource))
+            if resource
+            else None,
+            "state": "success",
+            "sentry_dsn": settings.SENTRY_DSN,
+            "environment": settings.ENVIRONMENT,
+            "release": settings.RELEASE,
+            "static": {"svg": {"plyr": static("svg/plyr.svg")}},
+        }
+        return app_data, permissions
+
+    @staticmethod
+    def _get_jwt(lti, permissions):
+        """Create a short-lived JWT token for the resource targeted by an LTI launch request.
+
+        Parameters
+        ----------
+        lti: Type[LTI]
+            The verified LTI launch request.
+        permissions: Type[dictionary]
+            The permissions of the user on the resource.
+
+        Returns
+        -------
+        string
+            The encoded JWT token.
+
+        """
+        try:
+            locale = react_locale(lti.launch_presentation_locale)
+        except ImproperlyConfigured:
+            locale = "en_US"
+
+        jwt_token = AccessToken()
+        jwt_token.payload.update(
+            {
+                "session_id": str(uuid.uuid4()),
+                "context_id": lti.context_id,
+                "resource_id": str(lti.resource_id),
+                "roles": lti.roles,
+                "course": lti.get_course_info(),
+                "locale": locale,
+                "permissions": permissions,
+                "maintenance": settings.MAINTENANCE_MODE,
+            }
+        )
+        try:
+            jwt_token.payload["user_id"] = lti.user_id
+        except AttributeError:
+            pass
+
+        return str(jwt_token)
 
     # pylint: disable=unused-argument
     def post(self, request, *args, **kwargs):
         """Respond to POST requests with the LTI template.
 
-        Populated with context retrieved by get_context_data in the LTI launch request.
+        Populated with app data built from the LTI launch request. The page of students is
+        served from the cache.
 
         Parameters
         ----------
@@ -180,7 +334,44 @@ class BaseLTIView(ABC, TemplateResponseMixin, View):
             generated from applying the data to the template
 
         """
-        return self.render_to_response(self.get_context_data())
+        try:
+            lti = LTI(self.request, self.kwargs["uuid"])
+            lti.verify()
+            if lti.is_student:
+                content, is_ready = self._get_student_content(lti)
+                response = HttpResponse(content)
+            else:
+                app_data = self._get_app_data(lti)
+                is_ready = bool(
+                    app_data["resource"] and app_data["resource"]["is_ready_to_show"]
+                )
+                response = self.render_to_response(self.get_context_data(app_data))
+        except (LTIException, PortabilityError) as error:
+            logger.warning(str(error))
+            app_data = {
+                "state": "error",
+                "modelName": self.model.RESOURCE_NAME,
+                "resource": None,
+            }
+            return self.render_to_response(self.get_context_data(app_data))
+
+        # Cookies grant access to the files of the resource: they are only set if the launch
+        # resolved a resource that was uploaded
+        if (
+            is_ready
+            and settings.CLOUDFRONT_SIGNED_URLS_ACTIVE
+            and settings.CLOUDFRONT_SIGNED_COOKIES_ACTIVE
+        ):
+            cloudfront_utils.set_signed_cookies(
+                response,
+                "{protocol:s}://{cloudfront:s}/{pk!s}/*".format(
+                    protocol=settings.AWS_S3_URL_PROTOCOL,
+                    cloudfront=settings.CLOUDFRONT_DOMAIN,
+                    pk=lti.resource_id,
+                ),
+                path="/{pk!s}/".format(pk=lti.resource_id),
+            )
+        return response
 
 
 class VideoLTIView(BaseLTIView):
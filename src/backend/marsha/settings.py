@@ -9,6 +9,7 @@ from datetime import timedelta
 import json
 import os
 
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import gettext_lazy as _
 
 from configurations import Configuration, values
@@ -115,6 +116,7 @@ class Base(Configuration):
     ]
 
     MIDDLEWARE = [
+        "marsha.core.middleware.QueryInstrumentationMiddleware",
         "django.middleware.security.SecurityMiddleware",
         "django.contrib.sessions.middleware.SessionMiddleware",
         "django.middleware.common.CommonMiddleware",
@@ -149,8 +151,17 @@ class Base(Configuration):
 
     REST_FRAMEWORK = {
         "DEFAULT_AUTHENTICATION_CLASSES": (
-            "rest_framework_simplejwt.authentication.JWTTokenUserAuthentication",
-        )
+            "marsha.core.authentication.CachedJWTTokenUserAuthentication",
+        ),
+        "DEFAULT_PARSER_CLASSES": (
+            "marsha.core.parsers.JSONParser",
+            "rest_framework.parsers.FormParser",
+            "rest_framework.parsers.MultiPartParser",
+        ),
+        "DEFAULT_RENDERER_CLASSES": (
+            "marsha.core.renderers.JSONRenderer",
+            "rest_framework.renderers.BrowsableAPIRenderer",
+        ),
     }
 
     # Password validation
@@ -212,6 +223,9 @@ class Base(Configuration):
         }
     )
 
+    # Record the SQL queries of each request (see marsha.core.middleware)
+    QUERY_INSTRUMENTATION_ACTIVE = values.BooleanValue(False)
+
     # AWS
     AWS_ACCESS_KEY_ID = values.SecretValue()
     AWS_SECRET_ACCESS_KEY = values.SecretValue()
@@ -219,6 +233,8 @@ class Base(Configuration):
     AWS_S3_URL_PROTOCOL = values.Value("https")
     AWS_BASE_NAME = values.Value()
     UPDATE_STATE_SHARED_SECRETS = values.ListValue()
+    UPDATE_STATE_BATCH_SIZE = values.PositiveIntegerValue(500)
+    UPDATE_STATE_QUEUE_ACTIVE = values.BooleanValue(False)
     AWS_UPLOAD_EXPIRATION_DELAY = values.Value(24 * 60 * 60)  # 24h
 
     # Cloud Front key pair for signed urls
@@ -226,15 +242,44 @@ class Base(Configuration):
     CLOUDFRONT_PRIVATE_KEY_PATH = values.Value(
         os.path.join(BASE_DIR, "..", ".ssh", "cloudfront_private_key")
     )
+    # Private keys of other key pairs (e.g. during a rotation), by access key id
+    CLOUDFRONT_PRIVATE_KEY_PATHS = values.DictValue({})
     CLOUDFRONT_SIGNED_URLS_ACTIVE = values.BooleanValue(True)
     CLOUDFRONT_SIGNED_URLS_VALIDITY = 2 * 60 * 60  # 2 hours
+    # Grant access to the files of a resource with cookies set on LTI launch
+    CLOUDFRONT_SIGNED_COOKIES_ACTIVE = values.BooleanValue(False)
+    CLOUDFRONT_SIGNED_COOKIES_DOMAIN = values.Value(None)
+    # Round the expiration of signed urls to share them during this duration (in seconds)
+    CLOUDFRONT_SIGNED_URLS_CACHE_BUCKET = values.PositiveIntegerValue(10 * 60)
+    # Sign one custom policy for all the files of a resource instead of each url
+    CLOUDFRONT_SIGNED_URLS_WILDCARD = values.BooleanValue(False)
 
     CLOUDFRONT_DOMAIN = values.Value(None)
 
     BYPASS_LTI_VERIFICATION = values.BooleanValue(False)
+    LTI_NATIVE_SIGNATURE_VERIFICATION = values.BooleanValue(False)
+
+    # LTI passports cache
+    LTI_PASSPORT_CACHE_DURATION = values.PositiveIntegerValue(60 * 60)  # 1 hour
+    LTI_PASSPORT_CACHE_SIZE = values.PositiveIntegerValue(1000)
+
+    # Verified JWT tokens cache
+    JWT_VERIFIED_TOKEN_CACHE_SIZE = values.PositiveIntegerValue(10000)
 
     # Cache
-    APP_DATA_CACHE_DURATION = values.Value(60)  # 60 secondes
+    # The default cache is local to each process: configure a backend shared by all the
+    # processes (e.g. memcached) so that invalidations reach all of them.
+    CACHES = values.DictValue(
+        {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    APP_DATA_CACHE_DURATION = values.PositiveIntegerValue(60 * 60)  # 1 hour
+    APP_DATA_CACHE_LOCAL_DURATION = values.PositiveIntegerValue(60)  # 60 secondes
+    APP_DATA_CACHE_STALE_DURATION = values.PositiveIntegerValue(60)  # 60 secondes
+
+    # Long polling of resource changes by the API
+    LONG_POLL_TIMEOUT = values.PositiveIntegerValue(20)  # 20 seconds
+    LONG_POLL_INTERVAL = values.FloatValue(0.5)  # 500 milliseconds
+    LONG_POLL_MAX_WAITERS = values.PositiveIntegerValue(3)
 
     SENTRY_DSN = values.Value(None)
 
@@ -306,6 +351,17 @@ class Base(Configuration):
         """
         super().post_setup()
 
+        # Signed cookies are only sent to CloudFront if they are set on a parent domain
+        if (
+            cls.CLOUDFRONT_SIGNED_URLS_ACTIVE
+            and cls.CLOUDFRONT_SIGNED_COOKIES_ACTIVE
+            and not cls.CLOUDFRONT_SIGNED_COOKIES_DOMAIN
+        ):
+            raise ImproperlyConfigured(
+                "DJANGO_CLOUDFRONT_SIGNED_COOKIES_DOMAIN must be set when "
+                "DJANGO_CLOUDFRONT_SIGNED_COOKIES_ACTIVE is True."
+            )
+
         # The DJANGO_SENTRY_DSN environment variable should be set to activate
         # sentry for an environment
         if cls.SENTRY_DSN is not None:
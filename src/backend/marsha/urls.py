@@ -16,6 +16,7 @@ from marsha.core.api import (
     VideoViewSet,
     XAPIStatementView,
     update_state,
+    update_state_batch,
 )
 from marsha.core.views import DevelopmentLTIView, DocumentLTIView, VideoLTIView
 
@@ -40,6 +41,7 @@ urlpatterns = [
     ),
     # API
     path("api/update-state", update_state, name="update_state"),
+    path("api/update-state/batch", update_state_batch, name="update_state_batch"),
     path(
         "api/schema",
         get_schema_view(title="Marsha API", renderer_classes=[CoreJSONRenderer]),